@@ -0,0 +1,3 @@
+"""
+Бенчмарки DesktopCleaner без Qt: python -m benchmarks --help (з папки root).
+"""
@@ -0,0 +1,105 @@
+"""
+python -m benchmarks [--sizes 1k,10k,100k,1m] [--stages scan_cold,score_batch] [--repeat 3]
+                     [--save-baseline NAME] [--compare NAME] [--threshold 0.2]
+
+Без Qt: міряє сканування, load/save state, скоринг і profile summary
+на синтетичних даних у тимчасовій папці (справжній state не чіпається).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.runner import compare, format_header, run
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+STAGES = ["scan_cold", "scan_incremental", "save_state", "load_state", "score_file", "score_batch", "profile_summary"]
+
+
+def _parse_sizes(raw: str) -> list:
+    out = []
+    for part in raw.split(","):
+        part = part.strip().lower().replace("_", "")
+        if not part:
+            continue
+        mult = 1
+        if part.endswith("k"):
+            mult, part = 1_000, part[:-1]
+        elif part.endswith("m"):
+            mult, part = 1_000_000, part[:-1]
+        out.append(int(float(part) * mult))
+    return out
+
+
+def _baseline_path(name: str) -> Path:
+    p = Path(name)
+    if p.suffix == ".json" or p.parent != Path("."):
+        return p
+    return BASELINE_DIR / f"{name}.json"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks", description="DesktopCleaner benchmarks")
+    ap.add_argument("--sizes", default="1k,10k", help="кількість файлів/записів, напр. 1k,10k,100k,1m")
+    ap.add_argument("--stages", default="", help="через кому; за замовчуванням усі: " + ",".join(STAGES))
+    ap.add_argument("--max-tree", default="100k", help="найбільше дерево файлів для scan_* (далі — тільки state-стадії)")
+    ap.add_argument("--no-memory", action="store_true", help="без tracemalloc-прогону (швидше)")
+    ap.add_argument("--repeat", type=int, default=3, help="прогонів на стадію, береться найшвидший")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", dest="json_out", help="зберегти результати в цей файл")
+    ap.add_argument("--save-baseline", metavar="NAME", help="зберегти як baseline (benchmarks/baselines/NAME.json)")
+    ap.add_argument("--compare", metavar="NAME", help="порівняти з baseline; код виходу 1 при регресії")
+    ap.add_argument("--threshold", type=float, default=0.2, help="допустиме погіршення (0.2 = +20%%)")
+    args = ap.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()] or None
+    unknown = sorted(set(stages or []) - set(STAGES))
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(unknown)}")
+
+    # рядки друкуються одразу після кожної стадії — великі розміри йдуть хвилинами
+    log = lambda msg: print(msg, flush=True)  # noqa: E731
+    log(format_header())
+    report = run(
+        sizes=_parse_sizes(args.sizes),
+        stages=stages,
+        max_tree=_parse_sizes(args.max_tree)[0],
+        memory=not args.no_memory,
+        repeat=args.repeat,
+        seed=args.seed,
+        log=log,
+    )
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        path = _baseline_path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"baseline saved: {path}")
+
+    if args.compare:
+        path = _baseline_path(args.compare)
+        try:
+            baseline = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"cannot read baseline {path}: {e}", file=sys.stderr)
+            return 2
+
+        rows = compare(report, baseline, threshold=args.threshold)
+        print()
+        print(f"{'stage':<18}{'n':>10}{'time':>9}{'memory':>9}")
+        for row in rows:
+            mem = f"{row['mem_ratio']:8.2f}x" if row["mem_ratio"] is not None else "        -"
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['stage']:<18}{row['n']:>10}{row['time_ratio']:8.2f}x{mem}{flag}")
+        if any(row["regression"] for row in rows):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import gc
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import file_objs_from_state, generate_state, generate_tree
+
+# (ім'я, setup) — setup(n) готує дані (не вимірюється) і повертає функцію, яку міряємо
+Setup = Callable[[int], Callable[[], Any]]
+
+
+@dataclass
+class StageResult:
+    stage: str
+    n: int
+    wall_s: float
+    peak_mb: Optional[float]
+    items_per_s: float
+
+
+class Sandbox:
+    """
+    Тимчасова папка додатку (APPDATA / HOME) — бенчмарки не чіпають справжній state.
+    """
+
+    def __init__(self) -> None:
+        self.base = Path(tempfile.mkdtemp(prefix="dc-bench-"))
+        self._env: Dict[str, Optional[str]] = {}
+
+    def __enter__(self) -> "Sandbox":
+        for key in ("APPDATA", "HOME", "USERPROFILE"):
+            self._env[key] = os.environ.get(key)
+        os.environ["HOME"] = os.environ["USERPROFILE"] = str(self.base / "home")
+        (self.base / "home").mkdir()
+        self.reset_app_dir()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        _reset_singletons()
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def reset_app_dir(self) -> Path:
+        """
+        Нова порожня папка додатку (холодний старт: без state і scan_cache).
+        """
+        d = Path(tempfile.mkdtemp(prefix="app-", dir=self.base))
+        os.environ["APPDATA"] = str(d)
+        _reset_singletons()
+        return d
+
+
+def _reset_singletons() -> None:
+    from intelligence import scan_cache
+    from intelligence.state import set_store
+
+    set_store(None)
+    scan_cache._memo = None
+
+
+def _measure(stage: str, n: int, setup: Setup, memory: bool, repeat: int = 1) -> StageResult:
+    # найкращий з repeat прогонів — менше шуму від фонових процесів
+    wall = float("inf")
+    for _ in range(max(1, repeat)):
+        fn = setup(n)
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        wall = min(wall, time.perf_counter() - t0)
+
+    peak_mb: Optional[float] = None
+    if memory:
+        # окремий прогін: tracemalloc сповільнює код у рази і спотворив би час
+        fn = setup(n)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            _cur, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+
+    return StageResult(stage, n, wall, peak_mb, n / wall if wall > 0 else float("inf"))
+
+
+# -------------------- stages --------------------
+
+
+def _tree_stages(sandbox: Sandbox, tree: Path) -> Dict[str, Setup]:
+    from scanner import scan_desktop_result
+    from walker import ScanConfig
+
+    config = ScanConfig(roots=[str(tree)], max_depth=None)
+
+    def cold(_n: int) -> Callable[[], Any]:
+        sandbox.reset_app_dir()
+        return lambda: scan_desktop_result(incremental=True, config=config)
+
+    def warm(_n: int) -> Callable[[], Any]:
+        sandbox.reset_app_dir()
+        scan_desktop_result(incremental=True, config=config)
+        return lambda: scan_desktop_result(incremental=True, config=config)
+
+    return {"scan_cold": cold, "scan_incremental": warm}
+
+
+def _state_stages(sandbox: Sandbox, seed: int) -> Dict[str, Setup]:
+    from intelligence.scoring import score_file, score_records
+    from intelligence.state import build_profile_summary, load_state, save_state
+
+    states: Dict[int, Dict[str, Any]] = {}
+
+    def state_for(n: int) -> Dict[str, Any]:
+        if n not in states:
+            states.clear()
+            states[n] = generate_state(n, seed=seed)
+        return states[n]
+
+    def save(n: int) -> Callable[[], Any]:
+        state = state_for(n)
+        sandbox.reset_app_dir()
+        return lambda: save_state(state)
+
+    def load(n: int) -> Callable[[], Any]:
+        sandbox.reset_app_dir()
+        save_state(state_for(n))
+        _reset_singletons()
+        return load_state
+
+    def per_file(n: int) -> Callable[[], Any]:
+        pairs = file_objs_from_state(state_for(n))
+        return lambda: [score_file(f, r) for f, r in pairs]
+
+    def batch(n: int) -> Callable[[], Any]:
+        pairs = file_objs_from_state(state_for(n))
+        file_objs = [f for f, _ in pairs]
+        recs = [r for _, r in pairs]
+        return lambda: score_records(file_objs, recs)
+
+    def summary(n: int) -> Callable[[], Any]:
+        state = state_for(n)
+        return lambda: build_profile_summary(state)
+
+    return {
+        "save_state": save,
+        "load_state": load,
+        "score_file": per_file,
+        "score_batch": batch,
+        "profile_summary": summary,
+    }
+
+
+def run(
+    sizes: List[int],
+    stages: Optional[List[str]] = None,
+    max_tree: int = 100_000,
+    memory: bool = True,
+    repeat: int = 3,
+    seed: int = 0,
+    log: Callable[[str], None] = lambda _msg: None,
+) -> Dict[str, Any]:
+    """
+    Проганяє вибрані стадії на кожному розмірі.
+    Стадії сканування (scan_*) потребують реальних файлів — для n > max_tree пропускаються.
+    """
+    results: List[StageResult] = []
+    with Sandbox() as sandbox:
+        state_stages = _state_stages(sandbox, seed)
+        for n in sizes:
+            tree_stages: Dict[str, Setup] = {}
+            wanted_tree = [s for s in ("scan_cold", "scan_incremental") if not stages or s in stages]
+            if wanted_tree and n <= max_tree:
+                tree = sandbox.base / f"tree-{n}"
+                log(f"generating {n} files in {tree} ...")
+                t0 = time.perf_counter()
+                generate_tree(tree, n, seed=seed)
+                log(f"  done in {time.perf_counter() - t0:.1f}s")
+                tree_stages = _tree_stages(sandbox, tree)
+
+            for name, setup in list(tree_stages.items()) + list(state_stages.items()):
+                if stages and name not in stages:
+                    continue
+                res = _measure(name, n, setup, memory, repeat)
+                results.append(res)
+                log(format_row(res))
+
+            if tree_stages:
+                shutil.rmtree(sandbox.base / f"tree-{n}", ignore_errors=True)
+
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": [asdict(r) for r in results],
+    }
+
+
+# -------------------- report / baselines --------------------
+
+
+def format_row(r: StageResult) -> str:
+    peak = f"{r.peak_mb:9.1f}" if r.peak_mb is not None else "        -"
+    return f"{r.stage:<18}{r.n:>10}{r.wall_s:>11.3f}{peak}{r.items_per_s:>14.0f}"
+
+
+def format_header() -> str:
+    return f"{'stage':<18}{'n':>10}{'wall_s':>11}{'peak_mb':>9}{'items/s':>14}"
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.2,
+) -> List[Dict[str, Any]]:
+    """
+    Порівнює час (і пікову пам'ять) з baseline для однакових (stage, n).
+    Регресія — якщо стало гірше більше ніж на threshold (0.2 = +20%).
+    """
+    base = {(r["stage"], r["n"]): r for r in baseline.get("results", [])}
+    rows: List[Dict[str, Any]] = []
+    for r in current.get("results", []):
+        b = base.get((r["stage"], r["n"]))
+        if not b:
+            continue
+        time_ratio = r["wall_s"] / b["wall_s"] if b["wall_s"] else 1.0
+        mem_ratio = None
+        if r.get("peak_mb") and b.get("peak_mb"):
+            mem_ratio = r["peak_mb"] / b["peak_mb"]
+        rows.append({
+            "stage": r["stage"],
+            "n": r["n"],
+            "time_ratio": time_ratio,
+            "mem_ratio": mem_ratio,
+            "regression": time_ratio > 1 + threshold or (mem_ratio is not None and mem_ratio > 1 + threshold),
+        })
+    return rows
@@ -0,0 +1,128 @@
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# (розширення, вага) — приблизно як на "живому" Desktop / Downloads
+EXTENSIONS: List[Tuple[str, float]] = [
+    (".pdf", 14), (".docx", 10), (".xlsx", 5), (".pptx", 3), (".txt", 8),
+    (".png", 14), (".jpg", 12), (".mp4", 3), (".mp3", 2),
+    (".zip", 6), (".rar", 2), (".7z", 1),
+    (".exe", 4), (".msi", 1),
+    (".tmp", 1), (".crdownload", 1), (".log", 2),
+    (".lnk", 5), ("", 2),
+]
+
+WORDS = [
+    "report", "invoice", "screenshot", "photo", "notes", "lecture", "homework",
+    "project", "draft", "setup", "installer", "backup", "resume", "scan", "budget",
+    "meeting", "slides", "thesis", "game", "music", "video", "archive", "untitled",
+]
+# частина імен "схожа на копії" — щоб правило name_looks_like_duplicate мало що знаходити
+NAME_DECORATIONS = ["", "", "", "", " (1)", " (2)", " copy", "_final", " new", "_download", " - Copy"]
+
+LABELS: List[Tuple[Any, float]] = [(None, 85), ("trash", 6), ("keep", 4), ("pinned", 2), ("organize", 3)]
+CATEGORIES: List[Tuple[Any, float]] = [(None, 80), ("study", 7), ("work", 7), ("personal", 4), ("games", 2)]
+
+
+def _weighted(rng: random.Random, items: List[Tuple[Any, float]]) -> Any:
+    values, weights = zip(*items)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def random_name(rng: random.Random, i: int) -> str:
+    ext = _weighted(rng, EXTENSIONS)
+    base = f"{rng.choice(WORDS)}_{i}{rng.choice(NAME_DECORATIONS)}"
+    return base + ext
+
+
+def random_size(rng: random.Random) -> int:
+    # log-normal: медіана ~200 KB, довгий хвіст до сотень MB
+    return int(min(2 * 1024 ** 3, math.exp(rng.gauss(12.2, 2.2))))
+
+
+def random_age_days(rng: random.Random) -> float:
+    # більшість файлів свіжі, але є "довгожителі"
+    return rng.expovariate(1 / 60.0)
+
+
+def generate_tree(
+    root: Path,
+    n_files: int,
+    seed: int = 0,
+    max_depth: int = 3,
+    files_per_dir: int = 400,
+) -> Path:
+    """
+    Створює n_files розріджених файлів (truncate — без реального запису байтів)
+    з реалістичними іменами, розмірами і mtime, розкладених по підпапках.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    now = datetime.now().timestamp()
+
+    dirs: List[Path] = [root]
+    for i in range(n_files):
+        if i and i % files_per_dir == 0:
+            parent = rng.choice(dirs)
+            depth = len(parent.relative_to(root).parts)
+            if depth >= max_depth:
+                parent = root
+            d = parent / f"{rng.choice(WORDS)}_{len(dirs)}"
+            d.mkdir(exist_ok=True)
+            dirs.append(d)
+
+        target = dirs[-1] if rng.random() < 0.8 else rng.choice(dirs)
+        path = target / random_name(rng, i)
+        with open(path, "wb") as f:
+            f.truncate(random_size(rng))
+        mtime = now - random_age_days(rng) * 86400.0
+        os.utime(path, (mtime, mtime))
+    return root
+
+
+def generate_state(n_records: int, seed: int = 0, prefix: str = "C:/Users/bench/Desktop") -> Dict[str, Any]:
+    """
+    State з n_records записами у форматі intelligence.state.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    # first/last_seen ставляться скануваннями: значення скупчені навколо моментів сканувань
+    # (update_seen пише з точністю до секунди)
+    scans = sorted(now - timedelta(days=random_age_days(rng)) for _ in range(200))
+    files: Dict[str, Any] = {}
+    for i in range(n_records):
+        k = rng.randrange(len(scans))
+        first_seen = scans[k] + timedelta(seconds=rng.randrange(30))
+        last_seen = scans[rng.randrange(k, len(scans))] + timedelta(seconds=rng.randrange(30))
+        modified = first_seen - timedelta(days=random_age_days(rng))
+        files[f"{prefix}/{random_name(rng, i)}"] = {
+            "first_seen_at": first_seen.isoformat(),
+            "last_seen_at": last_seen.isoformat(),
+            "seen_count": rng.randint(1, 200),
+            "last_modified": modified.replace(tzinfo=None).isoformat(),
+            "size_bytes": random_size(rng),
+            "label": _weighted(rng, LABELS),
+            "category": _weighted(rng, CATEGORIES),
+        }
+    return {"version": 1, "files": files}
+
+
+def file_objs_from_state(state: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    (file_obj, rec) пари для бенчмарків скорингу без файлової системи.
+    """
+    out = []
+    for path, rec in state["files"].items():
+        name = path.rsplit("/", 1)[-1]
+        file_obj = {
+            "name": name,
+            "path": path,
+            "ext": os.path.splitext(name)[1].lower(),
+            "size_bytes": rec.get("size_bytes"),
+            "last_modified": rec.get("last_modified"),
+        }
+        out.append((file_obj, rec))
+    return out
@@ -0,0 +1,571 @@
+from __future__ import annotations
+
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from intelligence.records import RECORD_TYPES, record_to_dict  # type: ignore
+except Exception:
+    RECORD_TYPES = (dict,)
+    record_to_dict = dict  # type: ignore[assignment]
+
+ACTION_TRASH = "trash"
+ACTION_ORGANIZE = "organize"
+ACTION_DELETE = "delete"
+# мітки state, з яких build_plan робить дії
+ACTION_LABELS = (ACTION_TRASH, ACTION_ORGANIZE)
+
+# скільки дій бере один потік за раз (між пачками — прогрес і перевірка cancel)
+DEFAULT_CHUNK = 200
+DEFAULT_WORKERS = 4
+# папка для "organize" без category
+UNCATEGORIZED = "other"
+
+_ProgressFn = Callable[[int, int], None]
+
+
+@dataclass
+class CleanupConfig:
+    """
+    Ключ "cleanup" у scan_config.json.
+    trash_dir     — куди переносити "trash" (за замовчуванням <app_dir>/trash/<batch_id>)
+    organize_dir  — корінь для "organize": <organize_dir>/<category>/<name>
+                    (за замовчуванням ~/Documents/DesktopCleaner)
+    permanent     — "trash" видаляється назавжди, а не переноситься (без undo)
+    workers       — потоки файлових операцій
+    """
+    trash_dir: Optional[str] = None
+    organize_dir: Optional[str] = None
+    permanent: bool = False
+    workers: int = DEFAULT_WORKERS
+
+
+@dataclass
+class CleanupAction:
+    kind: str
+    src: str
+    dst: Optional[str] = None
+    # запис state до змін — для undo і щоб перенести його на новий шлях
+    rec: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class CleanupPlan:
+    batch_id: str
+    actions: List[CleanupAction] = field(default_factory=list)
+    # [{"path", "reason"}] — мічені файли, з якими нічого не робиться
+    skipped: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for a in self.actions:
+            counts[a.kind] = counts.get(a.kind, 0) + 1
+        return {
+            "batch_id": self.batch_id,
+            "counts": counts,
+            "actions": [{"kind": a.kind, "src": a.src, "dst": a.dst} for a in self.actions],
+            "skipped": self.skipped,
+        }
+
+
+@dataclass
+class CleanupReport:
+    batch_id: str
+    dry_run: bool = False
+    undo: bool = False
+    total: int = 0
+    done: int = 0
+    # os.rename у межах диска / копіювання між дисками / видалення
+    renamed: int = 0
+    copied: int = 0
+    deleted: int = 0
+    # [{"path", "error"}]
+    failed: List[Dict[str, str]] = field(default_factory=list)
+    cancelled: bool = False
+    seconds: float = 0.0
+    journal_path: Optional[str] = None
+    # вихідні шляхи виконаних дій (у to_dict не йде)
+    processed: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d.pop("processed")
+        return d
+
+
+# -------------------- paths / config --------------------
+
+def _app_dir() -> Path:
+    from intelligence.storage.paths import get_app_dir  # type: ignore
+    return get_app_dir()
+
+
+def get_journal_dir() -> Path:
+    d = _app_dir() / "cleanup"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def load_cleanup_config() -> CleanupConfig:
+    """
+    Ключ "cleanup" у scan_config.json; якщо немає або битий — значення за замовчуванням.
+    """
+    cfg = CleanupConfig()
+    try:
+        from intelligence.storage.paths import get_scan_config_path  # type: ignore
+        path = get_scan_config_path()
+        if not path.exists():
+            return cfg
+        data = json.loads(path.read_text(encoding="utf-8"))
+        raw = data.get("cleanup") if isinstance(data, dict) else None
+        if not isinstance(raw, dict):
+            return cfg
+        for key in ("trash_dir", "organize_dir"):
+            if raw.get(key):
+                setattr(cfg, key, os.path.expandvars(os.path.expanduser(str(raw[key]))))
+        if "permanent" in raw:
+            cfg.permanent = bool(raw["permanent"])
+        if "workers" in raw:
+            cfg.workers = max(1, int(raw["workers"]))
+    except Exception:
+        return CleanupConfig()
+    return cfg
+
+
+def new_batch_id() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def _unique_dst(directory: str, name: str, reserved: Set[str]) -> str:
+    """
+    <directory>/<name>, а якщо зайнято (на диску або іншою дією плану) — "name (2).ext", ...
+    """
+    stem, ext = os.path.splitext(name)
+    candidate = os.path.join(directory, name)
+    n = 2
+    while os.path.normcase(candidate) in reserved or os.path.lexists(candidate):
+        candidate = os.path.join(directory, f"{stem} ({n}){ext}")
+        n += 1
+    reserved.add(os.path.normcase(candidate))
+    return candidate
+
+
+def _safe_dir_name(value: str) -> str:
+    cleaned = "".join(ch for ch in value if ch not in '<>:"/\\|?*').strip(" .")
+    return cleaned or UNCATEGORIZED
+
+
+# -------------------- plan --------------------
+
+def build_plan(
+    files: Dict[str, Dict[str, Any]],
+    config: Optional[CleanupConfig] = None,
+    paths: Optional[Iterable[str]] = None,
+    batch_id: Optional[str] = None,
+) -> CleanupPlan:
+    """
+    План з міток state: label "trash" -> trash (або delete, якщо config.permanent),
+    label "organize" -> organize у папку category.
+    files — path -> запис state; paths — тільки ці файли (None — усі мічені).
+    Імена призначення вибираються тут, один раз, тож потоки не конфліктують.
+    """
+    config = config or CleanupConfig()
+    plan = CleanupPlan(batch_id=batch_id or new_batch_id())
+    trash_dir = config.trash_dir or str(_app_dir() / "trash")
+    trash_dir = os.path.join(trash_dir, plan.batch_id)
+    organize_dir = config.organize_dir or str(Path.home() / "Documents" / "DesktopCleaner")
+    reserved: Set[str] = set()
+
+    selected = files.keys() if paths is None else paths
+    for path in selected:
+        rec = files.get(path)
+        if not isinstance(rec, RECORD_TYPES):
+            plan.skipped.append({"path": path, "reason": "not_in_state"})
+            continue
+        label = rec.get("label")
+        if label not in ACTION_LABELS:
+            if paths is not None:
+                plan.skipped.append({"path": path, "reason": "no_action_label"})
+            continue
+        if not os.path.isfile(path):
+            plan.skipped.append({"path": path, "reason": "missing"})
+            continue
+
+        snapshot = record_to_dict(rec)
+        name = os.path.basename(path)
+        if label == ACTION_TRASH:
+            if config.permanent:
+                plan.actions.append(CleanupAction(ACTION_DELETE, path, None, snapshot))
+            else:
+                plan.actions.append(
+                    CleanupAction(ACTION_TRASH, path, _unique_dst(trash_dir, name, reserved), snapshot)
+                )
+        else:
+            folder = os.path.join(organize_dir, _safe_dir_name(str(rec.get("category") or UNCATEGORIZED)))
+            plan.actions.append(
+                CleanupAction(ACTION_ORGANIZE, path, _unique_dst(folder, name, reserved), snapshot)
+            )
+    return plan
+
+
+# -------------------- file operations --------------------
+
+def _move(src: str, dst: str) -> str:
+    """
+    rename у межах одного диска (миттєво), між дисками — shutil.move (копія + видалення).
+    Не перезаписує існуючий dst. Повертає "renamed" | "copied".
+    """
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "destination exists", dst)
+    try:
+        os.rename(src, dst)
+        return "renamed"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    shutil.move(src, dst)
+    return "copied"
+
+
+def _same_device(src: str, dst: str) -> bool:
+    # найближча існуюча батьківська папка dst
+    parent = os.path.dirname(dst)
+    while parent and not os.path.exists(parent):
+        nxt = os.path.dirname(parent)
+        if nxt == parent:
+            break
+        parent = nxt
+    try:
+        return os.stat(src).st_dev == os.stat(parent).st_dev
+    except OSError:
+        return False
+
+
+def _check(action: CleanupAction) -> Optional[str]:
+    """
+    Перевірка для dry-run: None — дію можна виконати, інакше текст помилки.
+    """
+    if not os.path.isfile(action.src):
+        return "source missing"
+    if action.dst is not None and os.path.lexists(action.dst):
+        return "destination exists"
+    if action.kind == ACTION_DELETE:
+        return None if os.access(os.path.dirname(action.src) or ".", os.W_OK) else "permission denied"
+    return None
+
+
+class _Journal:
+    """
+    <app_dir>/cleanup/<batch_id>.jsonl: заголовок, далі по рядку на кожну виконану дію —
+    пишеться одразу після неї (з кількох потоків), тож undo бачить усе, що встигло
+    виконатись, навіть якщо процес впав посередині. undo дописує в той самий журнал
+    {"op": "undone", "src"} для кожного поверненого файлу — повторний undo їх пропускає.
+    """
+
+    def __init__(self, path: Path, header: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "a", encoding="utf-8")
+        if header is not None:
+            self._write(header)
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        self._f.flush()
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._write(entry)
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                os.fsync(self._f.fileno())
+            except OSError:
+                pass
+            self._f.close()
+
+
+def _run_chunks(
+    actions: List[CleanupAction],
+    do_one: Callable[[CleanupAction], str],
+    report: CleanupReport,
+    workers: int,
+    on_progress: Optional[_ProgressFn],
+    cancel: Optional[threading.Event],
+) -> List[tuple]:
+    """
+    Виконує дії пачками по DEFAULT_CHUNK в обмеженому пулі потоків.
+    Повертає [(action, outcome)] для успішних; помилки — у report.failed.
+    """
+    chunks = [actions[i:i + DEFAULT_CHUNK] for i in range(0, len(actions), DEFAULT_CHUNK)]
+    ok: List[tuple] = []
+
+    def run_chunk(chunk: List[CleanupAction]) -> tuple:
+        done: List[tuple] = []
+        failed: List[Dict[str, str]] = []
+        for action in chunk:
+            if cancel is not None and cancel.is_set():
+                break
+            try:
+                done.append((action, do_one(action)))
+            except Exception as e:
+                failed.append({"path": action.src, "error": str(e)})
+        return done, failed
+
+    # папки призначення — один раз, до потоків
+    for d in {os.path.dirname(a.dst) for a in actions if a.dst}:
+        try:
+            os.makedirs(d, exist_ok=True)
+        except OSError:
+            pass
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cleanup") as pool:
+        futures = [pool.submit(run_chunk, c) for c in chunks]
+        for fut in as_completed(futures):
+            done, failed = fut.result()
+            ok.extend(done)
+            report.processed.extend(a.src for a, _ in done)
+            report.failed.extend(failed)
+            for _action, outcome in done:
+                if outcome == "renamed":
+                    report.renamed += 1
+                elif outcome == "copied":
+                    report.copied += 1
+                elif outcome == "deleted":
+                    report.deleted += 1
+            report.done += len(done)
+            if on_progress is not None:
+                on_progress(report.done + len(report.failed), report.total)
+
+    report.cancelled = cancel is not None and cancel.is_set()
+    return ok
+
+
+# -------------------- state --------------------
+
+def _apply_state(cache: Any, removals: List[str], puts: List[tuple]) -> None:
+    """
+    Переносить записи state на нові шляхи — одним записом у сховище
+    (StateCache.flush або save_state).
+    """
+    if not removals and not puts:
+        return
+    if cache is not None:
+        with cache.lock:
+            for p in removals:
+                cache.remove(p)
+            for p, rec in puts:
+                cache.put_record(p, rec)
+        cache.flush()
+        return
+
+    from intelligence.state import load_state, put_record, remove_record, save_state  # type: ignore
+
+    state = load_state()
+    for p in removals:
+        remove_record(state, p)
+    for p, rec in puts:
+        put_record(state, p, rec)
+    save_state(state)
+
+
+# -------------------- execute / undo --------------------
+
+def execute_plan(
+    plan: CleanupPlan,
+    dry_run: bool = False,
+    cache: Any = None,
+    workers: int = DEFAULT_WORKERS,
+    on_progress: Optional[_ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+) -> CleanupReport:
+    """
+    Виконує план. dry_run — тільки перевіряє кожну дію (джерело є, призначення вільне)
+    і рахує, скільки буде rename, а скільки копіювань між дисками; нічого не змінює.
+
+    Інакше: кожна виконана дія одразу пишеться в журнал (undo_batch), а state
+    оновлюється в кінці одним записом: trash / delete — запис видаляється,
+    organize — переїжджає на новий шлях без label "organize" (category лишається).
+    cache — StateCache процесу (None — load_state / save_state).
+    """
+    t0 = time.perf_counter()
+    report = CleanupReport(batch_id=plan.batch_id, dry_run=dry_run, total=len(plan.actions))
+
+    if dry_run:
+        for action in plan.actions:
+            error = _check(action)
+            if error is not None:
+                report.failed.append({"path": action.src, "error": error})
+                continue
+            report.done += 1
+            if action.kind == ACTION_DELETE:
+                report.deleted += 1
+            elif _same_device(action.src, action.dst or ""):
+                report.renamed += 1
+            else:
+                report.copied += 1
+        report.seconds = time.perf_counter() - t0
+        return report
+
+    journal_path = get_journal_dir() / f"{plan.batch_id}.jsonl"
+    journal = _Journal(
+        journal_path,
+        {
+            "batch_id": plan.batch_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "total": len(plan.actions),
+        },
+    )
+    report.journal_path = str(journal_path)
+
+    def do_one(action: CleanupAction) -> str:
+        if action.kind == ACTION_DELETE:
+            os.remove(action.src)
+            journal.record({"op": "delete", "kind": action.kind, "src": action.src, "rec": action.rec})
+            return "deleted"
+        outcome = _move(action.src, action.dst or "")
+        journal.record({"op": "move", "kind": action.kind, "src": action.src, "dst": action.dst, "rec": action.rec})
+        return outcome
+
+    try:
+        ok = _run_chunks(plan.actions, do_one, report, workers, on_progress, cancel)
+    finally:
+        journal.close()
+
+    removals = [a.src for a, _ in ok]
+    puts = []
+    for a, _ in ok:
+        if a.kind == ACTION_ORGANIZE and a.dst:
+            rec = dict(a.rec)
+            rec["label"] = None
+            puts.append((a.dst, rec))
+    _apply_state(cache, removals, puts)
+
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def _read_journal(path: Path) -> tuple:
+    """
+    (заголовок, дії, вихідні шляхи дій, уже повернених undo).
+    """
+    header: Dict[str, Any] = {}
+    ops: List[Dict[str, Any]] = []
+    restored: Set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # обірваний останній рядок після падіння
+                continue
+            if i == 0 and "op" not in entry:
+                header = entry
+            elif isinstance(entry, dict) and entry.get("op") == "undone":
+                restored.add(entry.get("src", ""))
+            elif isinstance(entry, dict) and entry.get("op"):
+                ops.append(entry)
+    return header, ops, restored
+
+
+def undo_batch(
+    batch_id: str,
+    cache: Any = None,
+    workers: int = DEFAULT_WORKERS,
+    on_progress: Optional[_ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+) -> CleanupReport:
+    """
+    Повертає файли пачки на місце за журналом і відновлює їхні записи state.
+    Видалені назавжди (delete) повернути не можна — вони йдуть у failed.
+    Кожен повернений файл одразу позначається в журналі, тож повтор після
+    часткового undo (скасування, помилки) бере тільки ще не повернені.
+    Після повного undo журнал перейменовується в <batch_id>.undone.jsonl.
+    """
+    t0 = time.perf_counter()
+    path = get_journal_dir() / f"{batch_id}.jsonl"
+    report = CleanupReport(batch_id=batch_id, undo=True, journal_path=str(path))
+    if not path.exists():
+        report.failed.append({"path": str(path), "error": "journal not found"})
+        return report
+
+    _header, ops, restored = _read_journal(path)
+    actions: List[CleanupAction] = []
+    for op in reversed(ops):
+        if op.get("src") in restored:
+            continue
+        if op.get("op") == "move" and op.get("dst"):
+            # назад: dst -> src
+            actions.append(CleanupAction(op.get("kind", ACTION_TRASH), op["dst"], op["src"], op.get("rec") or {}))
+        else:
+            report.failed.append({"path": op.get("src", ""), "error": "permanently deleted"})
+    report.total = len(actions)
+
+    journal = _Journal(path)
+
+    def do_one(action: CleanupAction) -> str:
+        outcome = _move(action.src, action.dst or "")
+        journal.record({"op": "undone", "src": action.dst})
+        return outcome
+
+    try:
+        ok = _run_chunks(actions, do_one, report, workers, on_progress, cancel)
+    finally:
+        journal.close()
+
+    removals = [a.src for a, _ in ok if a.kind == ACTION_ORGANIZE]
+    puts = [(a.dst, a.rec) for a, _ in ok if a.dst]
+    _apply_state(cache, removals, puts)
+
+    if not report.cancelled and report.done == report.total:
+        try:
+            done_path = path.with_name(f"{batch_id}.undone.jsonl")
+            os.replace(path, done_path)
+            report.journal_path = str(done_path)
+        except OSError:
+            pass
+
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def list_batches() -> List[Dict[str, Any]]:
+    """
+    Журнали очищень (новіші першими): batch_id, created_at, кількість дій, чи вже undo.
+    """
+    out: List[Dict[str, Any]] = []
+    try:
+        entries = sorted(get_journal_dir().glob("*.jsonl"), reverse=True)
+    except OSError:
+        return out
+    for p in entries:
+        undone = p.name.endswith(".undone.jsonl")
+        batch_id = p.name[: -len(".undone.jsonl")] if undone else p.stem
+        try:
+            header, ops, restored = _read_journal(p)
+        except OSError:
+            continue
+        out.append(
+            {
+                "batch_id": batch_id,
+                "created_at": header.get("created_at"),
+                "done": len(ops),
+                "reversible": sum(1 for op in ops if op.get("op") == "move" and op.get("src") not in restored),
+                "undone": undone,
+            }
+        )
+    return out
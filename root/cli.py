@@ -0,0 +1,280 @@
+"""
+python cli.py [ROOT ...] [--max-depth N] [--ignore GLOB] [--min-score 0.5]
+              [--label L] [--category C] [--ext .tmp,.log] [--status added,changed,removed]
+              [--fields path,trash_score] [--duplicates] [--metrics] [-q]
+python cli.py [ROOT ...] --disk-usage [--full] [--ignore GLOB] [--workers N]
+python cli.py --rules
+
+Сканування без Qt (для скриптів і cron): ті самі scanner / state / scan_cache,
+що й у GUI, але файли друкуються в stdout як JSON Lines (один file_obj на рядок)
+по мірі готовності пачок. Підсумок — один JSON-рядок у stderr.
+
+ROOT — папки або аліаси desktop / downloads / documents; без них — scan_config.json.
+--disk-usage — замість сканування: розміри папок і розбивки (disk_usage.DiskUsage.to_dict)
+одним JSON-об'єктом у stdout; --full — без кешу розмірів.
+--rules — чинні правила скорингу (scoring_rules.json або вбудовані, intelligence.rules)
+одним JSON-об'єктом: {"info", "spec"}; spec можна покласти в scoring_rules.json і правити.
+SIGINT / SIGTERM зупиняють обхід: state зберігається, scan_cache — ні
+(як cancel у GUI), код виходу 130.
+
+Імпорти scanner / intelligence — ліниві: --help і помилки аргументів не тягнуть numpy.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+STATUSES = ("added", "changed", "renamed", "unchanged", "removed")
+
+
+def _split(values: Optional[List[str]]) -> List[str]:
+    # --ext .tmp --ext .log і --ext .tmp,.log — те саме
+    out: List[str] = []
+    for v in values or []:
+        out.extend(p.strip() for p in v.split(",") if p.strip())
+    return out
+
+
+def build_filter(args: argparse.Namespace) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Предикат по file_obj з фільтрів командного рядка (selection.compile_selector:
+    усі умови через AND, значення одного фільтра — через OR).
+    """
+    from selection import compile_selector
+
+    return compile_selector(
+        {
+            "min_score": args.min_score,
+            "label": _split(args.label) or None,
+            "category": _split(args.category) or None,
+            "ext": _split(args.ext) or None,
+            "status": _split(args.status) or None,
+        }
+    )
+
+
+class JsonLinesWriter:
+    """
+    file_obj -> рядок JSON у stdout. Якщо читач закрив pipe (| head) —
+    ставить cancel і далі мовчки нічого не пише.
+    """
+
+    def __init__(self, stream: Any, fields: Sequence[str], cancel: threading.Event):
+        self._stream = stream
+        self._fields = list(fields)
+        self._cancel = cancel
+        self.emitted = 0
+        self.closed = False
+
+    def write_many(self, files: List[Dict[str, Any]]) -> None:
+        if self.closed or not files:
+            return
+        fields = self._fields
+        lines = []
+        for f in files:
+            if fields:
+                f = {k: f.get(k) for k in fields}
+            lines.append(json.dumps(f, ensure_ascii=False, default=str, separators=(",", ":")))
+        try:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+        except BrokenPipeError:
+            self._close()
+            return
+        self.emitted += len(lines)
+
+    def _close(self) -> None:
+        self.closed = True
+        self._cancel.set()
+        # щоб інтерпретатор не падав на flush stdout при виході
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self._stream.fileno())
+        except Exception:
+            pass
+
+
+def _install_signal_handlers(cancel: threading.Event) -> None:
+    def _handler(signum, _frame):
+        cancel.set()
+
+    for name in ("SIGINT", "SIGTERM"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            try:
+                signal.signal(sig, _handler)
+            except (ValueError, OSError):
+                pass
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(
+        prog="python cli.py",
+        description="DesktopCleaner: сканування і скоринг без GUI, JSON Lines у stdout",
+    )
+    ap.add_argument("roots", nargs="*", help="папки або desktop/downloads/documents; за замовчуванням — scan_config.json")
+    ap.add_argument("--max-depth", type=int, default=None, help="глибина підпапок (-1 — без обмеження)")
+    ap.add_argument("--ignore", action="append", metavar="GLOB", help="додатковий ignore-glob (можна кілька)")
+    ap.add_argument("--workers", type=int, default=None, help="потоки обходу")
+    ap.add_argument("--min-score", type=float, default=None, help="тільки trash_score >= X")
+    ap.add_argument("--label", action="append", help="тільки з цим user_label (можна кілька / через кому)")
+    ap.add_argument("--category", action="append", help="тільки з цією user_category")
+    ap.add_argument("--ext", action="append", help="тільки ці розширення: .tmp,.log")
+    ap.add_argument("--status", action="append", help="scan_status: " + ",".join(STATUSES))
+    ap.add_argument("--fields", default="", help="які поля file_obj друкувати (через кому); за замовчуванням усі")
+    ap.add_argument("--full", action="store_true", help="без scan_cache: кожен файл будується і оцінюється заново")
+    ap.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="шукати копії за вмістом (читає файли; потрібні всі file_obj у пам'яті) — "
+        "файли, змінені після стріму, друкуються ще раз у кінці",
+    )
+    ap.add_argument(
+        "--disk-usage",
+        action="store_true",
+        help="розміри папок (рекурсивно) і розбивка по розширенню / віку замість списку файлів",
+    )
+    ap.add_argument("--rules", action="store_true", help="надрукувати чинні правила скорингу і вийти")
+    ap.add_argument("--top", type=int, default=50, help="--disk-usage: скільки найбільших папок / розширень")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--metrics", action="store_true", help="час фаз (ScanMetrics) у підсумку")
+    ap.add_argument("-q", "--quiet", action="store_true", help="без підсумку в stderr")
+    args = ap.parse_args(argv)
+
+    unknown = sorted(set(_split(args.status)) - set(STATUSES))
+    if unknown:
+        ap.error(f"unknown status: {', '.join(unknown)}")
+    if args.batch_size < 1:
+        ap.error("--batch-size must be >= 1")
+    return args
+
+
+def _build_config(args: argparse.Namespace) -> Any:
+    from dataclasses import replace
+
+    from walker import load_scan_config
+
+    config = load_scan_config()
+    changes: Dict[str, Any] = {}
+    if args.roots:
+        changes["roots"] = list(args.roots)
+    if args.max_depth is not None:
+        changes["max_depth"] = None if args.max_depth < 0 else args.max_depth
+    if args.ignore:
+        changes["ignore"] = list(config.ignore) + list(args.ignore)
+    if args.workers is not None:
+        changes["workers"] = max(1, args.workers)
+    return replace(config, **changes) if changes else config
+
+
+def _disk_usage(args: argparse.Namespace, config: Any, cancel: threading.Event) -> int:
+    from disk_usage import analyze_disk_usage
+
+    try:
+        usage = analyze_disk_usage(config=config, refresh=args.full, cancel=cancel)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    try:
+        print(json.dumps(usage.to_dict(top=args.top), ensure_ascii=False))
+    except BrokenPipeError:
+        pass
+    return 130 if usage.cancelled else 0
+
+
+def _print_rules() -> int:
+    from intelligence.rules import load_rules
+
+    rules = load_rules()
+    try:
+        print(json.dumps({"info": rules.info(), "spec": rules.spec}, ensure_ascii=False, indent=2))
+    except BrokenPipeError:
+        pass
+    return 1 if rules.error else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.rules:
+        return _print_rules()
+
+    from metrics import MetricsHistory, ScanMetrics
+    from scanner import scan_desktop_result
+
+    config = _build_config(args)
+    if not config.resolved_roots():
+        print(json.dumps({"error": "no existing roots to scan", "roots": config.roots}), file=sys.stderr)
+        return 2
+
+    cancel = threading.Event()
+    _install_signal_handlers(cancel)
+    if args.disk_usage:
+        return _disk_usage(args, config, cancel)
+    keep = build_filter(args)
+    out = JsonLinesWriter(sys.stdout, _split([args.fields]), cancel)
+
+    def on_batch(batch: List[Dict[str, Any]]) -> None:
+        out.write_many([f for f in batch if keep(f)])
+
+    metrics = ScanMetrics(kind="full")
+    metrics.info["source"] = "cli"
+    try:
+        result = scan_desktop_result(
+            incremental=not args.full,
+            config=config,
+            on_batch=on_batch,
+            batch_size=args.batch_size,
+            cancel=cancel,
+            find_duplicates=args.duplicates,
+            metrics=metrics,
+            collect_files=args.duplicates,
+        )
+    except Exception as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+
+    # після стріму: файли, змінені пошуком дублікатів (той самий path — новіший рядок)
+    if result.updated and not out.closed:
+        updated = set(result.updated)
+        out.write_many([f for f in result.files if f["path"] in updated and keep(f)])
+
+    if result.removed and "removed" in _split(args.status) and not out.closed:
+        out.write_many([{"path": p, "scan_status": "removed"} for p in result.removed])
+
+    try:
+        MetricsHistory(size=1).record(metrics)
+    except Exception:
+        pass
+
+    if not args.quiet:
+        summary: Dict[str, Any] = {
+            "files": metrics.counters.get("files", 0),
+            "emitted": out.emitted,
+            "added": len(result.added),
+            "changed": len(result.changed),
+            "removed": len(result.removed),
+            "renamed": len(result.renamed),
+            "cancelled": result.cancelled,
+            "compaction": result.compaction.to_dict() if result.compaction is not None else None,
+            "wall_s": round(metrics.wall_s, 3),
+        }
+        if args.metrics:
+            summary["metrics"] = metrics.to_dict()
+        try:
+            print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+        except Exception:
+            pass
+
+    # закритий pipe — нормальне завершення для `| head`
+    if result.cancelled and not out.closed:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
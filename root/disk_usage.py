@@ -0,0 +1,433 @@
+"""
+Розміри папок і розподіл місця (disk usage) по коренях сканування.
+
+Сканер бачить тільки файли; тут — рекурсивний обхід з підсумками по кожній
+папці (файли + байти всього піддерева) і розбивками по розширенню, категорії
+(user_category зі state) та віку (last_modified).
+
+Кеш (disk_usage.json у папці додатку) — по папках:
+
+    entries[dir] = {"mtime_ns": int|null, "dirs": [імена підпапок],
+                    "names": [...], "size": [...], "mtime": [epoch сек],   # власні файли
+                    "ext": {ext: [files, bytes]}}
+
+Створення / видалення / перейменування в папці змінює її mtime. Якщо mtime той самий,
+що в кеші, папка не листиться і файли в ній не stat-яться — береться запис з кешу;
+підпапки однаково перевіряються (один stat на папку). Тому повторний обхід
+великого дерева — це stat-и папок, а не всіх файлів.
+
+Обмеження: зміна розміру файлу на місці (дописали в лог) mtime папки не змінює —
+такий файл лишається з розміром з кешу, поки в його папці не зміниться склад
+(або analyze_disk_usage(refresh=True)).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from walker import ScanConfig, is_ignored, load_scan_config
+
+try:
+    import numpy as np
+except ImportError:  # розбивка по віку — bisect по одному файлу
+    np = None  # type: ignore[assignment]
+
+DISK_USAGE_CACHE_VERSION = 1
+
+# розбивка по віку: (назва, верхня межа в днях); файл потрапляє в перший кошик, де age < межі
+AGE_BUCKETS: Tuple[Tuple[str, Optional[float]], ...] = (
+    ("week", 7),
+    ("month", 30),
+    ("quarter", 90),
+    ("year", 365),
+    ("older", None),
+)
+
+_DAY_S = 86400.0
+# папку, змінену менше ніж _RACY_S тому, не кешуємо: зміна в ту саму секунду
+# після листингу могла б не змінити mtime (як "racily clean" у git)
+_RACY_S = 2.0
+# папок на одну задачу пулу: stat закешованої папки — мікросекунди, submit дорожчий
+_DIRS_PER_TASK = 64
+
+# останній прочитаний/записаний кеш цього процесу: (path, mtime_ns, cache)
+_memo: Optional[Tuple[str, int, Dict[str, Any]]] = None
+
+
+# -------------------- cache --------------------
+
+def _cache_path() -> Path:
+    from intelligence.storage.paths import get_disk_usage_cache_path  # type: ignore
+    return get_disk_usage_cache_path()
+
+
+def _empty_cache(ignore: List[str]) -> Dict[str, Any]:
+    return {"version": DISK_USAGE_CACHE_VERSION, "ignore": list(ignore), "entries": {}}
+
+
+def load_usage_cache(ignore: List[str]) -> Dict[str, Any]:
+    """
+    Кеш попереднього обходу; битий, іншої версії або з іншими ignore-патернами
+    (у записах уже відфільтровані імена) — порожній.
+    Повторні виклики в тому ж процесі не читають диск, поки файл не змінився.
+    """
+    global _memo
+    try:
+        path = _cache_path()
+        mtime_ns = path.stat().st_mtime_ns
+    except Exception:
+        return _empty_cache(ignore)
+
+    if _memo is not None and _memo[0] == str(path) and _memo[1] == mtime_ns:
+        data = _memo[2]
+    else:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict) or data.get("version") != DISK_USAGE_CACHE_VERSION:
+                return _empty_cache(ignore)
+            if not isinstance(data.get("entries"), dict):
+                data["entries"] = {}
+        except Exception:
+            return _empty_cache(ignore)
+        _memo = (str(path), mtime_ns, data)
+
+    if data.get("ignore") != list(ignore):
+        return _empty_cache(ignore)
+    return data
+
+
+def save_usage_cache(cache: Dict[str, Any]) -> None:
+    from intelligence.storage.atomic import atomic_write_text
+
+    global _memo
+    path = _cache_path()
+    # як scan_cache: без indent і без fsync — кеш можна перебудувати
+    atomic_write_text(path, json.dumps(cache, ensure_ascii=False, separators=(",", ":")), fsync=False)
+    try:
+        _memo = (str(path), path.stat().st_mtime_ns, cache)
+    except OSError:
+        _memo = None
+
+
+# -------------------- result --------------------
+
+@dataclass
+class DiskUsage:
+    """
+    Результат analyze_disk_usage. Лічильники — [files, bytes].
+    dir_totals — по кожній папці, що обійшли: підсумок її піддерева.
+    """
+    roots: List[str] = field(default_factory=list)
+    total_files: int = 0
+    total_bytes: int = 0
+    total_dirs: int = 0
+    by_ext: Dict[str, List[int]] = field(default_factory=dict)
+    by_category: Dict[str, List[int]] = field(default_factory=dict)
+    by_age: Dict[str, List[int]] = field(default_factory=dict)
+    dir_totals: Dict[str, List[int]] = field(default_factory=dict)
+    # папки, які довелось листити заново / взяті з кешу; помилки доступу
+    dirs_listed: int = 0
+    dirs_cached: int = 0
+    errors: int = 0
+    elapsed_s: float = 0.0
+    cancelled: bool = False
+    # підпапки кожної папки (для top_folders)
+    _children: Dict[str, List[str]] = field(default_factory=dict, repr=False)
+
+    def folder(self, path: str) -> Optional[Dict[str, Any]]:
+        total = self.dir_totals.get(path)
+        return None if total is None else {"path": path, "files": total[0], "bytes": total[1]}
+
+    def top_folders(self, limit: int = 50, parent: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Найбільші підпапки parent (за замовчуванням — підпапки коренів): те, що
+        займає місце на Desktop, але не видно в списку файлів.
+        """
+        parents = [parent] if parent is not None else self.roots
+        out = [self.folder(c) for p in parents for c in self._children.get(p, [])]
+        rows = [r for r in out if r is not None]
+        rows.sort(key=lambda r: r["bytes"], reverse=True)
+        return rows[:max(0, int(limit))]
+
+    def to_dict(self, top: int = 50) -> Dict[str, Any]:
+        def table(counts: Dict[str, List[int]]) -> List[Dict[str, Any]]:
+            rows = [{"key": k, "files": v[0], "bytes": v[1]} for k, v in counts.items()]
+            rows.sort(key=lambda r: r["bytes"], reverse=True)
+            return rows
+
+        return {
+            "roots": [self.folder(r) or {"path": r, "files": 0, "bytes": 0} for r in self.roots],
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "total_dirs": self.total_dirs,
+            "top_folders": self.top_folders(top),
+            "by_ext": table(self.by_ext)[:max(0, int(top))],
+            "by_category": table(self.by_category),
+            # кошики віку — у своєму порядку, не за розміром
+            "by_age": [
+                {"key": name, "files": self.by_age.get(name, [0, 0])[0], "bytes": self.by_age.get(name, [0, 0])[1]}
+                for name, _limit in AGE_BUCKETS
+            ],
+            "dirs_listed": self.dirs_listed,
+            "dirs_cached": self.dirs_cached,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "cancelled": self.cancelled,
+        }
+
+
+# -------------------- walk --------------------
+
+# (шлях папки, шлях відносно кореня через "/")
+_DirTask = Tuple[str, str]
+
+
+def _list_dir(path: str, rel_dir: str, ignore: List[str], now: float) -> Dict[str, Any]:
+    """
+    Один листинг папки -> запис кешу (див. docstring модуля). Симлінки не розкриваються.
+    """
+    st = os.stat(path, follow_symlinks=False)
+    dirs: List[str] = []
+    names: List[str] = []
+    sizes: List[int] = []
+    mtimes: List[int] = []
+    by_ext: Dict[str, List[int]] = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            name = entry.name
+            if ignore and is_ignored(name, f"{rel_dir}/{name}" if rel_dir else name, ignore):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    est = entry.stat(follow_symlinks=False)
+                    size = est.st_size
+                    names.append(name)
+                    sizes.append(size)
+                    mtimes.append(int(est.st_mtime))
+                    counts = by_ext.setdefault(os.path.splitext(name)[1].lower(), [0, 0])
+                    counts[0] += 1
+                    counts[1] += size
+            except OSError:
+                continue
+    return {
+        "mtime_ns": None if now - st.st_mtime < _RACY_S else st.st_mtime_ns,
+        "dirs": dirs,
+        "names": names,
+        "size": sizes,
+        "mtime": mtimes,
+        "ext": by_ext,
+    }
+
+
+def _visit(
+    tasks: List[_DirTask],
+    cached: Dict[str, Any],
+    ignore: List[str],
+    now: float,
+    cancel: threading.Event,
+) -> List[Tuple[str, str, Optional[Dict[str, Any]], bool]]:
+    """
+    Пачка папок -> [(path, rel, запис | None при помилці, чи листилась заново)].
+    """
+    out = []
+    for path, rel in tasks:
+        if cancel.is_set():
+            break
+        try:
+            entry = cached.get(path)
+            if entry is not None and entry.get("mtime_ns") is not None:
+                if os.stat(path, follow_symlinks=False).st_mtime_ns == entry["mtime_ns"]:
+                    out.append((path, rel, entry, False))
+                    continue
+            out.append((path, rel, _list_dir(path, rel, ignore, now), True))
+        except OSError:
+            out.append((path, rel, None, True))
+    return out
+
+
+def _under(path: str, roots: List[str]) -> bool:
+    for root in roots:
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def analyze_disk_usage(
+    roots: Optional[Iterable[str]] = None,
+    config: Optional[ScanConfig] = None,
+    categories: Optional[Dict[str, Optional[str]]] = None,
+    refresh: bool = False,
+    cancel: Optional[threading.Event] = None,
+    now: Optional[float] = None,
+) -> DiskUsage:
+    """
+    Рекурсивні розміри папок під roots (аліаси / шляхи; за замовчуванням — корені
+    scan_config.json) без обмеження max_depth, з тими самими ignore-патернами.
+    Папки однієї глибини обходяться паралельно (config.workers потоків).
+
+    categories — path -> user_category (зі state) для розбивки by_category;
+    файли без категорії — "none". refresh=True — ігнорувати кеш.
+    """
+    started = time.perf_counter()
+    cfg = config or load_scan_config()
+    if roots is not None:
+        cfg = ScanConfig(roots=[str(r) for r in roots], max_depth=None, ignore=cfg.ignore, workers=cfg.workers)
+    if now is None:
+        now = time.time()
+    cancel = cancel or threading.Event()
+
+    resolved = [str(p) for p in cfg.resolved_roots()]
+    # вкладений корінь (Desktop всередині home) уже входить у піддерево зовнішнього
+    root_paths = [p for p in resolved if not _under(p, [r for r in resolved if r != p])]
+    usage = DiskUsage(roots=root_paths)
+    cache = _empty_cache(cfg.ignore) if refresh else load_usage_cache(cfg.ignore)
+    cached: Dict[str, Any] = cache["entries"]
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    # порядок обходу: батьківська папка завжди раніше за дочірні
+    order: List[str] = []
+    level: List[_DirTask] = [(p, "") for p in root_paths]
+    workers = max(1, int(cfg.workers))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="du") as pool:
+        while level and not cancel.is_set():
+            chunks = [level[i:i + _DIRS_PER_TASK] for i in range(0, len(level), _DIRS_PER_TASK)]
+            level = []
+            for results in pool.map(lambda c: _visit(c, cached, cfg.ignore, now, cancel), chunks):
+                for path, rel, entry, listed in results:
+                    if entry is None:
+                        usage.errors += 1
+                        continue
+                    entries[path] = entry
+                    order.append(path)
+                    if listed:
+                        usage.dirs_listed += 1
+                    else:
+                        usage.dirs_cached += 1
+                    for name in entry["dirs"]:
+                        level.append((os.path.join(path, name), f"{rel}/{name}" if rel else name))
+
+    usage.cancelled = cancel.is_set()
+    if not usage.cancelled and (usage.dirs_listed or len(cached) != len(entries)):
+        # записи поза цими коренями (інший набір roots) лишаються
+        kept = {p: e for p, e in cached.items() if not _under(p, root_paths)}
+        kept.update(entries)
+        try:
+            save_usage_cache({"version": DISK_USAGE_CACHE_VERSION, "ignore": list(cfg.ignore), "entries": kept})
+        except OSError:
+            pass
+
+    _aggregate(usage, entries, order, categories or {}, now)
+    usage.elapsed_s = time.perf_counter() - started
+    return usage
+
+
+# -------------------- aggregation --------------------
+
+def _aggregate(
+    usage: DiskUsage,
+    entries: Dict[str, Dict[str, Any]],
+    order: List[str],
+    categories: Dict[str, Optional[str]],
+    now: float,
+) -> None:
+    totals = usage.dir_totals
+    children = usage._children
+    # знизу вгору: дочірні папки в order завжди пізніше за батьківську
+    for path in reversed(order):
+        entry = entries[path]
+        files = len(entry["names"])
+        size = sum(entry["size"])
+        kids = []
+        for name in entry["dirs"]:
+            child = os.path.join(path, name)
+            sub = totals.get(child)
+            if sub is not None:
+                files += sub[0]
+                size += sub[1]
+                kids.append(child)
+        totals[path] = [files, size]
+        children[path] = kids
+
+    usage.total_dirs = len(entries)
+    for root in usage.roots:
+        total = totals.get(root)
+        if total is not None:
+            usage.total_files += total[0]
+            usage.total_bytes += total[1]
+
+    by_ext = usage.by_ext
+    for entry in entries.values():
+        for ext, (n, size) in entry["ext"].items():
+            counts = by_ext.setdefault(ext, [0, 0])
+            counts[0] += n
+            counts[1] += size
+
+    usage.by_age = _age_breakdown(entries.values(), now)
+    usage.by_category = _category_breakdown(entries, categories, usage.total_files, usage.total_bytes)
+
+
+def _age_breakdown(entries: Iterable[Dict[str, Any]], now: float) -> Dict[str, List[int]]:
+    mtimes: List[int] = []
+    sizes: List[int] = []
+    for entry in entries:
+        mtimes.extend(entry["mtime"])
+        sizes.extend(entry["size"])
+    limits = [days * _DAY_S for _name, days in AGE_BUCKETS if days is not None]
+    n_buckets = len(AGE_BUCKETS)
+
+    if np is not None and mtimes:
+        ages = now - np.asarray(mtimes, dtype=np.float64)
+        idx = np.searchsorted(np.asarray(limits), ages, side="right")
+        files = np.bincount(idx, minlength=n_buckets).tolist()
+        size = np.bincount(idx, weights=np.asarray(sizes, dtype=np.float64), minlength=n_buckets).tolist()
+    else:
+        files = [0] * n_buckets
+        size = [0] * n_buckets
+        for m, s in zip(mtimes, sizes):
+            i = bisect_right(limits, now - m)
+            files[i] += 1
+            size[i] += s
+    return {name: [int(files[i]), int(size[i])] for i, (name, _days) in enumerate(AGE_BUCKETS)}
+
+
+def _category_breakdown(
+    entries: Dict[str, Dict[str, Any]],
+    categories: Dict[str, Optional[str]],
+    total_files: int,
+    total_bytes: int,
+) -> Dict[str, List[int]]:
+    """
+    Категорії є тільки в записах state (файли, які бачив сканер) — їх мало
+    відносно всього дерева: по кожному знаходиться його папка і розмір,
+    решта — "none".
+    """
+    out: Dict[str, List[int]] = {}
+    name_index: Dict[str, Dict[str, int]] = {}
+    files, size = 0, 0
+    for path, category in categories.items():
+        if not category:
+            continue
+        directory, name = os.path.split(path)
+        entry = entries.get(directory)
+        if entry is None:
+            continue
+        index = name_index.get(directory)
+        if index is None:
+            index = name_index[directory] = {n: i for i, n in enumerate(entry["names"])}
+        i = index.get(name)
+        if i is None:
+            continue
+        counts = out.setdefault(category, [0, 0])
+        counts[0] += 1
+        counts[1] += entry["size"][i]
+        files += 1
+        size += entry["size"][i]
+    out["none"] = [total_files - files, total_bytes - size]
+    return out
@@ -0,0 +1,164 @@
+import heapq
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from intelligence.records import RECORD_TYPES, record_to_dict, record_ts
+from intelligence.state import remove_record
+from intelligence.storage.paths import get_scan_config_path
+
+# після скількох видалень має сенс VACUUM у SQLite (файл БД сам не зменшується)
+VACUUM_MIN_REMOVED = 1000
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Що робити з записами файлів, яких більше немає на диску.
+
+    max_unseen_scans — запис не бачили стільки повних сканувань
+    max_unseen_days  — і стільки днів (last_seen_at); None — критерій вимкнено,
+                       видаляється, коли виконуються всі увімкнені критерії
+    max_records      — стеля кількості записів: понад неї — найдавніше бачені
+                       (LRU за last_seen_at) серед тих, кого немає в поточному скануванні
+    keep_labeled     — записи з label / category (дані користувача) не видаляються ніколи
+    """
+    max_unseen_scans: Optional[int] = 5
+    max_unseen_days: Optional[float] = 30.0
+    max_records: Optional[int] = 100_000
+    keep_labeled: bool = True
+
+
+@dataclass
+class CompactionReport:
+    records_before: int = 0
+    records_after: int = 0
+    removed_unseen: int = 0
+    removed_lru: int = 0
+    # приблизно: розмір видалених записів у JSON
+    bytes_reclaimed: int = 0
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def removed_total(self) -> int:
+        return self.removed_unseen + self.removed_lru
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d.pop("removed")
+        d["removed_total"] = self.removed_total
+        return d
+
+
+def load_retention_policy() -> RetentionPolicy:
+    """
+    Ключ "retention" у scan_config.json; якщо немає або битий — значення за замовчуванням.
+    """
+    policy = RetentionPolicy()
+    try:
+        path = get_scan_config_path()
+        if not path.exists():
+            return policy
+        data = json.loads(path.read_text(encoding="utf-8"))
+        raw = data.get("retention") if isinstance(data, dict) else None
+        if not isinstance(raw, dict):
+            return policy
+
+        for key in ("max_unseen_scans", "max_records"):
+            if key in raw:
+                v = raw[key]
+                setattr(policy, key, None if v is None else max(0, int(v)))
+        if "max_unseen_days" in raw:
+            v = raw["max_unseen_days"]
+            policy.max_unseen_days = None if v is None else max(0.0, float(v))
+        if "keep_labeled" in raw:
+            policy.keep_labeled = bool(raw["keep_labeled"])
+    except Exception:
+        return RetentionPolicy()
+    return policy
+
+
+def _is_labeled(rec: Dict[str, Any]) -> bool:
+    return bool(rec.get("label") or rec.get("category"))
+
+
+def compact_state(
+    state: Dict[str, Any],
+    policy: Optional[RetentionPolicy] = None,
+    now: Optional[datetime] = None,
+    remove: Optional[Callable[[str], Any]] = None,
+) -> CompactionReport:
+    """
+    Один прохід по записах після повного сканування.
+
+    Записи з поточного сканування (last_seen_scan == state["scan_count"]) не чіпаються.
+    last_seen_at — epoch (record_ts), без розбору ISO для StateRecord.
+    remove — як видаляти (StateCache.remove, щоб потрапило в flush);
+    за замовчуванням — state.remove_record.
+    """
+    policy = policy or RetentionPolicy()
+    now = now or datetime.now(timezone.utc)
+    if remove is None:
+        remove = lambda p: remove_record(state, p)  # noqa: E731
+
+    files = state.get("files", {})
+    if not isinstance(files, dict):
+        return CompactionReport()
+
+    report = CompactionReport(records_before=len(files))
+    scan_count = int(state.get("scan_count", 0) or 0)
+    min_scan = None if policy.max_unseen_scans is None else scan_count - policy.max_unseen_scans
+    cutoff = None
+    if policy.max_unseen_days is not None:
+        cutoff = (now - timedelta(days=policy.max_unseen_days)).timestamp()
+    criteria_enabled = min_scan is not None or cutoff is not None
+
+    unseen: List[str] = []
+    # (last_seen_at, path) — кандидати на LRU-витіснення
+    evictable: List[tuple] = []
+    for path, rec in files.items():
+        if not isinstance(rec, RECORD_TYPES):
+            continue
+        last_scan = int(rec.get("last_seen_scan", 0) or 0)
+        if last_scan >= scan_count:
+            continue
+        if policy.keep_labeled and _is_labeled(rec):
+            continue
+        last_seen = record_ts(rec, "last_seen_at")
+        if last_seen != last_seen:
+            # без last_seen_at — найстаріший
+            last_seen = float("-inf")
+        if (
+            criteria_enabled
+            and (min_scan is None or last_scan <= min_scan)
+            and (cutoff is None or last_seen < cutoff)
+        ):
+            unseen.append(path)
+        else:
+            evictable.append((last_seen, path))
+
+    for path in unseen:
+        report.bytes_reclaimed += _approx_size(files.get(path))
+        remove(path)
+    report.removed_unseen = len(unseen)
+    report.removed.extend(unseen)
+
+    if policy.max_records is not None:
+        excess = len(files) - policy.max_records
+        if excess > 0:
+            for _last_seen, path in heapq.nsmallest(excess, evictable):
+                report.bytes_reclaimed += _approx_size(files.get(path))
+                remove(path)
+                report.removed.append(path)
+                report.removed_lru += 1
+
+    report.records_after = len(files)
+    return report
+
+
+def _approx_size(rec: Any) -> int:
+    try:
+        return len(json.dumps(record_to_dict(rec), ensure_ascii=False, separators=(",", ":")))
+    except Exception:
+        return 0
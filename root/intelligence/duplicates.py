@@ -0,0 +1,170 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# скільки байт з початку і з кінця файлу йде в sample-хеш
+SAMPLE_BYTES = 64 * 1024
+# менше цього сумарного обсягу full-хешів — рахуємо в потоках, без запуску процесів
+PROCESS_POOL_MIN_BYTES = 256 * 1024 * 1024
+# файли, менші за це, не вважаються дублікатами (порожні, ярлики і т.п.)
+MIN_DUP_SIZE = 1
+
+_FULL_CHUNK = 8 * 1024 * 1024
+
+
+def _fingerprint(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [int(st.st_ino), int(st.st_size), int(st.st_mtime_ns)]
+
+
+def sample_hash(path: str, size: int) -> Optional[str]:
+    """
+    blake2b(head + tail). Для файлів <= 2*SAMPLE_BYTES це хеш усього вмісту.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            if size <= 2 * SAMPLE_BYTES:
+                h.update(f.read())
+            else:
+                h.update(f.read(SAMPLE_BYTES))
+                f.seek(-SAMPLE_BYTES, os.SEEK_END)
+                h.update(f.read(SAMPLE_BYTES))
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def full_hash(path: str) -> Optional[str]:
+    """
+    blake2b усього файлу через mmap (без копіювання в Python-буфери).
+    Top-level — щоб працювало в ProcessPoolExecutor.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return h.hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for off in range(0, size, _FULL_CHUNK):
+                    h.update(mm[off:off + _FULL_CHUNK])
+    except (OSError, ValueError):
+        return None
+    return h.hexdigest()
+
+
+def _map(fn: Callable[[str], Optional[str]], paths: List[str], use_processes: bool, workers: int) -> List[Optional[str]]:
+    if not paths:
+        return []
+    if use_processes:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(fn, paths, chunksize=4))
+        except Exception:
+            pass  # напр. заборонені процеси — падаємо на потоки
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, paths))
+
+
+def find_duplicates(
+    files: Iterable[Tuple[str, int]],
+    hash_lookup: Callable[[str], Optional[Dict[str, Any]]],
+    workers: Optional[int] = None,
+) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, Any]]]:
+    """
+    Шукає однакові за вмістом файли.
+
+    files       — (path, size_bytes)
+    hash_lookup — path -> {"fp": [inode, size, mtime_ns], "sample": str|None, "full": str|None} | None
+                  (rec["content_hash"] зі state; запис валідний, поки fp не змінився)
+
+    1) групування за розміром — файли з унікальним розміром не читаються взагалі
+    2) sample-хеш (початок + кінець) для колізій розміру
+    3) full-хеш (mmap, пул процесів) тільки для колізій (size, sample)
+
+    Повертає (groups: group_id -> [paths], updated: path -> новий запис для rec["content_hash"]).
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    by_size: Dict[int, List[str]] = {}
+    for path, size in files:
+        if size >= MIN_DUP_SIZE:
+            by_size.setdefault(int(size), []).append(path)
+
+    candidates = [(p, size) for size, paths in by_size.items() if len(paths) > 1 for p in paths]
+    if not candidates:
+        return {}, {}
+
+    updated: Dict[str, Dict[str, Any]] = {}
+    entries: Dict[str, Dict[str, Any]] = {}
+    for path, _size in candidates:
+        fp = _fingerprint(path)
+        if fp is None:
+            continue
+        cached = hash_lookup(path)
+        if isinstance(cached, dict) and cached.get("fp") == fp:
+            entries[path] = dict(cached)
+        else:
+            entries[path] = {"fp": fp, "sample": None, "full": None}
+            updated[path] = entries[path]
+
+    # 2) sample
+    need_sample = [p for p, e in entries.items() if not e.get("sample")]
+    sizes = {p: e["fp"][1] for p, e in entries.items()}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(lambda p: sample_hash(p, sizes[p]), need_sample))
+    for p, h in zip(need_sample, samples):
+        entries[p]["sample"] = h
+        updated[p] = entries[p]
+
+    by_sample: Dict[Tuple[int, str], List[str]] = {}
+    for p, e in entries.items():
+        if e.get("sample"):
+            by_sample.setdefault((e["fp"][1], e["sample"]), []).append(p)
+
+    # 3) full — тільки там, де sample не покриває весь файл
+    need_full: List[str] = []
+    for (size, _sample), paths in by_sample.items():
+        if len(paths) < 2:
+            continue
+        if size <= 2 * SAMPLE_BYTES:
+            for p in paths:
+                entries[p]["full"] = entries[p]["sample"]
+            continue
+        need_full.extend(p for p in paths if not entries[p].get("full"))
+
+    full_bytes = sum(sizes[p] for p in need_full)
+    fulls = _map(full_hash, need_full, full_bytes >= PROCESS_POOL_MIN_BYTES, workers)
+    for p, h in zip(need_full, fulls):
+        entries[p]["full"] = h
+        updated[p] = entries[p]
+
+    groups: Dict[str, List[str]] = {}
+    by_full: Dict[Tuple[int, str], List[str]] = {}
+    for (size, _sample), paths in by_sample.items():
+        if len(paths) < 2:
+            continue
+        for p in paths:
+            h = entries[p].get("full")
+            if h:
+                by_full.setdefault((size, h), []).append(p)
+    for (_size, h), paths in by_full.items():
+        if len(paths) > 1:
+            groups[h] = sorted(paths)
+
+    return groups, updated
+
+
+def pick_original(paths: List[str], first_seen: Callable[[str], Optional[str]]) -> str:
+    """
+    "Оригінал" групи — файл, який DesktopCleaner побачив першим
+    (далі — коротше ім'я, потім шлях).
+    Решта вважаються копіями.
+    """
+    return min(paths, key=lambda p: (first_seen(p) or "\uffff", len(os.path.basename(p)), p))
@@ -0,0 +1,425 @@
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from intelligence.records import record_to_dict
+from intelligence.scoring import BatchScores, score_records
+from intelligence.storage.atomic import atomic_write_text
+from intelligence.storage.paths import get_model_path
+
+try:
+    import numpy as np
+except ImportError:  # модель вимкнена, працює тільки евристика
+    np = None  # type: ignore[assignment]
+
+MODEL_VERSION = 1
+
+# label -> ціль навчання; "organize" / None — не сигнал про сміття, не вчимось
+LABEL_TARGETS = {"trash": 1.0, "keep": 0.0, "pinned": 0.0}
+
+# модель вмикається, коли є хоча б стільки прикладів кожного класу
+MIN_LABELS_PER_CLASS = 3
+# вага моделі у фінальному score росте з кількістю прикладів до MAX_BLEND
+MAX_BLEND = 0.6
+FULL_BLEND_LABELS = 100
+# причина learned_preference:+0.12 — якщо модель зсунула score хоча б на стільки
+REASON_MIN_DELTA = 0.05
+# ознаки віку неперервні (log днів), тож score з активною моделлю дрейфує і між
+# порогами scoring — планувальник перерахунку не відкладає його довше за це
+REFRESH_S = 7 * 86400.0
+# нове покоління моделі (кешовані score-и перераховуються) — тільки коли ваги / blend
+# від попереднього покоління можуть зсунути score хоча б на стільки (одна мітка — ~0.03)
+# і не частіше, ніж раз на GENERATION_MIN_INTERVAL_S (як перерахунок у main.py)
+GENERATION_MIN_DELTA = 0.05
+GENERATION_MIN_INTERVAL_S = 15 * 60.0
+
+# ваги пишуться на диск не з кожною міткою, а через стільки секунд після першої незаписаної
+SAVE_DELAY_S = 2.0
+
+# AdaGrad + L2
+LEARNING_RATE = 0.3
+L2 = 1e-4
+
+# ознаки: [bias, heuristic, size, days_mod, days_first_seen, seen_count, dup_name, content_dup, ext-bucket x EXT_BUCKETS]
+EXT_BUCKETS = 32
+_F_BIAS, _F_HEURISTIC, _F_SIZE, _F_DAYS_MOD, _F_DAYS_SEEN, _F_SEEN, _F_DUP_NAME, _F_CONTENT_DUP = range(8)
+_F_EXT = 8
+N_FEATURES = _F_EXT + EXT_BUCKETS
+
+
+@lru_cache(maxsize=1024)
+def _ext_bucket(ext: str) -> int:
+    # crc32 — стабільний між запусками (hash() рандомізований)
+    return _F_EXT + zlib.crc32(ext.encode("utf-8", "replace")) % EXT_BUCKETS
+
+
+def _initial_weights() -> Any:
+    # старт = евристика: sigmoid(-2.5 + 5*h) ≈ 0.08 / 0.5 / 0.9 для h = 0 / 0.5 / 0.95
+    w = np.zeros(N_FEATURES, dtype=np.float64)
+    w[_F_BIAS] = -2.5
+    w[_F_HEURISTIC] = 5.0
+    return w
+
+
+def _log_scaled(values: Any, scale: float) -> Any:
+    # NaN (невідомо) і від'ємні -> 0
+    v = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    return np.log1p(np.maximum(v, 0.0)) / scale
+
+
+def featurize(
+    batch: BatchScores,
+    sizes: Sequence[Any],
+    seen_counts: Sequence[Any],
+    dup_names: Any,
+    content_dups: Sequence[bool],
+) -> Any:
+    """
+    Матриця ознак (n x N_FEATURES) з уже порахованого score_batch —
+    евристика йде як одна з ознак, дні беруться з batch без повторного розбору дат.
+    """
+    n = len(batch)
+    X = np.zeros((n, N_FEATURES), dtype=np.float64)
+    if n == 0:
+        return X
+    X[:, _F_BIAS] = 1.0
+    X[:, _F_HEURISTIC] = batch.scores
+    X[:, _F_SIZE] = _log_scaled([s or 0 for s in sizes], 20.0)
+    X[:, _F_DAYS_MOD] = _log_scaled(batch.days_mod, 6.0)
+    X[:, _F_DAYS_SEEN] = _log_scaled(batch.days_first_seen, 6.0)
+    X[:, _F_SEEN] = _log_scaled([c or 0 for c in seen_counts], 6.0)
+    X[:, _F_DUP_NAME] = dup_names
+    X[:, _F_CONTENT_DUP] = np.fromiter(map(bool, content_dups), dtype=bool, count=n)
+    cols = np.fromiter(map(_ext_bucket, batch.exts), dtype=np.int64, count=n)
+    X[np.arange(n), cols] = 1.0
+    return X
+
+
+def sample_features(
+    batch: BatchScores,
+    file_objs: Sequence[Dict[str, Any]],
+    recs: Sequence[Dict[str, Any]],
+) -> Any:
+    """
+    Ознаки для пар (file_obj, rec) і їхнього score_records — однакові для навчання
+    (learn) і скорингу (adjust), щоб модель бачила ті самі значення.
+    """
+    return featurize(
+        batch,
+        sizes=[f.get("size_bytes") for f in file_objs],
+        seen_counts=[r.get("seen_count") for r in recs],
+        dup_names=_dup_flags(batch),
+        content_dups=[bool(f.get("duplicate_of")) for f in file_objs],
+    )
+
+
+def file_obj_from_record(file_path: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    file_obj з полів state-запису — для мітки файлу, якого немає в останньому скануванні.
+    """
+    name = os.path.basename(file_path)
+    return {
+        "path": file_path,
+        "name": name,
+        "ext": os.path.splitext(name)[1].lower(),
+        "size_bytes": rec.get("size_bytes"),
+        "last_modified": rec.get("last_modified"),
+    }
+
+
+def _sigmoid(z: Any) -> Any:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+
+class OnlineModel:
+    """
+    Логістична регресія над ознаками файлу, що вчиться на мітках користувача
+    (trash -> 1, keep / pinned -> 0) по одному прикладу: кожна нова мітка — один
+    крок AdaGrad, O(N_FEATURES), без перенавчання на всій історії.
+
+    Поки прикладів мало (MIN_LABELS_PER_CLASS кожного класу) — score не змінюється.
+    Далі score = (1 - a) * евристика + a * модель, a росте до MAX_BLEND.
+    Ваги — у model.json у папці додатку.
+
+    generation (ключ кешу score-ів) змінюється не з кожною міткою: коли модель
+    вмикається або ваги зсунулись досить, щоб score змінився помітно (GENERATION_MIN_DELTA),
+    але не частіше за GENERATION_MIN_INTERVAL_S.
+    """
+
+    def __init__(self, path: Optional[Any] = None):
+        self._path = path
+        self._lock = threading.Lock()
+        # save() по черзі: старший знімок не ляже на диск після новішого
+        self._save_lock = threading.Lock()
+        self.weights = _initial_weights() if np is not None else None
+        self.grad_sq = np.zeros(N_FEATURES, dtype=np.float64) if np is not None else None
+        self.updates = 0
+        self.positives = 0
+        self.negatives = 0
+        # покоління, ваги / blend, з якими воно почалось, і коли (epoch; не зберігається)
+        self._generation = 0
+        self._gen_at = 0.0
+        self._gen_weights = self.weights.copy() if np is not None else None
+        self._gen_blend = 0.0
+        # path -> ціль, на якій модель уже вчилась: повторна та сама мітка — не новий приклад
+        self.examples: Dict[str, float] = {}
+        # є незаписані зміни / таймер відкладеного save()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+
+    # -------------------- persistence --------------------
+
+    @property
+    def path(self) -> Any:
+        return self._path if self._path is not None else get_model_path()
+
+    @classmethod
+    def load(cls, path: Optional[Any] = None) -> "OnlineModel":
+        """
+        model.json; немає / інша версія / битий — нова модель (старт = евристика).
+        """
+        model = cls(path)
+        if np is None:
+            return model
+        try:
+            data = json.loads(model.path.read_text(encoding="utf-8"))
+            if data.get("version") != MODEL_VERSION or data.get("features") != N_FEATURES:
+                return model
+            weights = np.asarray(data["weights"], dtype=np.float64)
+            grad_sq = np.asarray(data["grad_sq"], dtype=np.float64)
+            if weights.shape != (N_FEATURES,) or grad_sq.shape != (N_FEATURES,):
+                return model
+            if not (np.isfinite(weights).all() and np.isfinite(grad_sq).all()):
+                return model
+            model.weights, model.grad_sq = weights, grad_sq
+            model.updates = int(data.get("updates", 0))
+            model.positives = int(data.get("positives", 0))
+            model.negatives = int(data.get("negatives", 0))
+            # model.json без покоління: ключем кешу було updates
+            model._generation = int(data.get("generation", model.updates))
+            gen_weights = np.asarray(data.get("gen_weights", weights), dtype=np.float64)
+            model._gen_weights = gen_weights if gen_weights.shape == (N_FEATURES,) else weights.copy()
+            model._gen_blend = float(data.get("gen_blend", model.blend()))
+            examples = data.get("examples", {})
+            if isinstance(examples, dict):
+                model.examples = {str(p): float(y) for p, y in examples.items()}
+        except Exception:
+            pass
+        return model
+
+    def save(self) -> None:
+        if np is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    "version": MODEL_VERSION,
+                    "features": N_FEATURES,
+                    "updates": self.updates,
+                    "positives": self.positives,
+                    "negatives": self.negatives,
+                    "weights": self.weights.tolist(),
+                    "grad_sq": self.grad_sq.tolist(),
+                    "generation": self._generation,
+                    "gen_weights": self._gen_weights.tolist(),
+                    "gen_blend": self._gen_blend,
+                    "examples": dict(self.examples),
+                }
+                self._dirty = False
+            atomic_write_text(self.path, json.dumps(data))
+
+    def schedule_save(self, delay_s: float = SAVE_DELAY_S) -> None:
+        """
+        Відкладений save(): мітки за delay_s — один запис, поза потоком, що вчить модель.
+        """
+        with self._lock:
+            if self._save_timer is not None or not self._dirty:
+                return
+            self._save_timer = threading.Timer(delay_s, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self) -> None:
+        """
+        Записати ваги, якщо є незаписані зміни (таймер schedule_save, вихід з додатку).
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+        self.save()
+
+    # -------------------- state --------------------
+
+    @property
+    def active(self) -> bool:
+        return (
+            np is not None
+            and self.positives >= MIN_LABELS_PER_CLASS
+            and self.negatives >= MIN_LABELS_PER_CLASS
+        )
+
+    @property
+    def generation(self) -> int:
+        """
+        Змінюється, коли score-и моделі помітно змінились (scan_cache не бере старі,
+        rescore_due їх перераховує); 0 — модель неактивна, score = евристика.
+        Нове покоління відкладене до читання: мітки за GENERATION_MIN_INTERVAL_S — одне покоління.
+        """
+        if not self.active:
+            return 0
+        with self._lock:
+            if time.time() - self._gen_at >= GENERATION_MIN_INTERVAL_S and self._drift() >= GENERATION_MIN_DELTA:
+                self._advance()
+            return self._generation
+
+    def _advance(self) -> None:
+        # під self._lock
+        self._generation += 1
+        self._gen_weights = self.weights.copy()
+        self._gen_blend = self.blend()
+        self._gen_at = time.time()
+
+    def blend(self) -> float:
+        n = self.positives + self.negatives
+        return MAX_BLEND * min(1.0, n / FULL_BLEND_LABELS)
+
+    def _drift(self) -> float:
+        """
+        Верхня межа зсуву score від ваг / blend поточного покоління:
+        sigmoid' <= 0.25, ознаки обмежені — прапорці та ext-bucket 1, лог-ознаки < 2.
+        """
+        dw = np.abs(self.weights - self._gen_weights)
+        bound = 2.0 * float(dw[:_F_EXT].sum()) + float(dw[_F_EXT:].max())
+        a = self.blend()
+        return abs(a - self._gen_blend) + a * 0.25 * bound
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "updates": self.updates,
+            "positives": self.positives,
+            "negatives": self.negatives,
+            "blend": round(self.blend(), 4) if self.active else 0.0,
+        }
+
+    # -------------------- learning --------------------
+
+    def learn(self, samples: Iterable[Tuple[Dict[str, Any], Dict[str, Any], Optional[str]]]) -> int:
+        """
+        samples — (file_obj, rec, label) з мітками, щойно поставленими користувачем;
+        ознаки — як в adjust() (sample_features), file_obj без мітки для файлів поза
+        скануванням — file_obj_from_record. Мітки без цілі (organize / None) і повтор
+        тієї самої мітки для того самого файлу пропускаються; для одного path діє остання.
+        Повертає, скільки прикладів пішло в навчання.
+        """
+        if np is None:
+            return 0
+        last: Dict[str, Tuple[Dict[str, Any], Dict[str, Any], float]] = {}
+        for f, rec, label in samples:
+            if label in LABEL_TARGETS:
+                last[f["path"]] = (f, rec, LABEL_TARGETS[label])
+        with self._lock:
+            items = [item for p, item in last.items() if self.examples.get(p) != item[2]]
+        if not items:
+            return 0
+
+        file_objs = [f for f, _, _ in items]
+        # евристика як ознака — без мітки (інакше keep/pinned дали б 0 і ціль "протекла б" в ознаку)
+        recs = [dict(record_to_dict(r), label=None) for _, r, _ in items]
+        X = sample_features(score_records(file_objs, recs), file_objs, recs)
+
+        with self._lock:
+            was_active = self.active
+            w, g2 = self.weights, self.grad_sq
+            for x, (f, _r, y) in zip(X, items):
+                p = float(_sigmoid(x @ w))
+                grad = (p - y) * x + L2 * w
+                g2 += grad * grad
+                w -= LEARNING_RATE * grad / (np.sqrt(g2) + 1e-8)
+                # перемітка (trash -> keep): приклад переходить у інший клас, а не додається
+                previous = self.examples.get(f["path"])
+                if previous is not None:
+                    if previous > 0.5:
+                        self.positives -= 1
+                    else:
+                        self.negatives -= 1
+                if y > 0.5:
+                    self.positives += 1
+                else:
+                    self.negatives += 1
+                self.examples[f["path"]] = y
+                self.updates += 1
+            self._dirty = True
+            if self.active and not was_active:
+                # евристика -> суміш з моделлю: нове покоління одразу
+                self._advance()
+        return len(items)
+
+    # -------------------- scoring --------------------
+
+    def adjust(
+        self,
+        batch: BatchScores,
+        file_objs: Sequence[Dict[str, Any]],
+        recs: Sequence[Dict[str, Any]],
+    ) -> Optional[Any]:
+        """
+        Фінальні score-и для batch евристики (одне множення матриці на вектор ваг)
+        або None, якщо модель ще неактивна.
+        pinned / keep лишаються 0 — як у score_file.
+        """
+        if not self.active or len(batch) == 0:
+            return None
+        with self._lock:
+            w = self.weights.copy()
+        a = self.blend()
+
+        X = sample_features(batch, file_objs, recs)
+        scores = (1.0 - a) * batch.scores + a * _sigmoid(X @ w)
+        scores[batch.important] = 0.0
+        return np.clip(scores, 0.0, 1.0)
+
+
+def _dup_flags(batch: BatchScores) -> Any:
+    # спрацювало правило з умовою на ім'я (за замовчуванням — name_looks_like_duplicate)
+    return batch.name_hits
+
+
+def learned_reason(delta: float) -> Optional[str]:
+    """
+    Причина для UI, якщо модель помітно зсунула score: "learned_preference:+0.12".
+    """
+    if math.isnan(delta) or abs(delta) < REASON_MIN_DELTA:
+        return None
+    return f"learned_preference:{delta:+.2f}"
+
+
+# -------------------- process-wide instance --------------------
+
+_model: Optional[OnlineModel] = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> OnlineModel:
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = OnlineModel.load()
+        return _model
+
+
+def set_model(model: Optional[OnlineModel]) -> None:
+    """
+    Підміна моделі (None — завантажити з model.json при наступному get_model).
+    """
+    global _model
+    with _model_lock:
+        _model = model
@@ -0,0 +1,258 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# відсутнє поле (на відміну від поля зі значенням None)
+_MISSING: Any = type("_Missing", (), {"__repr__": lambda self: "<missing>", "__slots__": ()})()
+
+# ключ запису -> (слот, тип): "ts" — epoch float (назовні — aware UTC ISO),
+# "str" — інтернований рядок, "raw" — як є
+_FIELDS: Dict[str, Tuple[str, str]] = {
+    "first_seen_at": ("first_seen", "ts"),
+    "last_seen_at": ("last_seen", "ts"),
+    # last_modified скоринг бере з file_obj — тут лишається рядком (без розбору на кожному скануванні)
+    "last_modified": ("modified", "raw"),
+    "size_bytes": ("size_bytes", "raw"),
+    "seen_count": ("seen_count", "raw"),
+    "last_seen_scan": ("last_seen_scan", "raw"),
+    "label": ("label", "str"),
+    "category": ("category", "str"),
+}
+_KEY_ORDER = tuple(_FIELDS)
+
+
+def iso_to_ts(value: Any) -> Any:
+    """
+    ISO (utc_now_iso) -> epoch з мікросекундами: ts_to_iso відтворює той самий рядок,
+    тож load -> save не змінює записів. Рядок в іншому форматі (і не-рядок) лишається
+    як є — to_dict() поверне його без змін.
+    """
+    if type(value) is not str:
+        return value
+    return _iso_to_ts(value)
+
+
+def ts_to_iso(value: Any) -> Any:
+    if type(value) is not float:
+        return value
+    return _ts_to_iso(value)
+
+
+# записи одного сканування мають однаковий час — кеш спрацьовує майже завжди
+@lru_cache(maxsize=4096)
+def _iso_to_ts(value: str) -> Any:
+    if not value.endswith("+00:00") or len(value) not in (25, 32):
+        return value
+    try:
+        ts = datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return value
+    # неканонічний запис (".000000") лишається рядком — інакше save перепише запис
+    return ts if _ts_to_iso(ts) == value else value
+
+
+@lru_cache(maxsize=4096)
+def _ts_to_iso(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class StateRecord(MutableMapping):
+    """
+    Запис state про один файл — компактно (__slots__) замість dict:
+    first_seen_at / last_seen_at — epoch float, label / category —
+    інтерновані рядки, незнайомі ключі (content_hash, ...) — у _extra.
+
+    Назовні поводиться як dict з тими ж ключами і ISO-рядками (rec["first_seen_at"]),
+    тож state.py / scanner / UI не змінюються; у dict перетворюється тільки
+    на межі JSON (to_dict). Гарячі місця (скоринг, compaction) беруть epoch напряму
+    через record_ts().
+    """
+
+    __slots__ = (
+        "first_seen", "last_seen", "modified",
+        "size_bytes", "seen_count", "last_seen_scan",
+        "label", "category", "_extra",
+    )
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self._extra: Optional[Dict[str, Any]] = None
+        if not data:
+            self.first_seen = self.last_seen = self.modified = _MISSING
+            self.size_bytes = self.seen_count = self.last_seen_scan = _MISSING
+            self.label = self.category = _MISSING
+            return
+        # те саме, що self[key] = value для кожного ключа, але без циклу по методах (load)
+        g = data.get
+        self.first_seen = iso_to_ts(g("first_seen_at", _MISSING))
+        self.last_seen = iso_to_ts(g("last_seen_at", _MISSING))
+        self.modified = g("last_modified", _MISSING)
+        self.size_bytes = g("size_bytes", _MISSING)
+        self.seen_count = g("seen_count", _MISSING)
+        self.last_seen_scan = g("last_seen_scan", _MISSING)
+        self.label = _intern(g("label", _MISSING))
+        self.category = _intern(g("category", _MISSING))
+        extra = data.keys() - _FIELDS.keys()
+        if extra:
+            self._extra = {k: data[k] for k in data if k in extra}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StateRecord":
+        return cls(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for key in _KEY_ORDER:
+            slot, kind = _FIELDS[key]
+            value = getattr(self, slot)
+            if value is _MISSING:
+                continue
+            if kind == "ts":
+                value = ts_to_iso(value)
+            out[key] = value
+        if self._extra:
+            out.update(self._extra)
+        return out
+
+    # -------------------- mapping protocol --------------------
+
+    def __getitem__(self, key: str) -> Any:
+        spec = _FIELDS.get(key)
+        if spec is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        slot, kind = spec
+        value = getattr(self, slot)
+        if value is _MISSING:
+            raise KeyError(key)
+        if kind == "ts":
+            return ts_to_iso(value)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # швидше за MutableMapping.get (без try/except KeyError)
+        spec = _FIELDS.get(key)
+        if spec is None:
+            return self._extra.get(key, default) if self._extra is not None else default
+        slot, kind = spec
+        value = getattr(self, slot)
+        if value is _MISSING:
+            return default
+        if kind == "ts":
+            return ts_to_iso(value)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        spec = _FIELDS.get(key)
+        if spec is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        slot, kind = spec
+        if kind == "ts":
+            value = iso_to_ts(value)
+        elif kind == "str":
+            value = _intern(value)
+        setattr(self, slot, value)
+
+    def __delitem__(self, key: str) -> None:
+        spec = _FIELDS.get(key)
+        if spec is None:
+            if self._extra is None or key not in self._extra:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        if getattr(self, spec[0]) is _MISSING:
+            raise KeyError(key)
+        setattr(self, spec[0], _MISSING)
+
+    def __contains__(self, key: object) -> bool:
+        spec = _FIELDS.get(key)  # type: ignore[arg-type]
+        if spec is None:
+            return self._extra is not None and key in self._extra
+        return getattr(self, spec[0]) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for key in _KEY_ORDER:
+            if getattr(self, _FIELDS[key][0]) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        n = sum(1 for key in _KEY_ORDER if getattr(self, _FIELDS[key][0]) is not _MISSING)
+        return n + (len(self._extra) if self._extra else 0)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (StateRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"StateRecord({self.to_dict()!r})"
+
+    def copy(self) -> "StateRecord":
+        rec = StateRecord()
+        for slot in self.__slots__:
+            setattr(rec, slot, getattr(self, slot))
+        if self._extra is not None:
+            rec._extra = dict(self._extra)
+        return rec
+
+
+# isinstance(rec, RECORD_TYPES) — запис state (dict зі старого коду або StateRecord)
+RECORD_TYPES = (dict, StateRecord)
+
+_TS_SLOTS = {key: slot for key, (slot, kind) in _FIELDS.items() if kind == "ts"}
+
+
+def record_ts(rec: Any, key: str) -> float:
+    """
+    Epoch для first_seen_at / last_seen_at без розбору ISO (для StateRecord);
+    інші ключі і dict — розбір з тією ж семантикою, що scoring.iso_to_epoch.
+    None / помилка -> NaN.
+    """
+    slot = _TS_SLOTS.get(key)
+    if slot is not None and type(rec) is StateRecord:
+        value = getattr(rec, slot)
+        if type(value) is float:
+            return value
+        if value is _MISSING or value is None:
+            return float("nan")
+    else:
+        value = rec.get(key) if rec is not None else None
+    return parse_iso_ts(value)
+
+
+def parse_iso_ts(value: Any) -> float:
+    if not value or not isinstance(value, str):
+        return float("nan")
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return float("nan")
+
+
+def to_record(data: Any) -> Optional[StateRecord]:
+    """
+    dict з JSON -> StateRecord (None, якщо це не dict).
+    """
+    if type(data) is StateRecord:
+        return data
+    if isinstance(data, dict):
+        return StateRecord(data)
+    return None
+
+
+def record_to_dict(rec: Any) -> Dict[str, Any]:
+    return rec.to_dict() if type(rec) is StateRecord else dict(rec)
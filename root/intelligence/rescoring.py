@@ -0,0 +1,83 @@
+import heapq
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# scan_cache entries[path]["due"] — epoch, після якого score може змінитись
+# (scoring.next_score_change); None — ніколи; ключа немає — кеш старого формату, перерахувати
+
+
+class RescoreQueue:
+    """
+    Min-heap (due, path) поверх entries scan_cache: найближчий перерахунок — за O(1),
+    вибрати всі прострочені — O(k log n). Видалення ліниве: елемент вважається
+    застарілим, якщо entries[path]["due"] з ним більше не збігається.
+    """
+
+    def __init__(self, entries: Dict[str, Any]):
+        self.entries = entries
+        heap: List[Tuple[float, str]] = []
+        for path, entry in entries.items():
+            if not isinstance(entry, dict):
+                continue
+            if "due" not in entry:
+                heap.append((0.0, path))
+            elif entry["due"] is not None:
+                heap.append((float(entry["due"]), path))
+        heapq.heapify(heap)
+        self._heap = heap
+        # покоління моделі, з яким entries уже звірено (scanner.rescore_due); None — ще ні
+        self.model_gen: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _is_current(self, due: float, path: str) -> bool:
+        entry = self.entries.get(path)
+        if not isinstance(entry, dict):
+            return False
+        if "due" not in entry:
+            return due == 0.0
+        return entry["due"] is not None and float(entry["due"]) == due
+
+    def push(self, path: str, due: Optional[float]) -> None:
+        if due is not None:
+            heapq.heappush(self._heap, (float(due), path))
+
+    def next_due(self) -> Optional[float]:
+        heap = self._heap
+        while heap and not self._is_current(*heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[str]:
+        """
+        Шляхи, чий due уже минув (due < now), від найстаріших; не більше limit.
+        """
+        heap = self._heap
+        out: List[str] = []
+        seen = set()
+        while heap and heap[0][0] < now and (limit is None or len(out) < limit):
+            due, path = heapq.heappop(heap)
+            if path not in seen and self._is_current(due, path):
+                seen.add(path)
+                out.append(path)
+        return out
+
+
+# черга для останнього прочитаного / записаного scan_cache (той самий об'єкт entries)
+_queue: Optional[RescoreQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(entries: Dict[str, Any]) -> RescoreQueue:
+    """
+    Черга для entries з load_scan_cache: поки кеш той самий об'єкт (і після
+    update_scan_cache) — та сама черга, новий кеш (після сканування чи іншого
+    процесу) — черга будується заново (heapify, O(n)).
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None or _queue.entries is not entries:
+            _queue = RescoreQueue(entries)
+        return _queue
+
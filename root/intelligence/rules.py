@@ -0,0 +1,854 @@
+"""
+Правила скорингу: scoring_rules.json (або DEFAULT_RULES) -> CompiledRules.
+"""
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from intelligence.records import parse_iso_ts, record_ts
+from intelligence.sniff import TYPE_CLASS, content_class
+
+try:
+    import numpy as np
+except ImportError:  # score_batch недоступний, score / next_change працюють
+    np = None  # type: ignore[assignment]
+
+DEFAULT_RULES: Dict[str, Any] = {
+    "kinds": {
+        "temp": [".tmp", ".crdownload", ".part", ".log", ".dmp"],
+        "archive": [".zip", ".rar", ".7z"],
+        "installer": [".exe", ".msi"],
+    },
+    "overrides": [
+        {"id": "user_marked_important", "when": {"label": ["pinned", "keep"]}, "score": 0.0},
+        {"id": "temporary_extension", "when": {"kind": ["temp"]}, "score": 0.95, "reason": "temporary_extension:{ext}"},
+    ],
+    "rules": [
+        {
+            "id": "not_modified",
+            "reason": "not_modified_{age_days}d",
+            "tiers": [
+                {"when": {"age_over_days": 180}, "weight": 0.35},
+                {"when": {"age_over_days": 90}, "weight": 0.25},
+                {"when": {"age_over_days": 30}, "weight": 0.12},
+            ],
+        },
+        # "лежить на Desktop давно" (наша власна ознака)
+        {"id": "on_desktop", "when": {"seen_over_days": 14}, "weight": 0.10, "reason": "on_desktop_{seen_days}d"},
+        {"id": "old_installer", "when": {"kind": ["installer"], "age_over_days": 14}, "weight": 0.25},
+        {"id": "old_archive", "when": {"kind": ["archive"], "age_over_days": 30}, "weight": 0.18},
+        {
+            "id": "name_looks_like_duplicate",
+            "when": {"name": [r"\(\d+\)", r"\bcopy\b", r"\bfinal\b", r"\bnew\b", r"\bdownload\b"]},
+            "weight": 0.15,
+        },
+        # той самий вміст, що й в іншого файлу (це не "оригінал" групи)
+        {"id": "content_duplicate", "when": {"duplicate": True}, "weight": 0.20},
+        {
+            "id": "very_large_old_payload",
+            "when": {"kind": ["installer", "archive"], "size_over": 500 * 1024 * 1024},
+            "weight": 0.10,
+        },
+    ],
+    "fallback": "no_strong_signals",
+}
+
+# мітки, для яких OnlineModel не змінює score (BatchScores.important) — незалежно від правил
+IMPORTANT_LABELS = frozenset(("pinned", "keep"))
+
+_DAY_S = 86400.0
+# бітова маска причин у int64: overrides + rules + fallback
+_MAX_ENTRIES = 63
+
+_TIME_KEYS = {
+    "age_over_days": ("mod", True),
+    "age_under_days": ("mod", False),
+    "seen_over_days": ("seen", True),
+    "seen_under_days": ("seen", False),
+}
+_COND_KEYS = (
+    "label", "kind", "ext", "name", "duplicate",
+    *_TIME_KEYS,
+    "size_over", "size_under", "seen_count_over", "seen_count_under",
+)
+_PLACEHOLDERS = {"ext": "", "age_days": 0, "seen_days": 0}
+
+
+def _canonical(spec: Dict[str, Any]) -> str:
+    return json.dumps(spec, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+_DEFAULT_CANONICAL = _canonical(DEFAULT_RULES)
+
+
+def _norm_ext(value: Any) -> str:
+    e = str(value).strip().lower()
+    return e if not e or e.startswith(".") else "." + e
+
+
+def _str_set(value: Any, where: str) -> frozenset:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"{where}: expected a string or a non-empty list")
+    return frozenset(str(v) for v in value)
+
+
+def _number(value: Any, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where}: expected a number")
+    return float(value)
+
+
+# -------------------- name patterns --------------------
+
+class _NamePattern:
+    """
+    Патерни імені одного правила — один regex (re.I).
+    """
+
+    def __init__(self, patterns: List[str], where: str):
+        try:
+            for p in patterns:
+                re.compile(p, re.I)
+            self.source = "|".join(f"(?:{p})" for p in patterns)
+            self.regex = re.compile(self.source, re.I)
+        except re.error as e:
+            raise ValueError(f"{where}: bad name pattern: {e}") from None
+
+
+def _name_mask(cols: "_Columns", pattern: _NamePattern) -> Any:
+    """
+    pattern для всіх імен batch-у: regex правила перевіряє тільки імена, що збіглися
+    з об'єднаним regex усіх правил (CompiledRules.name_any) — один прохід на batch.
+    """
+    mask = np.zeros(cols.n, dtype=bool)
+    names = cols.names
+    search = pattern.regex.search
+    for i in np.flatnonzero(cols.name_candidates).tolist():
+        if search(names[i]):
+            mask[i] = True
+    return mask
+
+
+# -------------------- conditions --------------------
+
+class _Row:
+    """
+    Поля одного файлу в тому вигляді, в якому їх перевіряють умови.
+    """
+
+    __slots__ = ("label", "kind", "ext", "name", "dup", "size", "count", "mod", "seen", "_names")
+
+    def __init__(self, rules: "CompiledRules", file_obj: Dict[str, Any], rec: Dict[str, Any]):
+        self.ext = (file_obj.get("ext") or "").lower()
+        kind = rules.ext_kind.get(self.ext)
+        if kind is None:
+            ct = file_obj.get("content_type")
+            kind = content_class(self.ext, ct) if ct else None
+        self.kind = kind
+        self.label = rec.get("label")
+        self.name = (file_obj.get("name") or "").lower()
+        self.dup = bool(file_obj.get("duplicate_of"))
+        self.size = int(file_obj.get("size_bytes") or 0)
+        self.count = int(rec.get("seen_count") or 0)
+        self.mod = parse_iso_ts(file_obj.get("last_modified"))
+        # StateRecord тримає epoch — без повторного розбору ISO
+        self.seen = record_ts(rec, "first_seen_at")
+        # None — жоден патерн правил не збігся (один пошук об'єднаним regex)
+        any_name = rules.name_any
+        self._names: Optional[Dict[int, bool]] = {} if any_name is not None and any_name.search(self.name) else None
+
+    def name_matches(self, pattern: _NamePattern) -> bool:
+        if self._names is None:
+            return False
+        key = id(pattern)
+        hit = self._names.get(key)
+        if hit is None:
+            hit = self._names[key] = pattern.regex.search(self.name) is not None
+        return hit
+
+    def base(self, field: str) -> float:
+        return self.mod if field == "mod" else self.seen
+
+
+# -------------------- перевірки однієї умови (_Cond._compile) --------------------
+
+def _label_in(values: frozenset) -> Callable[[_Row], bool]:
+    return lambda r: r.label in values
+
+
+def _kind_in(values: frozenset) -> Callable[[_Row], bool]:
+    return lambda r: r.kind in values
+
+
+def _ext_in(values: frozenset) -> Callable[[_Row], bool]:
+    return lambda r: r.ext in values
+
+
+def _size_over(limit: float) -> Callable[[_Row], bool]:
+    return lambda r: r.size > limit
+
+
+def _size_under(limit: float) -> Callable[[_Row], bool]:
+    return lambda r: r.size < limit
+
+
+def _count_over(limit: float) -> Callable[[_Row], bool]:
+    return lambda r: r.count > limit
+
+
+def _count_under(limit: float) -> Callable[[_Row], bool]:
+    return lambda r: r.count < limit
+
+
+def _is_dup(r: _Row) -> bool:
+    return r.dup
+
+
+def _not_dup(r: _Row) -> bool:
+    return not r.dup
+
+
+def _name_match(pattern: "_NamePattern") -> Callable[[_Row], bool]:
+    return lambda r: r.name_matches(pattern)
+
+
+# (поле, "старше ніж") -> перевірка порогу часу; NaN не проходить жодну
+_TIME_CHECKS: Dict[Tuple[str, bool], Callable[[float], Callable[[_Row, float], bool]]] = {
+    ("mod", True): lambda seconds: lambda r, now: r.mod < now - seconds,
+    ("mod", False): lambda seconds: lambda r, now: r.mod > now - seconds,
+    ("seen", True): lambda seconds: lambda r, now: r.seen < now - seconds,
+    ("seen", False): lambda seconds: lambda r, now: r.seen > now - seconds,
+}
+
+
+class _Cond:
+    """
+    Скомпільоване "when": статична частина (від часу не залежить) і пороги часу.
+    """
+
+    def __init__(self, raw: Any, kinds: Dict[str, frozenset], where: str):
+        if not isinstance(raw, dict):
+            raise ValueError(f"{where}: 'when' must be an object")
+        unknown = sorted(set(raw) - set(_COND_KEYS))
+        if unknown:
+            raise ValueError(f"{where}: unknown condition {', '.join(unknown)}")
+        self.labels = _str_set(raw["label"], f"{where}.label") if "label" in raw else None
+        self.kinds = _str_set(raw["kind"], f"{where}.kind") if "kind" in raw else None
+        if self.kinds is not None:
+            missing = sorted(self.kinds - set(kinds) - set(TYPE_CLASS.values()))
+            if missing:
+                raise ValueError(f"{where}.kind: unknown kind {', '.join(missing)}")
+        self.exts = frozenset(map(_norm_ext, _str_set(raw["ext"], f"{where}.ext"))) if "ext" in raw else None
+        self.name: Optional[_NamePattern] = None
+        if "name" in raw:
+            patterns = [raw["name"]] if isinstance(raw["name"], str) else raw["name"]
+            if not isinstance(patterns, list) or not patterns:
+                raise ValueError(f"{where}.name: expected a pattern or a non-empty list")
+            patterns = [str(p) for p in patterns]
+            self.name = _NamePattern(patterns, f"{where}.name")
+        self.duplicate: Optional[bool] = None
+        if "duplicate" in raw:
+            if not isinstance(raw["duplicate"], bool):
+                raise ValueError(f"{where}.duplicate: expected true / false")
+            self.duplicate = raw["duplicate"]
+        # (поле "mod" | "seen", True = "старше ніж", секунди)
+        self.times: List[Tuple[str, bool, float]] = [
+            (field, over, _number(raw[key], f"{where}.{key}") * _DAY_S)
+            for key, (field, over) in _TIME_KEYS.items()
+            if key in raw
+        ]
+        self.size_over = _number(raw["size_over"], f"{where}.size_over") if "size_over" in raw else None
+        self.size_under = _number(raw["size_under"], f"{where}.size_under") if "size_under" in raw else None
+        self.count_over = _number(raw["seen_count_over"], f"{where}.seen_count_over") if "seen_count_over" in raw else None
+        self.count_under = _number(raw["seen_count_under"], f"{where}.seen_count_under") if "seen_count_under" in raw else None
+        self.static, self.test = self._compile()
+
+    @property
+    def uses_seen_count(self) -> bool:
+        return self.count_over is not None or self.count_under is not None
+
+    # -------------------- один файл --------------------
+
+    def _compile(self) -> Tuple[Callable[[_Row], bool], Callable[[_Row, float], bool]]:
+        """
+        (static(row), test(row, now)) — замикання над кортежем перевірок, що є в умові:
+        без циклу по всіх ключах на кожен файл.
+        "Старше ніж d днів" == epoch < now - d; NaN (невідомо) не проходить жодну умову.
+        """
+        checks: List[Callable[[_Row], bool]] = []
+        for attr, make in (
+            ("labels", _label_in),
+            ("kinds", _kind_in),
+            ("exts", _ext_in),
+            ("size_over", _size_over),
+            ("size_under", _size_under),
+            ("count_over", _count_over),
+            ("count_under", _count_under),
+        ):
+            value = getattr(self, attr)
+            if value is not None:
+                checks.append(make(value))
+        if self.duplicate is not None:
+            checks.append(_is_dup if self.duplicate else _not_dup)
+        # ім'я — найдорожче, останнім
+        if self.name is not None:
+            checks.append(_name_match(self.name))
+        static_checks = tuple(checks)
+        timed_checks = tuple(_TIME_CHECKS[field, over](seconds) for field, over, seconds in self.times)
+
+        def static(r: _Row) -> bool:
+            for check in static_checks:
+                if not check(r):
+                    return False
+            return True
+
+        def test(r: _Row, now: float) -> bool:
+            for check in static_checks:
+                if not check(r):
+                    return False
+            for timed in timed_checks:
+                if not timed(r, now):
+                    return False
+            return True
+
+        return static, test
+
+    def thresholds(self, row: _Row) -> List[float]:
+        # моменти, коли test() для цього файлу перемикається
+        out = []
+        for field, _over, seconds in self.times:
+            t = row.base(field)
+            if t == t:
+                out.append(t + seconds)
+        return out
+
+    # -------------------- batch --------------------
+
+    def static_mask(self, cols: "_Columns") -> Any:
+        m = np.ones(cols.n, dtype=bool)
+        if self.labels is not None:
+            m &= cols.memo(("label", self.labels), lambda: np.fromiter(
+                map(self.labels.__contains__, cols.labels), dtype=bool, count=cols.n))
+        if self.kinds is not None:
+            m &= cols.memo(("kind", self.kinds), lambda: np.isin(cols.kinds, cols.rules.kind_codes(self.kinds)))
+        if self.exts is not None:
+            m &= cols.memo(("ext", self.exts), lambda: np.fromiter(
+                map(self.exts.__contains__, cols.exts), dtype=bool, count=cols.n))
+        if self.duplicate is not None:
+            m &= cols.dups if self.duplicate else ~cols.dups
+        if self.size_over is not None:
+            m &= cols.sizes > self.size_over
+        if self.size_under is not None:
+            m &= cols.sizes < self.size_under
+        if self.count_over is not None:
+            m &= cols.counts > self.count_over
+        if self.count_under is not None:
+            m &= cols.counts < self.count_under
+        if self.name is not None:
+            m &= cols.memo(("name", self.name.source), lambda: _name_mask(cols, self.name))
+        return m
+
+    def timed_mask(self, cols: "_Columns") -> Any:
+        m = np.ones(cols.n, dtype=bool)
+        for field, over, seconds in self.times:
+            base = cols.base(field)
+            cut = cols.now - seconds
+            m &= base < cut if over else base > cut
+        return m
+
+
+class _Columns:
+    """
+    Колонки score_batch; дорогі (імена, розміри, лічильники) готуються тільки якщо їх
+    питає якась умова, маски спільних умов рахуються раз на batch.
+    """
+
+    def __init__(self, rules: "CompiledRules", n: int, now: float, raw: Dict[str, Any]):
+        self.rules = rules
+        self.n = n
+        self.now = now
+        self._raw = raw
+        self._memo: Dict[Any, Any] = {}
+
+    def memo(self, key: Any, compute: Callable[[], Any]) -> Any:
+        m = self._memo.get(key)
+        if m is None:
+            m = self._memo[key] = compute()
+        return m
+
+    def base(self, field: str) -> Any:
+        return self.mtimes if field == "mod" else self.first_seen
+
+    @property
+    def labels(self) -> Sequence[Optional[str]]:
+        return self._raw["labels"]
+
+    @cached_property
+    def exts(self) -> List[str]:
+        return [(e or "").lower() for e in self._raw["exts"]]
+
+    @cached_property
+    def kinds(self) -> Any:
+        rules, exts = self.rules, self.exts
+        codes = np.fromiter(map(rules.ext_codes.get, exts, repeat(0)), dtype=np.int16, count=self.n)
+        content_types = self._raw["content_types"]
+        if content_types is not None:
+            # у steady state майже всі None — Python-цикл тільки по відомих типах
+            for i, ct in enumerate(content_types):
+                if ct and not codes[i]:
+                    cls = content_class(exts[i], ct)
+                    if cls:
+                        codes[i] = rules.kind_index[cls]
+        return codes
+
+    @cached_property
+    def names(self) -> List[str]:
+        return [(x or "").lower() for x in self._raw["names"]]
+
+    @cached_property
+    def name_candidates(self) -> Any:
+        # імена зі збігом хоч одного патерну правил (name_any)
+        any_name = self.rules.name_any
+        if any_name is None:
+            return np.zeros(self.n, dtype=bool)
+        search = any_name.search
+        return np.fromiter((search(x) is not None for x in self.names), dtype=bool, count=self.n)
+
+    @cached_property
+    def sizes(self) -> Any:
+        sizes, n = self._raw["sizes"], self.n
+        try:
+            return np.asarray(sizes, dtype=np.int64).reshape(n)
+        except (TypeError, ValueError):
+            return np.fromiter((int(x or 0) for x in sizes), dtype=np.int64, count=n)
+
+    @cached_property
+    def counts(self) -> Any:
+        counts = self._raw["seen_counts"]
+        if counts is None:
+            return np.zeros(self.n, dtype=np.int64)
+        return np.fromiter((int(c or 0) for c in counts), dtype=np.int64, count=self.n)
+
+    @cached_property
+    def dups(self) -> Any:
+        dups = self._raw["content_dups"]
+        if dups is None:
+            return np.zeros(self.n, dtype=bool)
+        return np.fromiter(map(bool, dups), dtype=bool, count=self.n)
+
+    @cached_property
+    def mtimes(self) -> Any:
+        return np.asarray(self._raw["mtimes"], dtype=np.float64).reshape(self.n)
+
+    @cached_property
+    def first_seen(self) -> Any:
+        return np.asarray(self._raw["first_seen"], dtype=np.float64).reshape(self.n)
+
+
+# -------------------- rules --------------------
+
+@dataclass
+class _Entry:
+    """
+    Override (score — фінальний) або правило (tiers — [(умова, вага)], перший збіг).
+    """
+    id: str
+    reason: str
+    bit: int
+    tiers: List[Tuple[_Cond, float]]
+    score: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        self.templated = "{" in self.reason
+
+    def format(self, ext: str, days_mod: float, days_seen: float) -> str:
+        if not self.templated:
+            return self.reason
+        return self.reason.format(
+            ext=ext,
+            age_days=int(days_mod) if days_mod == days_mod else "?",
+            seen_days=int(days_seen) if days_seen == days_seen else "?",
+        )
+
+
+def _days(now: float, t: float) -> float:
+    return (now - t) / _DAY_S
+
+
+@dataclass
+class BatchScores:
+    """
+    Результат score_batch: паралельні масиви.
+    codes — бітова маска правил (CompiledRules), days_* — для тексту причин (not_modified_XXd і т.п.).
+    next_change — як next_change (inf замість None).
+    name_hits — спрацювало правило з умовою на ім'я; important — мітка з IMPORTANT_LABELS.
+    """
+    scores: Any
+    codes: Any
+    days_mod: Any
+    days_first_seen: Any
+    exts: Sequence[str]
+    next_change: Any = None
+    name_hits: Any = None
+    important: Any = None
+    rules: Any = None
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def due(self, i: int) -> Optional[float]:
+        if self.next_change is None:
+            return None
+        t = float(self.next_change[i])
+        return None if t == float("inf") else t
+
+    def reasons(self, i: int) -> List[str]:
+        rules = self.rules if self.rules is not None else get_rules()
+        return rules.reasons(
+            int(self.codes[i]),
+            float(self.days_mod[i]),
+            float(self.days_first_seen[i]),
+            self.exts[i],
+        )
+
+    def all_reasons(self) -> List[List[str]]:
+        return [self.reasons(i) for i in range(len(self.scores))]
+
+
+class CompiledRules:
+    """
+    Опис правил (формат — як у DEFAULT_RULES, умови "when" — _COND_KEYS), скомпільований для score / score_batch.
+    ValueError — опис некоректний.
+
+    fingerprint — "" для DEFAULT_RULES, інакше хеш опису: score-и, пораховані іншими
+    правилами, у scan_cache не переносяться.
+    """
+
+    def __init__(self, spec: Dict[str, Any], source: Optional[str] = None):
+        if not isinstance(spec, dict):
+            raise ValueError("scoring rules: expected a JSON object")
+        unknown = sorted(set(spec) - set(DEFAULT_RULES))
+        if unknown:
+            raise ValueError(f"scoring rules: unknown key {', '.join(unknown)}")
+        spec = {**DEFAULT_RULES, **spec}
+        self.spec = spec
+        self.source = source
+        self.error: Optional[str] = None
+        canonical = _canonical(spec)
+        self.fingerprint = "" if canonical == _DEFAULT_CANONICAL else hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+        raw_kinds = spec["kinds"]
+        if not isinstance(raw_kinds, dict):
+            raise ValueError("kinds: expected an object")
+        kinds = {str(k): frozenset(map(_norm_ext, _str_set(v, f"kinds.{k}"))) for k, v in raw_kinds.items()}
+        # ext -> вид: перший вид зі списку, що містить ext
+        self.ext_kind: Dict[str, str] = {}
+        for kind, exts in kinds.items():
+            for e in sorted(exts):
+                self.ext_kind.setdefault(e, kind)
+        # коди видів для score_batch (0 — без виду); класи intelligence.sniff — теж види
+        names = list(kinds) + sorted(set(TYPE_CLASS.values()) - set(kinds))
+        self.kind_index = {k: i + 1 for i, k in enumerate(names)}
+        self.ext_codes = {e: self.kind_index[k] for e, k in self.ext_kind.items()}
+
+        self.overrides = [self._entry(raw, kinds, f"overrides[{i}]", override=True) for i, raw in enumerate(_list(spec, "overrides"))]
+        self.rules = [self._entry(raw, kinds, f"rules[{i}]", override=False) for i, raw in enumerate(_list(spec, "rules"))]
+        entries = self.overrides + self.rules
+        if len(entries) + 1 > _MAX_ENTRIES:
+            raise ValueError(f"scoring rules: at most {_MAX_ENTRIES - 1} overrides + rules")
+        for bit, entry in enumerate(entries):
+            entry.bit = 1 << bit
+        self.fallback = str(spec["fallback"])
+        self.fallback_bit = 1 << len(entries)
+        self._override_bits = sum(e.bit for e in self.overrides)
+
+        conds = [c for e in entries for c, _w in e.tiers]
+        patterns = [c.name for c in conds if c.name is not None]
+        # один regex на всі патерни імен: якщо він не знайшов нічого — жодне правило з name не спрацює
+        self.name_any = re.compile("|".join(f"(?:{p.source})" for p in patterns), re.I) if patterns else None
+        # score залежить від seen_count, який росте з кожним скануванням, — кешувати score не можна
+        self.volatile = any(c.uses_seen_count for c in conds)
+
+    @staticmethod
+    def _entry(raw: Any, kinds: Dict[str, frozenset], where: str, override: bool) -> _Entry:
+        if not isinstance(raw, dict) or not raw.get("id"):
+            raise ValueError(f"{where}: expected an object with 'id'")
+        allowed = {"id", "when", "reason"} | ({"score"} if override else {"weight", "tiers"})
+        unknown = sorted(set(raw) - allowed)
+        if unknown:
+            raise ValueError(f"{where}: unknown key {', '.join(unknown)}")
+        where = f"{where} ({raw['id']})"
+        reason = str(raw.get("reason") or raw["id"])
+        try:
+            reason.format(**_PLACEHOLDERS)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"{where}.reason: bad placeholder {e}") from None
+        when = raw.get("when", {})
+        if not isinstance(when, dict):
+            raise ValueError(f"{where}: 'when' must be an object")
+
+        if override:
+            score = _number(raw.get("score"), f"{where}.score")
+            return _Entry(str(raw["id"]), reason, 0, [(_Cond(when, kinds, where), 0.0)], score=score)
+
+        if "tiers" in raw:
+            tiers_raw = raw["tiers"]
+            if "weight" in raw or not isinstance(tiers_raw, list) or not tiers_raw:
+                raise ValueError(f"{where}: 'tiers' must be a non-empty list (without 'weight')")
+            tiers = []
+            for j, tier in enumerate(tiers_raw):
+                tw = f"{where}.tiers[{j}]"
+                if not isinstance(tier, dict) or set(tier) - {"when", "weight"}:
+                    raise ValueError(f"{tw}: expected {{'when', 'weight'}}")
+                # умова рівня доповнює (і перекриває) спільну умову правила
+                tiers.append((_Cond({**when, **tier.get("when", {})}, kinds, tw), _number(tier.get("weight"), f"{tw}.weight")))
+        else:
+            tiers = [(_Cond(when, kinds, where), _number(raw.get("weight"), f"{where}.weight"))]
+        return _Entry(str(raw["id"]), reason, 0, tiers)
+
+    def kind_codes(self, kinds: frozenset) -> List[int]:
+        return [self.kind_index[k] for k in kinds if k in self.kind_index]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "source": self.source or "default",
+            "fingerprint": self.fingerprint,
+            "overrides": len(self.overrides),
+            "rules": len(self.rules),
+            "error": self.error,
+        }
+
+    # -------------------- один файл --------------------
+
+    def score(self, file_obj: Dict[str, Any], rec: Dict[str, Any], now: float) -> Tuple[float, List[str]]:
+        """
+        (score 0..1, reasons[]) для файлу на момент now (epoch seconds).
+        """
+        row = _Row(self, file_obj, rec)
+        for entry in self.overrides:
+            if entry.tiers[0][0].test(row, now):
+                return entry.score, [entry.format(row.ext, _days(now, row.mod), _days(now, row.seen))]  # type: ignore[list-item]
+
+        score = 0.0
+        reasons: List[str] = []
+        for entry in self.rules:
+            for cond, weight in entry.tiers:
+                if cond.test(row, now):
+                    score += weight
+                    reasons.append(entry.format(row.ext, _days(now, row.mod), _days(now, row.seen)) if entry.templated else entry.reason)
+                    break
+
+        score = max(0.0, min(1.0, score))
+        if not reasons:
+            reasons.append(self.fallback)
+        return score, reasons
+
+    def next_change(self, file_obj: Dict[str, Any], rec: Dict[str, Any], now: float) -> Optional[float]:
+        """
+        Epoch seconds, після якого score для тих самих file_obj / rec може стати іншим:
+        найближчий ще не пройдений поріг часу з правил, чия решта умов виконується.
+        None — score від часу вже не залежить.
+        """
+        row = _Row(self, file_obj, rec)
+        candidates: List[float] = []
+        for entry in self.overrides:
+            cond = entry.tiers[0][0]
+            if not cond.static(row):
+                continue
+            candidates.extend(cond.thresholds(row))
+            if cond.test(row, now):
+                return _earliest(candidates, now)
+        for entry in self.rules:
+            for cond, _w in entry.tiers:
+                if cond.static(row):
+                    candidates.extend(cond.thresholds(row))
+        return _earliest(candidates, now)
+
+    def reasons(self, code: int, days_mod: float, days_first_seen: float, ext: str) -> List[str]:
+        """
+        Бітова маска -> reasons[] у тому ж порядку, що повертає score.
+        """
+        if code & self._override_bits:
+            entry = next(e for e in self.overrides if code & e.bit)
+            return [entry.format(ext, days_mod, days_first_seen)]
+        reasons = [e.format(ext, days_mod, days_first_seen) for e in self.rules if code & e.bit]
+        if code & self.fallback_bit:
+            reasons.append(self.fallback)
+        return reasons
+
+    # -------------------- batch --------------------
+
+    def score_batch(
+        self,
+        exts: Sequence[Optional[str]],
+        sizes: Sequence[Any],
+        mtimes: Sequence[float],
+        first_seen: Sequence[float],
+        labels: Sequence[Optional[str]],
+        names: Sequence[Optional[str]],
+        now: float,
+        content_dups: Optional[Sequence[bool]] = None,
+        content_types: Optional[Sequence[Optional[str]]] = None,
+        seen_counts: Optional[Sequence[Any]] = None,
+    ) -> BatchScores:
+        """
+        score / next_change для колонок однакової довжини (див. scoring.score_batch).
+        """
+        if np is None:
+            raise RuntimeError("score_batch requires numpy")
+        n = len(exts)
+        cols = _Columns(self, n, now, {
+            "exts": exts, "sizes": sizes, "mtimes": mtimes, "first_seen": first_seen, "labels": labels,
+            "names": names, "content_dups": content_dups, "content_types": content_types, "seen_counts": seen_counts,
+        })
+        next_change = np.full(n, np.inf)
+
+        def _push_thresholds(cond: _Cond, where: Any) -> None:
+            # NaN >= now == False
+            for field, _over, seconds in cond.times:
+                t = cols.base(field) + seconds
+                np.minimum(next_change, t, out=next_change, where=where & (t >= now))
+
+        # overrides: перший збіг перебиває все; пороги — тільки до нього (як у next_change)
+        decided = np.zeros(n, dtype=bool)
+        override_score = np.zeros(n, dtype=np.float64)
+        override_code = np.zeros(n, dtype=np.int64)
+        for entry in self.overrides:
+            cond = entry.tiers[0][0]
+            st = cond.static_mask(cols) & ~decided
+            if not st.any():
+                continue
+            _push_thresholds(cond, st)
+            hit = st & cond.timed_mask(cols) if cond.times else st
+            override_score[hit] = entry.score
+            override_code[hit] = entry.bit
+            decided |= hit
+
+        score = np.zeros(n, dtype=np.float64)
+        codes = np.zeros(n, dtype=np.int64)
+        name_hits = np.zeros(n, dtype=bool)
+        for entry in self.rules:
+            taken = np.zeros(n, dtype=bool)
+            for cond, weight in entry.tiers:
+                st = cond.static_mask(cols)
+                _push_thresholds(cond, st & ~decided)
+                m = st & ~taken
+                if cond.times:
+                    m &= cond.timed_mask(cols)
+                if m.any():
+                    # той самий порядок додавань, що й у score (+0.0 точний)
+                    score += np.where(m, weight, 0.0)
+                    taken |= m
+                if cond.name is not None:
+                    name_hits |= m
+            codes |= np.where(taken, entry.bit, 0)
+
+        np.clip(score, 0.0, 1.0, out=score)
+        codes |= np.where(codes == 0, self.fallback_bit, 0)
+        score[decided] = override_score[decided]
+        codes[decided] = override_code[decided]
+        name_hits &= ~decided
+
+        mtimes_arr = cols.mtimes
+        first_seen_arr = cols.first_seen
+        return BatchScores(
+            scores=score,
+            codes=codes,
+            days_mod=(now - mtimes_arr) / _DAY_S,
+            days_first_seen=(now - first_seen_arr) / _DAY_S,
+            exts=cols.exts,
+            next_change=next_change,
+            name_hits=name_hits,
+            important=np.fromiter(map(IMPORTANT_LABELS.__contains__, labels), dtype=bool, count=n),
+            rules=self,
+        )
+
+
+def _list(spec: Dict[str, Any], key: str) -> List[Any]:
+    value = spec[key]
+    if not isinstance(value, list):
+        raise ValueError(f"{key}: expected a list")
+    return value
+
+
+def _earliest(candidates: List[float], now: float) -> Optional[float]:
+    future = [c for c in candidates if c >= now]
+    return min(future) if future else None
+
+
+# -------------------- loading --------------------
+
+def load_rules(path: Optional[Any] = None) -> CompiledRules:
+    """
+    scoring_rules.json з папки додатку (або path). Файлу немає — DEFAULT_RULES;
+    битий / некоректний — теж DEFAULT_RULES, а текст помилки — у .error (info()).
+    """
+    if path is None:
+        try:
+            from intelligence.storage.paths import get_scoring_rules_path  # type: ignore
+
+            path = get_scoring_rules_path()
+        except Exception:
+            return CompiledRules(DEFAULT_RULES)
+    try:
+        if not path.exists():
+            return CompiledRules(DEFAULT_RULES)
+        return CompiledRules(json.loads(path.read_text(encoding="utf-8")), source=str(path))
+    except Exception as e:
+        rules = CompiledRules(DEFAULT_RULES)
+        rules.error = f"{path}: {e}"
+        return rules
+
+
+_rules: Optional[CompiledRules] = None
+_rules_stamp: Any = None
+_rules_lock = threading.Lock()
+
+
+def _stamp() -> Any:
+    try:
+        from intelligence.storage.paths import get_scoring_rules_path  # type: ignore
+
+        st = get_scoring_rules_path().stat()
+        return st.st_mtime_ns, st.st_size
+    except Exception:
+        return None
+
+
+def get_rules() -> CompiledRules:
+    """
+    Правила процесу: компілюються при першому виклику; перечитування — refresh_rules.
+    """
+    rules = _rules
+    return rules if rules is not None else refresh_rules()
+
+
+def refresh_rules() -> CompiledRules:
+    """
+    Перекомпілювати, якщо scoring_rules.json змінився (один stat) — на початку сканування /
+    перерахунку, а не на кожен файл.
+    """
+    global _rules, _rules_stamp
+    with _rules_lock:
+        stamp = _stamp()
+        if _rules is None or stamp != _rules_stamp:
+            _rules = load_rules()
+            _rules_stamp = stamp
+        return _rules
+
+
+def set_rules(rules: Optional[CompiledRules]) -> None:
+    """
+    Підміна правил (None — скомпілювати з scoring_rules.json при наступному get_rules).
+    """
+    global _rules, _rules_stamp
+    with _rules_lock:
+        _rules = rules
+        _rules_stamp = _stamp()
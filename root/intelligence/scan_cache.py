@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from intelligence.storage.atomic import FileLock, atomic_write_text
+from intelligence.storage.paths import get_scan_cache_path
+
+# 2 — клас за вмістом тільки для sniff.UNKNOWN_EXT: старі score-и (old_archive для .dotx і т.п.) не переносяться
+SCAN_CACHE_VERSION = 2
+
+# журнал update_scan_cache зливається в кеш (повний запис), коли рядків у ньому більше
+# за цю частку entries і за JOURNAL_MIN_LINES: далі повторювати його при кожному читанні дорожче
+JOURNAL_FOLD_RATIO = 0.25
+JOURNAL_MIN_LINES = 1000
+
+# останній прочитаний/записаний кеш цього процесу:
+# (path, mtime_ns, підпис журналу, cache, рядків у журналі — None, якщо журналу немає / він не до цього кешу)
+_memo: Optional[Tuple[str, int, Optional[Tuple[int, int]], Dict[str, Any], Optional[int]]] = None
+# _memo і записи кешу між потоками процесу (rescore у пулі, сканування); між процесами — FileLock
+_lock = threading.RLock()
+
+
+def _empty_cache() -> Dict[str, Any]:
+    return {"version": SCAN_CACHE_VERSION, "entries": {}}
+
+
+def make_fingerprint(inode: int, size: int, mtime_ns: int) -> List[int]:
+    """
+    Відбиток файлу: (inode, size, mtime_ns).
+    Список, а не tuple — щоб однаково порівнювався після JSON round-trip.
+    """
+    return [int(inode), int(size), int(mtime_ns)]
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+
+def _lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+def _stat_sig(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _replay_journal(path: Path, cache: Dict[str, Any]) -> Optional[int]:
+    """
+    Журнал update_scan_cache: перший рядок {"base": id кешу}, далі [path, entry] — по рядку на запис.
+    Журнал від іншого (старшого) кешу ігнорується; обірваний останній рядок — теж.
+    Повертає кількість застосованих рядків або None, якщо журналу немає / він не до цього кешу.
+    """
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except Exception:
+        header = None
+    if not isinstance(header, dict) or cache.get("id") is None or header.get("base") != cache.get("id"):
+        return None
+
+    entries = cache["entries"]
+    applied = 0
+    for line in lines[1:]:
+        try:
+            p, entry = json.loads(line)
+        except Exception:
+            continue
+        if isinstance(entry, dict):
+            entries[p] = entry
+            applied += 1
+    return applied
+
+
+def load_scan_cache() -> Dict[str, Any]:
+    """
+    Кеш попереднього сканування:
+      entries[path] = {"fp": [...], "file": {...}, "score": float, "reasons": [...], "label": str|None}
+    разом із записами, дописаними в журнал (update_scan_cache).
+    Якщо файл битий або іншої версії — порожній кеш (повний rescan).
+    Повторні виклики в тому ж процесі не читають диск, поки файл і журнал не змінились.
+    Повернений dict не можна змінювати — лише читати (зміни — через update_scan_cache).
+    """
+    global _memo
+    with _lock:
+        path = get_scan_cache_path()
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return _empty_cache()
+
+        journal = _journal_path(path)
+        journal_sig = _stat_sig(journal)
+        if _memo is not None and _memo[:3] == (str(path), mtime_ns, journal_sig):
+            return _memo[3]
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict) or data.get("version") != SCAN_CACHE_VERSION:
+                return _empty_cache()
+            if not isinstance(data.get("entries"), dict):
+                data["entries"] = {}
+        except Exception:
+            return _empty_cache()
+
+        journal_lines = _replay_journal(journal, data) if journal_sig is not None else None
+        _memo = (str(path), mtime_ns, journal_sig, data, journal_lines)
+        return data
+
+
+def save_scan_cache(cache: Dict[str, Any]) -> None:
+    """
+    Весь кеш одним файлом (після сканування). Журнал update_scan_cache
+    після цього не потрібен: новий id кешу робить старий журнал недійсним.
+    """
+    path = get_scan_cache_path()
+    with _lock, FileLock(_lock_path(path)):
+        _save_locked(path, cache)
+
+
+def _save_locked(path: Path, cache: Dict[str, Any]) -> None:
+    global _memo
+    cache.setdefault("version", SCAN_CACHE_VERSION)
+    cache["id"] = f"{time.time_ns():x}"
+    # без indent: кеш читає тільки сканер, а розмір важливий на великих Desktop-ах.
+    # Атомарно і під FileLock (GUI і cli.py можуть писати одночасно), але без fsync: кеш можна перебудувати
+    atomic_write_text(path, _dumps(cache), fsync=False)
+    journal = _journal_path(path)
+    try:
+        journal.unlink()
+    except OSError:
+        pass
+
+    try:
+        _memo = (str(path), path.stat().st_mtime_ns, None, cache, None)
+    except OSError:
+        _memo = None
+
+
+def update_scan_cache(updates: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Записати змінені entries (path -> entry) без переписування всього кешу:
+    вони дописуються в журнал поруч (scan_cache.json.journal) і одразу видні
+    в dict, який повертає load_scan_cache (той самий об'єкт — черга rescoring
+    лишається прив'язаною до нього). Коли журнал виростає до частки кешу
+    JOURNAL_FOLD_RATIO, кеш переписується цілком.
+    """
+    global _memo
+    if not updates:
+        return
+    path = get_scan_cache_path()
+    # під FileLock: load бачить журнал і кеш, дописані іншим процесом, і дописує після них
+    with _lock, FileLock(_lock_path(path)):
+        cache = load_scan_cache()
+        cache["entries"].update(updates)
+        memo = _memo
+        if memo is None or memo[3] is not cache or cache.get("id") is None:
+            # кешу на диску немає або він старого формату (без id) — тільки цілком
+            _save_locked(path, cache)
+            return
+
+        journal_lines = memo[4]
+        total = (journal_lines or 0) + len(updates)
+        if total > max(JOURNAL_MIN_LINES, len(cache["entries"]) * JOURNAL_FOLD_RATIO):
+            _save_locked(path, cache)
+            return
+
+        journal = _journal_path(path)
+        text = "".join(_dumps([p, entry]) + "\n" for p, entry in updates.items())
+        if journal_lines is None:
+            # журналу ще немає (або він від іншого кешу) — новий, з id поточного кешу
+            with journal.open("w", encoding="utf-8") as fh:
+                fh.write(_dumps({"base": cache["id"]}) + "\n" + text)
+        else:
+            with journal.open("a", encoding="utf-8") as fh:
+                fh.write(text)
+        _memo = (memo[0], memo[1], _stat_sig(journal), cache, total)
@@ -1,94 +1,126 @@
-import re
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
-
-TEMP_EXT = {".tmp", ".crdownload", ".part", ".log", ".dmp"}
-ARCHIVE_EXT = {".zip", ".rar", ".7z"}
-INSTALLER_EXT = {".exe", ".msi"}
-
-DUP_PATTERNS = [
-    re.compile(r"\(\d+\)"),  # file (1).txt
-    re.compile(r"\bcopy\b", re.I),
-    re.compile(r"\bfinal\b", re.I),
-    re.compile(r"\bnew\b", re.I),
-    re.compile(r"\bdownload\b", re.I),
-]
-
-
-def _days_between(now: datetime, iso_str: str | None) -> float | None:
-    if not iso_str or not isinstance(iso_str, str):
-        return None
-    try:
-        dt = datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return (now - dt).total_seconds() / 86400.0
-    except Exception:
-        return None
-
-
-def score_file(file_obj: Dict[str, Any], rec: Dict[str, Any]) -> Tuple[float, List[str]]:
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from intelligence.records import parse_iso_ts, record_ts
+from intelligence.rules import BatchScores, CompiledRules, get_rules
+
+try:
+    import numpy as np
+except ImportError:  # score_batch недоступний, score_file працює
+    np = None  # type: ignore[assignment]
+
+# Самі правила (пороги віку, розширення, патерни імен, ваги) — в intelligence.rules:
+# DEFAULT_RULES або scoring_rules.json, скомпільовані один раз (get_rules / refresh_rules).
+
+
+def score_file(
+    file_obj: Dict[str, Any],
+    rec: Dict[str, Any],
+    rules: Optional[CompiledRules] = None,
+) -> Tuple[float, List[str]]:
     """
     Baseline скоринг (0..1) без reliance на last_access.
     Повертає (score, reasons[]).
     """
-    now = datetime.now(timezone.utc)
-
-    name = (file_obj.get("name") or "").lower()
-    ext = (file_obj.get("ext") or "").lower()
-    size = int(file_obj.get("size_bytes") or 0)
-
-    label = rec.get("label")
-    if label in ("pinned", "keep"):
-        return 0.0, ["user_marked_important"]
-
-    reasons: List[str] = []
-    score = 0.0
-
-    days_mod = _days_between(now, file_obj.get("last_modified"))
-    days_first_seen = _days_between(now, rec.get("first_seen_at"))
-
-    # 1) дуже сильні сигнали
-    if ext in TEMP_EXT:
-        return 0.95, [f"temporary_extension:{ext}"]
-
-    # 2) “давно не змінювався”
-    if days_mod is not None and days_mod > 180:
-        score += 0.35
-        reasons.append(f"not_modified_{int(days_mod)}d")
-    elif days_mod is not None and days_mod > 90:
-        score += 0.25
-        reasons.append(f"not_modified_{int(days_mod)}d")
-    elif days_mod is not None and days_mod > 30:
-        score += 0.12
-        reasons.append(f"not_modified_{int(days_mod)}d")
-
-    # 3) “лежить на Desktop давно” (наша власна ознака)
-    if days_first_seen is not None and days_first_seen > 14:
-        score += 0.10
-        reasons.append(f"on_desktop_{int(days_first_seen)}d")
-
-    # 4) інсталятори/архіви з давністю
-    if ext in INSTALLER_EXT and (days_mod is not None and days_mod > 14):
-        score += 0.25
-        reasons.append("old_installer")
-
-    if ext in ARCHIVE_EXT and (days_mod is not None and days_mod > 30):
-        score += 0.18
-        reasons.append("old_archive")
-
-    # 5) підозріла назва (копії/версії)
-    if any(p.search(name) for p in DUP_PATTERNS):
-        score += 0.15
-        reasons.append("name_looks_like_duplicate")
-
-    # 6) великі payload-и (слабкий сигнал)
-    if size > 500 * 1024 * 1024 and (ext in (INSTALLER_EXT | ARCHIVE_EXT)):
-        score += 0.10
-        reasons.append("very_large_old_payload")
-
-    score = max(0.0, min(1.0, score))
-    if not reasons:
-        reasons.append("no_strong_signals")
-
-    return score, reasons
+    now = datetime.now(timezone.utc).timestamp()
+    return (rules or get_rules()).score(file_obj, rec, now)
+
+
+def next_score_change(
+    file_obj: Dict[str, Any],
+    rec: Dict[str, Any],
+    now: Optional[float] = None,
+    rules: Optional[CompiledRules] = None,
+) -> Optional[float]:
+    """
+    Epoch seconds, після якого score_file для тих самих file_obj / rec може дати
+    інший результат: найближчий поріг віку з правил, який ще не пройдено.
+    None — score від часу вже не залежить (pinned/keep, temp-розширення,
+    усі пороги позаду). Зміни самого файлу / мітки сюди не входять — їх ловить відбиток.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc).timestamp()
+    return (rules or get_rules()).next_change(file_obj, rec, now)
+
+
+# -------------------- batch scoring --------------------
+
+def iso_to_epoch(iso_str: str | None) -> float:
+    """
+    ISO -> epoch seconds (naive час вважається UTC). None/помилка -> NaN.
+    """
+    return parse_iso_ts(iso_str)
+
+
+def reasons_from_code(
+    code: int,
+    days_mod: float,
+    days_first_seen: float,
+    ext: str,
+    rules: Optional[CompiledRules] = None,
+) -> List[str]:
+    """
+    Бітова маска з score_batch -> reasons[] у тому ж порядку, що повертає score_file.
+    """
+    return (rules or get_rules()).reasons(code, days_mod, days_first_seen, ext)
+
+
+def score_batch(
+    exts: Sequence[Optional[str]],
+    sizes: Sequence[Any],
+    mtimes: Sequence[float],
+    first_seen: Sequence[float],
+    labels: Sequence[Optional[str]],
+    names: Sequence[Optional[str]],
+    now: Optional[float] = None,
+    content_dups: Optional[Sequence[bool]] = None,
+    content_types: Optional[Sequence[Optional[str]]] = None,
+    seen_counts: Optional[Sequence[Any]] = None,
+    rules: Optional[CompiledRules] = None,
+) -> BatchScores:
+    """
+    Векторизований score_file для колонок однакової довжини.
+
+    mtimes / first_seen — epoch seconds (NaN = невідомо), у семантиці iso_to_epoch.
+    now — epoch seconds, один на весь batch (за замовчуванням — поточний час).
+    content_dups — True, якщо файл є копією іншого (file_obj["duplicate_of"]).
+    content_types — file_obj["content_type"] (intelligence.sniff): клас для файлів,
+    чиє розширення нічого не каже.
+    seen_counts — rec["seen_count"] (None — 0; потрібні лише правилам з seen_count_*).
+    Результат збігається з score_file для тих самих даних.
+    """
+    if np is None:
+        raise RuntimeError("score_batch requires numpy")
+
+    if now is None:
+        now = datetime.now(timezone.utc).timestamp()
+    return (rules or get_rules()).score_batch(
+        exts, sizes, mtimes, first_seen, labels, names, now,
+        content_dups=content_dups,
+        content_types=content_types,
+        seen_counts=seen_counts,
+    )
+
+
+def score_records(
+    file_objs: Sequence[Dict[str, Any]],
+    recs: Sequence[Dict[str, Any]],
+    now: Optional[float] = None,
+    rules: Optional[CompiledRules] = None,
+) -> BatchScores:
+    """
+    score_batch для пар (file_obj, rec) — тих самих аргументів, що й у score_file.
+    """
+    return score_batch(
+        exts=[f.get("ext") for f in file_objs],
+        sizes=[f.get("size_bytes") for f in file_objs],
+        mtimes=[iso_to_epoch(f.get("last_modified")) for f in file_objs],
+        first_seen=[record_ts(r, "first_seen_at") for r in recs],
+        labels=[r.get("label") for r in recs],
+        names=[f.get("name") for f in file_objs],
+        now=now,
+        content_dups=[bool(f.get("duplicate_of")) for f in file_objs],
+        content_types=[f.get("content_type") for f in file_objs],
+        seen_counts=[r.get("seen_count") for r in recs],
+        rules=rules,
+    )
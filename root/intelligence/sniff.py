@@ -0,0 +1,145 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# скільки байт з початку файлу читається (одним os.read): вистачає на "ustar" tar (offset 257)
+# і на заголовок PE, на який вказує e_lfanew у більшості exe
+SNIFF_BYTES = 512
+# менші файли не мають сигнатури — не читаються
+MIN_SNIFF_SIZE = 4
+
+# (offset, magic, тип); перша сигнатура, що збіглась, перемагає
+SIGNATURES: Tuple[Tuple[int, bytes, str], ...] = (
+    (0, b"PK\x03\x04", "zip"),
+    (0, b"PK\x05\x06", "zip"),  # порожній zip
+    (0, b"Rar!\x1a\x07", "rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z"),
+    (0, b"\x1f\x8b", "gzip"),
+    (0, b"BZh", "bzip2"),
+    (0, b"\xfd7zXZ\x00", "xz"),
+    (0, b"\x28\xb5\x2f\xfd", "zstd"),
+    (0, b"MSCF", "cab"),
+    (257, b"ustar", "tar"),
+    (0, b"MZ", "exe"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole"),  # msi, а також старі .doc/.xls
+    (0, b"\x7fELF", "elf"),
+    (0, b"%PDF-", "pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"\xff\xd8\xff", "jpeg"),
+    (0, b"GIF8", "gif"),
+    (0, b"SQLite format 3\x00", "sqlite"),
+    (0, b"ID3", "mp3"),
+    (0, b"OggS", "ogg"),
+    (0, b"fLaC", "flac"),
+    (4, b"ftyp", "mp4"),
+)
+
+# тип вмісту -> вид для правил скорингу (як "kinds" у intelligence.rules)
+TYPE_CLASS = {
+    "zip": "archive",
+    "rar": "archive",
+    "7z": "archive",
+    "gzip": "archive",
+    "bzip2": "archive",
+    "xz": "archive",
+    "zstd": "archive",
+    "cab": "archive",
+    "tar": "archive",
+    "exe": "installer",
+}
+
+# розширення, які нічого не кажуть про вміст (немає, "двійковий файл", недокачаний download):
+# тільки для них клас за вмістом замінює клас за розширенням. Решта — справжні формати
+# (docx / dotx / xps — це zip, vst3 / xll — це MZ), і вгадувати за сигнатурою там не можна
+UNKNOWN_EXT = frozenset(("", ".bin", ".dat", ".download", ".file", ".unknown"))
+
+
+def sniff_bytes(head: bytes) -> Optional[str]:
+    """
+    Тип за сигнатурою на початку файлу або None.
+    """
+    for offset, magic, kind in SIGNATURES:
+        if head.startswith(magic, offset):
+            if kind == "exe" and not _is_pe(head):
+                continue
+            return kind
+    return None
+
+
+def _is_pe(head: bytes) -> bool:
+    # MZ — ще не exe (так починаються й текстові файли "MZ..."): e_lfanew (0x3c) має вказувати
+    # на "PE\0\0"; якщо заголовок PE за межами прочитаного — довіряємо MZ + правдоподібному e_lfanew
+    if len(head) < 0x40:
+        return False
+    lfanew = int.from_bytes(head[0x3C:0x40], "little")
+    if lfanew < 0x40 or lfanew > 0x10000:
+        return False
+    if lfanew + 4 <= len(head):
+        return head[lfanew:lfanew + 4] == b"PE\x00\x00"
+    return True
+
+
+def sniff_file(path: str) -> Optional[str]:
+    """
+    Один os.read перших SNIFF_BYTES; None — невідомий тип або файл не читається.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return None
+    try:
+        head = os.read(fd, SNIFF_BYTES)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    return sniff_bytes(head)
+
+
+def sniff_many(paths: List[str], workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    sniff_file для списку шляхів у пулі потоків (на повільних дисках час — це очікування open/read).
+    """
+    if not paths:
+        return []
+    if len(paths) == 1:
+        return [sniff_file(paths[0])]
+    workers = workers or min(8, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix="sniff") as pool:
+        return list(pool.map(sniff_file, paths, chunksize=16))
+
+
+def needs_sniff(ext: str, size: int) -> bool:
+    """
+    Чи має сенс читати файл: тільки розширення з UNKNOWN_EXT (для решти content_class
+    однаково нічого не дасть), якщо воно саме не дає вид у правилах скорингу;
+    файли з кількох байт сигнатури не мають.
+    """
+    from intelligence.rules import get_rules
+
+    return size >= MIN_SNIFF_SIZE and ext in UNKNOWN_EXT and ext not in get_rules().ext_kind
+
+
+def content_class(ext: str, content_type: Optional[str]) -> Optional[str]:
+    """
+    "archive" / "installer" за вмістом — тільки якщо розширення нічого не каже
+    (UNKNOWN_EXT: архів без розширення, інсталятор, збережений як .bin / .download); інакше None.
+    """
+    if not content_type or ext not in UNKNOWN_EXT:
+        return None
+    return TYPE_CLASS.get(content_type)
+
+
+def cached_type(entry: Any, fp: Any) -> Tuple[bool, Optional[str]]:
+    """
+    rec["content_type"] = {"fp": [inode, size, mtime_ns], "type": str|None} — валідний, поки fp той самий.
+    -> (знайдено, тип).
+    """
+    if isinstance(entry, dict) and fp is not None and entry.get("fp") == fp:
+        return True, entry.get("type")
+    return False, None
+
+
+def make_entry(fp: Any, content_type: Optional[str]) -> Dict[str, Any]:
+    return {"fp": list(fp) if fp is not None else None, "type": content_type}
+
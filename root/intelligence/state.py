@@ -1,68 +1,132 @@
-import json
+import os
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
-from collections import Counter
+from typing import Any, Dict, List, Optional
 
-from intelligence.storage.paths import get_state_path
+from intelligence.records import RECORD_TYPES, StateRecord, to_record
+from intelligence.storage import summary as summary_counters
+from intelligence.storage.base import STATE_VERSION, StateStore, empty_state
 
-STATE_VERSION = 1
+_store: Optional[StateStore] = None
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def load_state() -> Dict[str, Any]:
-    path = get_state_path()
-    if not path.exists():
-        return {"version": STATE_VERSION, "files": {}}
-
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if not isinstance(data, dict):
-            return {"version": STATE_VERSION, "files": {}}
+def get_store() -> StateStore:
+    """
+    Поточне сховище state.
+    DESKTOPCLEANER_STATE_BACKEND=json — старий file_state.json, інакше SQLite.
+    """
+    global _store
+    if _store is None:
+        backend = os.environ.get("DESKTOPCLEANER_STATE_BACKEND", "sqlite").strip().lower()
+        if backend == "json":
+            from intelligence.storage.json_store import JsonStateStore
+            _store = JsonStateStore()
+        else:
+            from intelligence.storage.sqlite_store import SqliteStateStore
+            _store = SqliteStateStore()
+    return _store
+
+
+def set_store(store: Optional[StateStore]) -> None:
+    """
+    Підміна сховища (None — повернутись до вибору за env).
+    """
+    global _store
+    _store = store
 
-        files = data.get("files")
-        if not isinstance(files, dict):
-            data["files"] = {}
 
-        data["version"] = STATE_VERSION
-        return data
+def load_state() -> Dict[str, Any]:
+    try:
+        return get_store().load()
     except Exception:
-        return {"version": STATE_VERSION, "files": {}}
+        return empty_state()
 
 
 def save_state(state: Dict[str, Any]) -> None:
-    path = get_state_path()
-    path.parent.mkdir(parents=True, exist_ok=True)  # важливо, щоб директорія існувала
-    path.write_text(
-        json.dumps(state, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    get_store().save(state)
 
 
 def get_record(state: Dict[str, Any], file_path: str) -> Dict[str, Any]:
     files = state.setdefault("files", {})
     rec = files.get(file_path)
-    if not isinstance(rec, dict):
-        rec = {}
+    if not isinstance(rec, RECORD_TYPES):
+        counters = summary_counters.ensure_counters(state)
+        rec = StateRecord()
         files[file_path] = rec
+        summary_counters.add_record(counters, rec)
+    return rec
+
+
+def remove_record(state: Dict[str, Any], file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Видаляє запис зі state (з оновленням лічильників summary).
+    """
+    files = state.setdefault("files", {})
+    if file_path not in files:
+        return None
+    counters = summary_counters.ensure_counters(state)
+    rec = files.pop(file_path)
+    if isinstance(rec, RECORD_TYPES):
+        summary_counters.remove_record(counters, rec)
+        return rec
+    return None
+
+
+def remove_tree(state: Dict[str, Any], dir_path: str) -> List[str]:
+    """
+    Видаляє записи всіх файлів під dir_path (видалена папка); повертає їх шляхи.
+    """
+    prefix = os.path.normcase(dir_path.rstrip("\\/") + os.sep)
+    files = state.setdefault("files", {})
+    paths = [p for p in files if os.path.normcase(p).startswith(prefix)]
+    for p in paths:
+        remove_record(state, p)
+    return paths
+
+
+def put_record(state: Dict[str, Any], file_path: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ставить запис цілком (переміщення файлу, undo) — з оновленням лічильників summary.
+    """
+    rec = to_record(rec) or StateRecord()
+    counters = summary_counters.ensure_counters(state)
+    files = state.setdefault("files", {})
+    old = files.get(file_path)
+    if isinstance(old, RECORD_TYPES):
+        summary_counters.remove_record(counters, old)
+    files[file_path] = rec
+    summary_counters.add_record(counters, rec)
     return rec
 
 
+def begin_scan(state: Dict[str, Any]) -> int:
+    """
+    Лічильник повних сканувань (state["scan_count"]) — +1 на початку кожного.
+    """
+    state["scan_count"] = int(state.get("scan_count", 0) or 0) + 1
+    return state["scan_count"]
+
+
 def update_seen(state: Dict[str, Any], file_obj: Dict[str, Any]) -> Dict[str, Any]:
     """
     first_seen/last_seen/seen_count + label + category.
     file_obj ожидает: path, last_modified, size_bytes
     """
-    now = utc_now_iso()
     rec = get_record(state, file_obj["path"])
+    # StateRecord приймає epoch напряму — без форматування і розбору ISO
+    now: Any = float(int(time.time())) if type(rec) is StateRecord else utc_now_iso()
 
     if "first_seen_at" not in rec:
         rec["first_seen_at"] = now
 
     rec["last_seen_at"] = now
     rec["seen_count"] = int(rec.get("seen_count", 0)) + 1
+    # номер повного сканування — для compaction ("не бачили N сканувань")
+    rec["last_seen_scan"] = int(state.get("scan_count", 0) or 0)
 
     rec["last_modified"] = file_obj.get("last_modified")
     rec["size_bytes"] = file_obj.get("size_bytes")
@@ -83,17 +147,17 @@ def set_label(state: Dict[str, Any], file_path: str, label: Optional[str]) -> Di
     label: "trash" | "keep" | "pinned" | "organize" | None
     """
     rec = get_record(state, file_path)
+    counters = summary_counters.ensure_counters(state)
+    summary_counters.change_field(counters, "label", rec.get("label"), label)
     rec["label"] = label
     return rec
 
 
 def label_file(file_path: str, label: Optional[str]) -> bool:
     """
-    Завантажує state -> ставить label -> зберігає.
+    Ставить label одному запису — один маленький запис у сховище.
     """
-    state = load_state()
-    set_label(state, file_path, label)
-    save_state(state)
+    get_store().update_record(file_path, {"label": label})
     return True
 
 
@@ -102,62 +166,45 @@ def set_category(state: Dict[str, Any], file_path: str, category: Optional[str])
     category: "study" | "work" | "personal" | "games" | None
     """
     rec = get_record(state, file_path)
+    counters = summary_counters.ensure_counters(state)
+    summary_counters.change_field(counters, "category", rec.get("category"), category)
     rec["category"] = category
     return rec
 
 
 def category_file(file_path: str, category: Optional[str]) -> bool:
     """
-    Завантажує state -> ставить category -> зберігає.
+    Ставить category одному запису — один маленький запис у сховище.
     """
-    state = load_state()
-    set_category(state, file_path, category)
-    save_state(state)
+    get_store().update_record(file_path, {"category": category})
     return True
 
 def build_profile_summary(state: Dict[str, Any]) -> Dict[str, Any]:
-    files = state.get("files", {})
-    if not isinstance(files, dict):
-        files = {}
-
-    labels = Counter()
-    categories = Counter()
-
-    total_records = 0
-    labeled_records = 0
-    categorized_records = 0
-
-    for _path, rec in files.items():
-        if not isinstance(rec, dict):
-            continue
-
-        total_records += 1
-
-        label = rec.get("label")
-        category = rec.get("category")
-
-        if label:
-            labels[str(label)] += 1
-            labeled_records += 1
-        if category:
-            categories[str(category)] += 1
-            categorized_records += 1
-
-    top_label = labels.most_common(1)[0][0] if labels else None
-    top_category = categories.most_common(1)[0][0] if categories else None
-
-    return {
-        "version": state.get("version", STATE_VERSION),
-        "total_records": total_records,
-        "labeled_records": labeled_records,
-        "categorized_records": categorized_records,
-        "labels": dict(labels),
-        "categories": dict(categories),
-        "top_label": top_label,
-        "top_category": top_category,
-    }
+    """
+    Summary з лічильників state["summary"], які get_record / set_label /
+    set_category / remove_record оновлюють на місці — O(1) від кількості записів.
+    Повний перерахунок — тільки якщо лічильників немає, змінилась схема або вони биті.
+    """
+    counters = summary_counters.ensure_counters(state)
+    return summary_counters.to_profile_summary(counters, state.get("version", STATE_VERSION))
 
 
 def get_profile_summary() -> Dict[str, Any]:
+    """
+    Summary без завантаження записів: лічильники читаються зі сховища окремо.
+    """
+    store = get_store()
+    try:
+        counters = store.load_summary()
+    except Exception:
+        counters = None
+    if summary_counters.is_valid(counters):
+        return summary_counters.to_profile_summary(counters)
+
     state = load_state()
-    return build_profile_summary(state)
\ No newline at end of file
+    summary = build_profile_summary(state)
+    try:
+        store.save_records({}, (), meta={summary_counters.SUMMARY_KEY: state[summary_counters.SUMMARY_KEY]})
+    except Exception:
+        pass
+    return summary
@@ -0,0 +1,272 @@
+import atexit
+import copy
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from intelligence.compaction import CompactionReport, RetentionPolicy, compact_state
+from intelligence.state import (
+    begin_scan,
+    build_profile_summary,
+    get_record,
+    get_store,
+    put_record,
+    remove_record,
+    remove_tree,
+    set_category,
+    set_label,
+    update_seen,
+)
+from intelligence.records import RECORD_TYPES, StateRecord, record_to_dict
+from intelligence.storage import summary as summary_counters
+from intelligence.storage.base import StateStore
+
+DEFAULT_FLUSH_DELAY_S = 2.0
+
+
+def _copy(rec: Any) -> Any:
+    # StateRecord.copy() — копія слотів, без перетворення часу в ISO
+    return rec.copy() if type(rec) is StateRecord else dict(rec)
+
+
+class StateCache:
+    """
+    State у пам'яті процесу + відкладений запис (write-behind).
+
+    - читання (get_record / summary) — з пам'яті, без диска; summary — з лічильників, O(1)
+    - зміни позначають запис "брудним" і запускають таймер flush (якщо ще не запущений),
+      тож усі зміни за flush_delay_s зливаються в один запис
+    - flush() пише тільки брудні записи одним save_records() — поза lock-ом state:
+      під lock-ом лише знімок брудних записів, запис на диск не блокує GUI
+    - close() (і atexit) — гарантований flush при виході
+    """
+
+    def __init__(self, store: Optional[StateStore] = None, flush_delay_s: float = DEFAULT_FLUSH_DELAY_S):
+        self._store = store or get_store()
+        self._flush_delay_s = flush_delay_s
+        self._lock = threading.RLock()
+        # flush-і по черзі: інакше старший знімок міг би лягти на диск після новішого
+        self._flush_lock = threading.Lock()
+        self._state: Dict[str, Any] = self._store.load()
+        self._dirty: Set[str] = set()
+        self._removed: Set[str] = set()
+        # змінились ключі верхнього рівня (scan_count, ...) без зміни записів
+        self._meta_dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # -------------------- reads --------------------
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    @property
+    def store(self) -> StateStore:
+        return self._store
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """
+        Живий state. Змінювати тільки під self.lock і з mark_dirty().
+        """
+        return self._state
+
+    def get_record(self, file_path: str) -> Dict[str, Any]:
+        with self._lock:
+            rec = self._state.get("files", {}).get(file_path)
+            return _copy(rec) if isinstance(rec, RECORD_TYPES) else {}
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return build_profile_summary(self._state)
+
+    def categories(self) -> Dict[str, str]:
+        """
+        path -> category для записів з категорією (розбивка disk_usage by_category).
+        """
+        with self._lock:
+            files = self._state.get("files", {})
+            return {p: c for p, c in ((p, rec.get("category")) for p, rec in files.items()) if c}
+
+    def records(
+        self, paths: Optional[Iterable[str]] = None, labels: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Копії записів (path -> dict): тільки paths, якщо задано, і тільки з label з labels.
+        Під lock-ом — лише копіювання в пам'яті; повільне (диск) викликач робить з копіями.
+        """
+        wanted = None if labels is None else set(labels)
+        with self._lock:
+            files = self._state.get("files", {})
+            selected = files.keys() if paths is None else paths
+            out = {}
+            for p in selected:
+                rec = files.get(p)
+                if isinstance(rec, RECORD_TYPES) and (wanted is None or rec.get("label") in wanted):
+                    out[p] = record_to_dict(rec)
+            return out
+
+    # -------------------- mutations --------------------
+
+    def mark_dirty(self, file_path: str) -> None:
+        with self._lock:
+            self._dirty.add(file_path)
+            self._removed.discard(file_path)
+            self._schedule_flush()
+
+    def put_record(self, file_path: str, rec: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            stored = put_record(self._state, file_path, _copy(rec))
+            self.mark_dirty(file_path)
+            return _copy(stored)
+
+    def remove(self, file_path: str) -> None:
+        with self._lock:
+            remove_record(self._state, file_path)
+            self._dirty.discard(file_path)
+            self._removed.add(file_path)
+            self._schedule_flush()
+
+    def remove_tree(self, dir_path: str) -> List[str]:
+        with self._lock:
+            paths = remove_tree(self._state, dir_path)
+            if paths:
+                self._dirty.difference_update(paths)
+                self._removed.update(paths)
+                self._schedule_flush()
+            return paths
+
+    def set_label(self, file_path: str, label: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            rec = set_label(self._state, file_path, label)
+            self.mark_dirty(file_path)
+            return _copy(rec)
+
+    def set_category(self, file_path: str, category: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            rec = set_category(self._state, file_path, category)
+            self.mark_dirty(file_path)
+            return _copy(rec)
+
+    def set_labels(self, paths: Iterable[str], label: Optional[str]) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        """
+        Одна мітка для багатьох файлів під одним lock-ом -> один flush.
+        Повертає [(path, попередня мітка, копія запису)].
+        """
+        return self._set_many(paths, "label", label, set_label)
+
+    def set_categories(self, paths: Iterable[str], category: Optional[str]) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        return self._set_many(paths, "category", category, set_category)
+
+    def _set_many(
+        self, paths: Iterable[str], key: str, value: Optional[str], setter: Any
+    ) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        out = []
+        with self._lock:
+            files = self._state.setdefault("files", {})
+            for p in paths:
+                old = files.get(p)
+                before = old.get(key) if isinstance(old, RECORD_TYPES) else None
+                rec = setter(self._state, p, value)
+                self._dirty.add(p)
+                self._removed.discard(p)
+                out.append((p, before, _copy(rec)))
+            if out:
+                self._schedule_flush()
+        return out
+
+    def update_fields(self, file_path: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            rec = get_record(self._state, file_path)
+            rec.update(fields)
+            self.mark_dirty(file_path)
+            return _copy(rec)
+
+    def update_seen(self, file_obj: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            rec = update_seen(self._state, file_obj)
+            self.mark_dirty(file_obj["path"])
+            return _copy(rec)
+
+    def begin_scan(self) -> int:
+        with self._lock:
+            n = begin_scan(self._state)
+            self._meta_dirty = True
+            self._schedule_flush()
+            return n
+
+    def compact(self, policy: Optional[RetentionPolicy] = None) -> CompactionReport:
+        """
+        compact_state над живим state; видалення йдуть у наступний flush().
+        """
+        with self._lock:
+            return compact_state(self._state, policy, remove=self.remove)
+
+    # -------------------- flushing --------------------
+
+    def _schedule_flush(self) -> None:
+        if self._closed or self._timer is not None:
+            return
+        self._timer = threading.Timer(self._flush_delay_s, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            # брудні записи лишаються — наступна зміна або close() спробує ще раз
+            pass
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty and not self._removed and not self._meta_dirty:
+                    return
+
+                files = self._state.get("files", {})
+                dirty, removed = self._dirty, self._removed
+                records = {
+                    p: record_to_dict(files[p])
+                    for p in dirty
+                    if isinstance(files.get(p), RECORD_TYPES)
+                }
+                # лічильники summary і scan_count пишуться разом із записами — інакше розійдуться
+                summary_counters.ensure_counters(self._state)
+                meta = copy.deepcopy({k: v for k, v in self._state.items() if k != "files"})
+                # зміни під час запису позначаються вже в нових множинах
+                self._dirty, self._removed = set(), set()
+                self._meta_dirty = False
+
+            try:
+                merged = self._store.save_records(records, list(removed), meta=meta)
+            except Exception:
+                with self._lock:
+                    # не записалось — повернути в брудні те, що відтоді не змінилось ще раз
+                    self._dirty |= dirty - self._removed
+                    self._removed |= removed - self._dirty
+                    self._meta_dirty = True
+                raise
+
+            with self._lock:
+                # зміни інших процесів (і злиті з нашими записи) — у пам'яті тепер те, що на диску;
+                # записи, змінені тут під час запису, лишаються нашими — їх злиє наступний flush
+                for p, rec in (merged or {}).items():
+                    if p in self._dirty or p in self._removed:
+                        continue
+                    if rec is None:
+                        remove_record(self._state, p)
+                    else:
+                        put_record(self._state, p, rec)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            # нові зміни більше не запускають таймер; те, що є, пише flush()
+            self._closed = True
+        self.flush()
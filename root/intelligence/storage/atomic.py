@@ -0,0 +1,148 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:  # POSIX
+    msvcrt = None  # type: ignore[assignment]
+
+# скільки чекати чужий lock, перш ніж здатись (тримають його мілісекунди)
+DEFAULT_LOCK_TIMEOUT_S = 10.0
+_LOCK_POLL_S = 0.02
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8", fsync: bool = True) -> None:
+    """
+    Запис через тимчасовий файл у тій самій папці + fsync + os.replace:
+    читач (і файл після падіння процесу) бачить або старий вміст, або новий — не половину.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    # rename стає довговічним тільки після fsync папки (POSIX; на Windows не відкривається)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """
+    Міжпроцесний advisory lock на окремому файлі (<name>.lock поруч із даними):
+    flock на POSIX, msvcrt.locking на Windows. Тримати тільки на час
+    "прочитати -> злити -> записати", не на весь час роботи.
+
+        with FileLock(path.with_name(path.name + ".lock")):
+            ...
+    """
+
+    def __init__(self, path: Path, timeout: float = DEFAULT_LOCK_TIMEOUT_S):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(fd)
+                self._fd = fd
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"state lock is busy: {self.path}")
+                time.sleep(_LOCK_POLL_S)
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+def _try_lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def merge_record(
+    base: Optional[Dict[str, Any]],
+    ours: Dict[str, Any],
+    theirs: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Тристороннє злиття запису, який змінили два процеси.
+    base — як запис виглядав, коли ми його прочитали; theirs — що зараз на диску.
+    Поля, змінені нами (ours != base), беруться наші; решта — з диска
+    (сканер оновив last_seen_at, UI — label: зберігаються обидві зміни).
+    theirs None (на диску запису немає) — наш запис як є.
+    """
+    if theirs is None:
+        return dict(ours)
+    base = base or {}
+    merged = dict(theirs)
+    for key, value in ours.items():
+        if key not in base or base[key] != value:
+            merged[key] = value
+    for key in base:
+        if key not in ours:
+            merged.pop(key, None)
+    return merged
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+from intelligence.records import RECORD_TYPES
+
+STATE_VERSION = 1
+
+
+def empty_state() -> Dict[str, Any]:
+    return {"version": STATE_VERSION, "files": {}}
+
+
+class StateStore(ABC):
+    """
+    Інтерфейс сховища state.
+
+    state = {"version": int, "files": {path: rec}, ...інші ключі верхнього рівня}
+
+    load/save працюють з усім state (сканування),
+    load_record/update_record — з одним записом (клік у UI),
+    щоб зміна одного label не переписувала весь файл.
+    load_summary — тільки лічильники state["summary"], без записів.
+    """
+
+    @abstractmethod
+    def load(self) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def save(self, state: Dict[str, Any]) -> None:
+        ...
+
+    def load_record(self, file_path: str) -> Optional[Dict[str, Any]]:
+        state = self.load()
+        rec = state.get("files", {}).get(file_path)
+        return rec if isinstance(rec, RECORD_TYPES) else None
+
+    def vacuum(self) -> None:
+        """
+        Повернути місце після масового видалення (compaction). За замовчуванням — нічого:
+        JSON і так переписується цілком.
+        """
+
+    def load_summary(self) -> Optional[Dict[str, Any]]:
+        return self.load().get("summary")
+
+    def update_record(self, file_path: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        from intelligence.storage import summary
+
+        state = self.load()
+        counters = summary.ensure_counters(state)
+        files = state["files"]
+        old = files.get(file_path)
+        rec = dict(old) if isinstance(old, RECORD_TYPES) else {}
+        rec.update(fields)
+        summary.update_record(counters, old if isinstance(old, RECORD_TYPES) else None, rec)
+        files[file_path] = rec
+        self.save(state)
+        return rec
+
+    def save_records(
+        self,
+        records: Dict[str, Dict[str, Any]],
+        removed: Iterable[str] = (),
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        records — записи цілком (path -> rec), removed — шляхи на видалення,
+        meta — ключі верхнього рівня state (напр. "summary"), пишуться разом із записами.
+        Сховища, що бачать зміни інших процесів, повертають їх для state у пам'яті:
+        path -> запис (чужий або злитий з нашим) чи None (запис видалено).
+        """
+        from intelligence.storage import summary
+
+        state = self.load()
+        counters = summary.ensure_counters(state)
+        files = state["files"]
+        for p, rec in records.items():
+            old = files.get(p)
+            summary.update_record(counters, old if isinstance(old, RECORD_TYPES) else None, rec)
+            files[p] = rec
+        for p in removed:
+            old = files.pop(p, None)
+            if isinstance(old, RECORD_TYPES):
+                summary.remove_record(counters, old)
+        if meta:
+            state.update(meta)
+        self.save(state)
@@ -0,0 +1,240 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from intelligence.records import RECORD_TYPES, record_to_dict, to_record
+from intelligence.storage.atomic import FileLock, atomic_write_text, merge_record
+from intelligence.storage.base import STATE_VERSION, StateStore, empty_state
+from intelligence.storage.paths import get_state_path
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class JsonStateStore(StateStore):
+    """
+    Старий формат: весь state в одному file_state.json.
+
+    Запис — атомарний (тимчасовий файл + fsync + rename) під коротким
+    міжпроцесним lock-ом (file_state.json.lock). Якщо файл змінив інший процес
+    після нашого load(), save() зливає зміни по записах: наші змінені записи
+    (по полях, merge_record) поверх того, що на диску, решта — з диска.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+        # серіалізовані записи і meta з останнього load()/save() — база для злиття
+        self._snapshot: Dict[str, str] = {}
+        self._meta_snapshot: Dict[str, str] = {}
+        # (mtime_ns, size) файлу після нашого load()/save(): інший — файл змінив хтось інший
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    @property
+    def path(self) -> Path:
+        return self._path or get_state_path()
+
+    @property
+    def lock_path(self) -> Path:
+        path = self.path
+        return path.with_name(path.name + ".lock")
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """
+        Вміст файлу як dict; None — файлу немає.
+        Битий файл не затирається мовчки: переноситься в
+        file_state.json.corrupt-<час> (щоб дані можна було відновити) і state починається з нуля.
+        """
+        path = self.path
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError("state is not an object")
+            return data
+        except ValueError:
+            try:
+                os.replace(path, path.with_name(f"{path.name}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"))
+            except OSError:
+                pass
+            return None
+
+    def load(self) -> Dict[str, Any]:
+        # без lock-а: файл замінюється тільки цілком (rename), напівзаписаним його не видно.
+        # stamp — до читання: якщо файл замінять між ними, save() побачить різницю і зіллє
+        self._stamp = self._file_stamp()
+        try:
+            data = self._read()
+        except Exception:
+            return empty_state()
+        if data is None:
+            self._snapshot, self._meta_snapshot = {}, {}
+            return empty_state()
+
+        try:
+            files = data.get("files")
+            if not isinstance(files, dict):
+                files = {}
+            self._snapshot = {p: _dumps(rec) for p, rec in files.items() if isinstance(rec, dict)}
+            self._meta_snapshot = {k: _dumps(v) for k, v in data.items() if k != "files"}
+            # записи в пам'яті — StateRecord (див. intelligence.records)
+            data["files"] = {p: r for p, r in ((p, to_record(rec)) for p, rec in files.items()) if r is not None}
+
+            data["version"] = STATE_VERSION
+            return data
+        except Exception:
+            return empty_state()
+
+    def save(self, state: Dict[str, Any]) -> None:
+        files = state.get("files", {})
+        if not isinstance(files, dict):
+            files = {}
+        ours = {p: record_to_dict(rec) for p, rec in files.items() if isinstance(rec, RECORD_TYPES)}
+        ours_meta = {k: v for k, v in state.items() if k != "files"}
+
+        with FileLock(self.lock_path):
+            stamp = self._file_stamp()
+            merged_files = ours
+            merged_meta = ours_meta
+            if stamp is not None and stamp != self._stamp:
+                disk = self._read() or empty_state()
+                merged_files, merged_meta = self._merge(ours, ours_meta, disk)
+                # у пам'яті — те саме, що на диску (чужі записи, злиті поля)
+                files.clear()
+                files.update((p, to_record(r)) for p, r in merged_files.items())
+                state.update(merged_meta)
+                state["files"] = files
+
+            data = dict(merged_meta)
+            data["files"] = merged_files
+            self._write_locked(data)
+            self._stamp = self._file_stamp()
+
+        self._snapshot = {p: _dumps(rec) for p, rec in merged_files.items()}
+        self._meta_snapshot = {k: _dumps(v) for k, v in merged_meta.items()}
+
+    def _write_locked(self, data: Dict[str, Any]) -> None:
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def _disk_state(self) -> Dict[str, Any]:
+        disk = self._read() or empty_state()
+        if not isinstance(disk.get("files"), dict):
+            disk["files"] = {}
+        return disk
+
+    def update_record(self, file_path: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        from intelligence.storage import summary
+
+        # читання і запис під одним lock-ом: між ними ніхто не встигне нічого змінити
+        with FileLock(self.lock_path):
+            disk = self._disk_state()
+            counters = summary.ensure_counters(disk)
+            files = disk["files"]
+            old = files.get(file_path)
+            rec = dict(old) if isinstance(old, dict) else {}
+            rec.update(fields)
+            summary.update_record(counters, old if isinstance(old, dict) else None, rec)
+            files[file_path] = rec
+            self._write_locked(disk)
+        return rec
+
+    def save_records(
+        self,
+        records: Dict[str, Dict[str, Any]],
+        removed: Iterable[str] = (),
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Записи, змінені й іншим процесом після нашого load(), зливаються по полях
+        (merge_record); повертає такі злиті записи (path -> dict), щоб StateCache
+        оновив свою копію. Лічильники summary ведуться по тому, що на диску.
+        """
+        from intelligence.storage import summary
+
+        merged_out: Dict[str, Dict[str, Any]] = {}
+        with FileLock(self.lock_path):
+            foreign = self._file_stamp() != self._stamp
+            disk = self._disk_state()
+            counters = summary.ensure_counters(disk)
+            files = disk["files"]
+            written: Dict[str, str] = {}
+            for p, rec in records.items():
+                if not isinstance(rec, RECORD_TYPES):
+                    continue
+                ours = record_to_dict(rec)
+                theirs = files.get(p) if isinstance(files.get(p), dict) else None
+                base_data = self._snapshot.get(p)
+                new = ours
+                if theirs is not None and _dumps(theirs) != base_data:
+                    new = merge_record(json.loads(base_data) if base_data else None, ours, theirs)
+                    if new != ours:
+                        merged_out[p] = new
+                summary.update_record(counters, theirs, new)
+                files[p] = new
+                written[p] = _dumps(new)
+            removed = list(removed)
+            for p in removed:
+                old = files.pop(p, None)
+                if isinstance(old, dict):
+                    summary.remove_record(counters, old)
+            for k, v in (meta or {}).items():
+                # наші лічильники не бачать чужих змін — на диску свої, оновлені вище
+                if k not in ("files", summary.SUMMARY_KEY):
+                    disk[k] = v
+            self._write_locked(disk)
+            # файл знову такий, як після нашого load()/save(), — наступний save() без злиття.
+            # Після чужих змін — ні: у пам'яті викликача є тільки злиті тут записи
+            if not foreign:
+                self._stamp = self._file_stamp()
+
+        self._snapshot.update(written)
+        for p in removed:
+            self._snapshot.pop(p, None)
+        return merged_out
+
+    def _merge(
+        self,
+        ours: Dict[str, Dict[str, Any]],
+        ours_meta: Dict[str, Any],
+        disk: Dict[str, Any],
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        from intelligence.storage import summary
+
+        snapshot = self._snapshot
+        theirs = disk.get("files")
+        if not isinstance(theirs, dict):
+            theirs = {}
+        result = {p: r for p, r in theirs.items() if isinstance(r, dict)}
+
+        for p, rec in ours.items():
+            base_data = snapshot.get(p)
+            if base_data is not None and base_data == _dumps(rec):
+                # ми запис не змінювали — лишається як на диску (або видаленим)
+                continue
+            base = json.loads(base_data) if base_data is not None else None
+            result[p] = merge_record(base, rec, result.get(p))
+        for p in snapshot:
+            if p not in ours:
+                # видалили ми (compaction / cleanup)
+                result.pop(p, None)
+
+        meta = {k: v for k, v in disk.items() if k != "files"}
+        for k, v in ours_meta.items():
+            if self._meta_snapshot.get(k) != _dumps(v):
+                meta[k] = v
+        if summary.SUMMARY_KEY in meta or summary.SUMMARY_KEY in ours_meta:
+            # лічильники обох процесів не складаються — перерахунок по злитих записах
+            meta[summary.SUMMARY_KEY] = summary.build_counters(result)
+        return result, meta
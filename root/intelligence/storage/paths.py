@@ -20,3 +20,27 @@ def get_app_dir() -> Path:
 
 def get_state_path() -> Path:
     return get_app_dir() / "file_state.json"
+
+
+def get_scan_cache_path() -> Path:
+    return get_app_dir() / "scan_cache.json"
+
+
+def get_disk_usage_cache_path() -> Path:
+    return get_app_dir() / "disk_usage.json"
+
+
+def get_state_db_path() -> Path:
+    return get_app_dir() / "file_state.sqlite3"
+
+
+def get_scan_config_path() -> Path:
+    return get_app_dir() / "scan_config.json"
+
+
+def get_model_path() -> Path:
+    return get_app_dir() / "model.json"
+
+
+def get_scoring_rules_path() -> Path:
+    return get_app_dir() / "scoring_rules.json"
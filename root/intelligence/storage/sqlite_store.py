@@ -0,0 +1,482 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from intelligence.records import RECORD_TYPES, record_to_dict, to_record
+from intelligence.storage import summary
+from intelligence.storage.atomic import merge_record
+from intelligence.storage.base import STATE_VERSION, StateStore, empty_state
+from intelligence.storage.json_store import JsonStateStore
+from intelligence.storage.paths import get_state_db_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    seq  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# службові рядки meta, яких немає в state
+_INTERNAL_META = ("files", "migrated_from_json", "write_seq")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads_record(data: Optional[str]) -> Optional[Dict[str, Any]]:
+    if data is None:
+        return None
+    try:
+        rec = json.loads(data)
+    except Exception:
+        return None
+    return rec if isinstance(rec, dict) else None
+
+
+class SqliteStateStore(StateStore):
+    """
+    State у SQLite (WAL):
+      files(path, data, seq) — один рядок на запис, data = JSON запису,
+                         seq — write_seq транзакції, що записала його востаннє
+      meta(key, value)   — ключі верхнього рівня state (version, summary, ...), value = JSON
+
+    save() пише тільки записи, що змінились з моменту останнього load(),
+    update_record() — один UPDATE в одній транзакції.
+    При першому відкритті імпортує існуючий file_state.json.
+
+    Кілька процесів (GUI + cli.py з cron): кожна транзакція запису збільшує
+    meta.write_seq. Якщо на момент save() він не той, що ми бачили, — БД змінював
+    хтось інший: записи з seq новішим за наш підтягуються в snapshot і в state
+    викликача, змінені обома зливаються по полях (merge_record) замість того,
+    щоб наш запис цілком затер чужий, а лічильники summary в БД оновлюються
+    нашими змінами. Після цього _seq знову актуальний.
+    """
+
+    def __init__(self, path: Optional[Path] = None, legacy_json: Optional[JsonStateStore] = None):
+        self._path = path
+        self._legacy_json = legacy_json
+        self._ready = False
+        # серіалізовані записи з останнього load() — щоб save() писав тільки diff
+        self._snapshot: Dict[str, str] = {}
+        self._meta_snapshot: Dict[str, str] = {}
+        # write_seq на момент load() / нашого останнього запису без чужих змін
+        self._seq: Optional[int] = None
+
+    @property
+    def path(self) -> Path:
+        return self._path or get_state_db_path()
+
+    # -------------------- connection --------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._ready:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            if "seq" not in columns:
+                # БД до появи files.seq: старі рядки — "записані до будь-якого load()"
+                conn.execute("ALTER TABLE files ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS files_seq ON files(seq)")
+            self._migrate_from_json(conn)
+            self._ready = True
+        return conn
+
+    def _migrate_from_json(self, conn: sqlite3.Connection) -> None:
+        """
+        Одноразова міграція з file_state.json.
+        JSON-файл не видаляється — в meta ставиться позначка migrated_from_json.
+        """
+        row = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if row is not None:
+            return
+
+        legacy = self._legacy_json or JsonStateStore()
+        source = ""
+        if legacy.path.exists():
+            state = legacy.load()
+            source = str(legacy.path)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO files(path, data) VALUES (?, ?)",
+                    (
+                        (p, _dumps(record_to_dict(rec)))
+                        for p, rec in state.get("files", {}).items()
+                        if isinstance(rec, RECORD_TYPES)
+                    ),
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO meta(key, value) VALUES (?, ?)",
+                    ((k, _dumps(v)) for k, v in state.items() if k != "files"),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from_json', ?)",
+                    (_dumps(source),),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from_json', ?)",
+                (_dumps(source),),
+            )
+
+    # -------------------- concurrency --------------------
+
+    @staticmethod
+    def _read_seq(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'write_seq'").fetchone()
+        try:
+            return int(json.loads(row[0])) if row is not None else 0
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _bump_seq(conn: sqlite3.Connection, seq: int) -> int:
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('write_seq', ?)", (_dumps(seq + 1),))
+        return seq + 1
+
+    def _sync_foreign(
+        self,
+        conn: sqlite3.Connection,
+        changed: Dict[str, str],
+        removed: List[str],
+    ) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, Optional[str]]]:
+        """
+        Чужі зміни після нашої останньої синхронізації (files.seq > self._seq):
+          - наші записи (changed: path -> наш JSON), змінені й там, зливаються (changed оновлюється на місці);
+          - решта чужих змін і видалень переходить у snapshot.
+        Повертає (path -> новий запис або None, якщо видалено — для state в пам'яті;
+        path -> поточний рядок у БД для наших changed / removed — база для лічильників summary).
+        """
+        since = self._seq if self._seq is not None else -1
+        theirs: Dict[str, str] = dict(conn.execute("SELECT path, data FROM files WHERE seq > ?", (since,)))
+        snapshot = self._snapshot
+        # видалені іншим процесом (compaction у cli.py): рядка немає, а ми його бачили.
+        # Без видалень у БД рівно snapshot + нові чужі рядки — тоді повний список шляхів не потрібен
+        expected = len(snapshot) + sum(1 for p in theirs if p not in snapshot)
+        gone: Set[str] = set()
+        if conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] != expected:
+            present = {path for (path,) in conn.execute("SELECT path FROM files")}
+            gone = {p for p in snapshot if p not in present}
+
+        # рядки наших змін у БД: чужий, якщо він новіший, інакше той, що ми бачили
+        db_rows: Dict[str, Optional[str]] = {
+            p: None if p in gone else theirs.get(p, snapshot.get(p)) for p in (*changed, *removed)
+        }
+
+        pulled: Dict[str, Optional[Dict[str, Any]]] = {}
+        for p, data in theirs.items():
+            base = snapshot.get(p)
+            if p in changed:
+                ours = changed[p]
+                if data == base or data == ours:
+                    continue
+                other = _loads_record(data)
+                mine = _loads_record(ours)
+                if other is None or mine is None:
+                    continue
+                new = merge_record(_loads_record(base), mine, other)
+                new_data = _dumps(new)
+                if new_data != ours:
+                    changed[p] = new_data
+                    pulled[p] = new
+            elif p not in removed and data != base:
+                rec = _loads_record(data)
+                if rec is not None:
+                    snapshot[p] = data
+                    pulled[p] = rec
+
+        for p in gone:
+            snapshot.pop(p, None)
+            # наш змінений запис лишається (наша зміна новіша), видалений нами — і так видалено
+            if p not in changed and p not in removed:
+                pulled[p] = None
+        return pulled, db_rows
+
+    def _write_meta(self, conn: sqlite3.Connection, meta: Dict[str, Any], foreign: bool) -> None:
+        """
+        Без чужих змін — усі ключі як є. З чужими — тільки ключі, змінені нами;
+        summary тоді веде _write_summary.
+        """
+        rows = []
+        for k, v in meta.items():
+            if k in _INTERNAL_META:
+                continue
+            data = _dumps(v)
+            if foreign and (k == summary.SUMMARY_KEY or self._meta_snapshot.get(k) == data):
+                continue
+            rows.append((k, data))
+        conn.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", rows)
+        self._meta_snapshot.update(rows)
+
+    def _write_summary(
+        self,
+        conn: sqlite3.Connection,
+        db_rows: Dict[str, Optional[str]],
+        changed: Dict[str, str],
+        removed: List[str],
+    ) -> None:
+        """
+        Після чужих змін: лічильники в БД (їх вів інший процес) + наші зміни записів,
+        тими ж кроками, що й update_record. Видаляються, тільки якщо в БД їх немає
+        або вони биті — тоді їх перебудує get_profile_summary.
+        """
+        if not changed and not removed:
+            return
+        counters = self._load_summary(conn)
+        if not summary.is_valid(counters):
+            conn.execute("DELETE FROM meta WHERE key = ?", (summary.SUMMARY_KEY,))
+            self._meta_snapshot.pop(summary.SUMMARY_KEY, None)
+            return
+        for p, data in changed.items():
+            new = _loads_record(data)
+            if new is not None:
+                summary.update_record(counters, _loads_record(db_rows.get(p)), new)
+        for p in removed:
+            old = _loads_record(db_rows.get(p))
+            if old is not None:
+                summary.remove_record(counters, old)
+        value = _dumps(counters)
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (summary.SUMMARY_KEY, value))
+        self._meta_snapshot[summary.SUMMARY_KEY] = value
+
+    def _write_records(
+        self,
+        conn: sqlite3.Connection,
+        meta: Dict[str, Any],
+        changed: Dict[str, str],
+        removed: List[str],
+    ) -> Tuple[int, Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        Спільна частина save / save_records (у відкритій BEGIN IMMEDIATE):
+        синхронізація з чужими змінами, запис рядків з новим seq, meta.
+        Повертає (новий write_seq, записи для state в пам'яті — див. _sync_foreign).
+        """
+        seq = self._read_seq(conn)
+        foreign = seq != self._seq
+        pulled: Dict[str, Optional[Dict[str, Any]]] = {}
+        db_rows: Dict[str, Optional[str]] = {}
+        if foreign:
+            pulled, db_rows = self._sync_foreign(conn, changed, removed)
+        new_seq = seq + 1
+        conn.executemany(
+            "INSERT OR REPLACE INTO files(path, data, seq) VALUES (?, ?, ?)",
+            ((p, data, new_seq) for p, data in changed.items()),
+        )
+        conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in removed))
+        self._write_meta(conn, meta, foreign)
+        if foreign:
+            self._write_summary(conn, db_rows, changed, removed)
+        elif (changed or removed) and summary.SUMMARY_KEY not in meta:
+            # записи змінено без актуальних лічильників — хай get_profile_summary перебудує їх
+            conn.execute("DELETE FROM meta WHERE key = ?", (summary.SUMMARY_KEY,))
+            self._meta_snapshot.pop(summary.SUMMARY_KEY, None)
+        self._bump_seq(conn, seq)
+        return new_seq, pulled
+
+    # -------------------- StateStore --------------------
+
+    def load(self) -> Dict[str, Any]:
+        state = empty_state()
+        snapshot: Dict[str, str] = {}
+        meta_snapshot: Dict[str, str] = {}
+        conn = self._connect()
+        try:
+            # одна read-транзакція: meta, write_seq і записи — з одного моменту
+            conn.execute("BEGIN")
+            seq = self._read_seq(conn)
+            for key, value in conn.execute("SELECT key, value FROM meta"):
+                if key in _INTERNAL_META:
+                    continue
+                try:
+                    state[key] = json.loads(value)
+                    meta_snapshot[key] = value
+                except Exception:
+                    continue
+
+            files = state["files"]
+            for path, data in conn.execute("SELECT path, data FROM files"):
+                try:
+                    rec = json.loads(data)
+                except Exception:
+                    continue
+                if isinstance(rec, dict):
+                    files[path] = to_record(rec)
+                    snapshot[path] = data
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        state["version"] = STATE_VERSION
+        self._snapshot = snapshot
+        self._meta_snapshot = meta_snapshot
+        self._seq = seq
+        return state
+
+    def save(self, state: Dict[str, Any]) -> None:
+        files = state.get("files", {})
+        if not isinstance(files, dict):
+            files = {}
+
+        snapshot = self._snapshot
+        changed: Dict[str, str] = {}
+        for path, rec in files.items():
+            if not isinstance(rec, RECORD_TYPES):
+                continue
+            data = _dumps(record_to_dict(rec))
+            if snapshot.get(path) != data:
+                changed[path] = data
+        # видаляємо тільки те, що було завантажено і зникло з state локально;
+        # записи, додані в обхід (update_record), не чіпаємо
+        removed = [p for p in snapshot if p not in files]
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                new_seq, pulled = self._write_records(conn, state, changed, removed)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        self._seq = new_seq
+        snapshot.update(changed)
+        for p in removed:
+            snapshot.pop(p, None)
+        if pulled:
+            counters = summary.ensure_counters(state)
+            for p, rec in pulled.items():
+                old = files.pop(p, None)
+                if isinstance(old, RECORD_TYPES):
+                    summary.remove_record(counters, old)
+                if rec is not None:
+                    files[p] = to_record(rec)
+                    summary.add_record(counters, files[p])
+
+    def load_record(self, file_path: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT data FROM files WHERE path = ?", (file_path,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        try:
+            rec = json.loads(row[0])
+        except Exception:
+            return None
+        return rec if isinstance(rec, dict) else None
+
+    def vacuum(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def _load_summary(self, conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (summary.SUMMARY_KEY,)).fetchone()
+        if row is None:
+            return None
+        try:
+            counters = json.loads(row[0])
+        except Exception:
+            return None
+        return counters if isinstance(counters, dict) else None
+
+    def load_summary(self) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            return self._load_summary(conn)
+        finally:
+            conn.close()
+
+    def update_record(self, file_path: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM files WHERE path = ?", (file_path,)).fetchone()
+                old: Optional[Dict[str, Any]] = None
+                if row is not None:
+                    try:
+                        loaded = json.loads(row[0])
+                        if isinstance(loaded, dict):
+                            old = loaded
+                    except Exception:
+                        old = None
+                rec = dict(old or {})
+                rec.update(fields)
+                seq = self._read_seq(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO files(path, data, seq) VALUES (?, ?, ?)",
+                    (file_path, _dumps(rec), seq + 1),
+                )
+                counters = self._load_summary(conn)
+                if summary.is_valid(counters):
+                    summary.update_record(counters, old, rec)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+                        (summary.SUMMARY_KEY, _dumps(counters)),
+                    )
+                # self._seq не рухаємо: state у пам'яті цього запису не бачив,
+                # тож наступний save() підтягне його (files.seq > self._seq)
+                self._bump_seq(conn, seq)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return rec
+
+    def save_records(
+        self,
+        records: Dict[str, Dict[str, Any]],
+        removed: Iterable[str] = (),
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Повертає зміни з інших процесів, яких state викликача ще не бачив:
+        path -> запис (чужий або злитий з нашим) чи None (запис видалено).
+        StateCache кладе їх у пам'ять.
+        """
+        rows = {p: _dumps(record_to_dict(rec)) for p, rec in records.items() if isinstance(rec, RECORD_TYPES)}
+        removed = list(removed)
+        meta = dict(meta or {})
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                new_seq, pulled = self._write_records(conn, meta, rows, removed)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        self._seq = new_seq
+        self._snapshot.update(rows)
+        for p in removed:
+            self._snapshot.pop(p, None)
+        return pulled
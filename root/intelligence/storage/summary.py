@@ -0,0 +1,151 @@
+from typing import Any, Dict, Optional
+
+from intelligence.records import RECORD_TYPES
+from intelligence.storage.base import STATE_VERSION
+
+# ключ верхнього рівня state (і рядок у meta для SQLite)
+SUMMARY_KEY = "summary"
+# змінився формат лічильників — перебудувати з записів
+SUMMARY_VERSION = 1
+
+# поле запису -> (лічильник значень, кількість записів з непорожнім значенням)
+_FIELDS = {
+    "label": ("labels", "labeled_records"),
+    "category": ("categories", "categorized_records"),
+}
+
+
+def empty_counters() -> Dict[str, Any]:
+    return {
+        "version": SUMMARY_VERSION,
+        "state_version": STATE_VERSION,
+        "total_records": 0,
+        "labeled_records": 0,
+        "categorized_records": 0,
+        "labels": {},
+        "categories": {},
+    }
+
+
+def build_counters(files: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Повний перерахунок — тільки при зміні схеми або битих лічильниках.
+    """
+    counters = empty_counters()
+    for rec in files.values():
+        if isinstance(rec, RECORD_TYPES):
+            add_record(counters, rec)
+    return counters
+
+
+def is_valid(counters: Any, total_records: Optional[int] = None) -> bool:
+    """
+    Структура, версії і узгодженість сум (O(кількість різних label/category)).
+    total_records — якщо відомо, скільки записів у state (len(files)).
+    """
+    if not isinstance(counters, dict):
+        return False
+    if counters.get("version") != SUMMARY_VERSION or counters.get("state_version") != STATE_VERSION:
+        return False
+    total = counters.get("total_records")
+    if not isinstance(total, int) or total < 0:
+        return False
+    if total_records is not None and total != total_records:
+        return False
+    for bucket_key, count_key in _FIELDS.values():
+        bucket = counters.get(bucket_key)
+        count = counters.get(count_key)
+        if not isinstance(bucket, dict) or not isinstance(count, int):
+            return False
+        if any(not isinstance(v, int) or v <= 0 for v in bucket.values()):
+            return False
+        if sum(bucket.values()) != count or count > total:
+            return False
+    return True
+
+
+def change_field(counters: Dict[str, Any], field: str, old: Any, new: Any) -> None:
+    """
+    label / category запису змінився з old на new.
+    """
+    bucket_key, count_key = _FIELDS[field]
+    if (str(old) if old else None) == (str(new) if new else None):
+        return
+    bucket = counters[bucket_key]
+    if old:
+        key = str(old)
+        left = bucket.get(key, 0) - 1
+        if left > 0:
+            bucket[key] = left
+        else:
+            bucket.pop(key, None)
+        counters[count_key] -= 1
+    if new:
+        key = str(new)
+        bucket[key] = bucket.get(key, 0) + 1
+        counters[count_key] += 1
+
+
+def add_record(counters: Dict[str, Any], rec: Dict[str, Any]) -> None:
+    counters["total_records"] += 1
+    for field in _FIELDS:
+        change_field(counters, field, None, rec.get(field))
+
+
+def remove_record(counters: Dict[str, Any], rec: Dict[str, Any]) -> None:
+    counters["total_records"] -= 1
+    for field in _FIELDS:
+        change_field(counters, field, rec.get(field), None)
+
+
+def update_record(counters: Dict[str, Any], old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> None:
+    """
+    Запис замінено цілком (save_records / update_record у сховищі).
+    """
+    if old is None:
+        add_record(counters, new)
+        return
+    for field in _FIELDS:
+        change_field(counters, field, old.get(field), new.get(field))
+
+
+def ensure_counters(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    state[SUMMARY_KEY]; якщо немає, іншої версії або не сходиться з кількістю
+    записів — перебудовує один раз і кладе назад у state.
+    """
+    files = state.setdefault("files", {})
+    counters = state.get(SUMMARY_KEY)
+    if is_valid(counters, len(files)):
+        return counters
+
+    # не-dict записи — сміття (get_record все одно їх перезапише), інакше
+    # total_records ніколи не зійдеться з len(files)
+    for p in [p for p, rec in files.items() if not isinstance(rec, RECORD_TYPES)]:
+        del files[p]
+    counters = build_counters(files)
+    state[SUMMARY_KEY] = counters
+    return counters
+
+
+def _top(bucket: Dict[str, int]) -> Optional[str]:
+    # як Counter.most_common(1): при рівності — перший за порядком вставки
+    best = None
+    best_n = 0
+    for key, n in bucket.items():
+        if n > best_n:
+            best, best_n = key, n
+    return best
+
+
+def to_profile_summary(counters: Dict[str, Any], version: Any = STATE_VERSION) -> Dict[str, Any]:
+    return {
+        "version": version,
+        "total_records": counters["total_records"],
+        "labeled_records": counters["labeled_records"],
+        "categorized_records": counters["categorized_records"],
+        "labels": dict(counters["labels"]),
+        "categories": dict(counters["categories"]),
+        "top_label": _top(counters["labels"]),
+        "top_category": _top(counters["categories"]),
+    }
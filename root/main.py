@@ -1,55 +1,840 @@
+import os
 import sys
 import json
+import threading
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from PySide6.QtCore import QUrl, QObject, Signal, Slot
+from PySide6.QtCore import QFileSystemWatcher, QUrl, QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
 from PySide6.QtWidgets import QApplication, QMainWindow
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWebChannel import QWebChannel
 from PySide6.QtGui import QGuiApplication
 
-from scanner import scan_desktop
+from cleanup import (
+    ACTION_LABELS,
+    CleanupConfig,
+    build_plan,
+    execute_plan,
+    list_batches,
+    load_cleanup_config,
+    new_batch_id,
+    undo_batch,
+)
+from disk_usage import analyze_disk_usage
+from metrics import MetricsHistory, ScanMetrics, profiling_enabled
+from query import INDEX_AVAILABLE, FileIndex, query_files, sort_files
+from scanner import ScanResult, rescan_dirs, rescore_due, scan_desktop_result
+from selection import select_paths
+from walker import load_scan_config
+from watcher import MAX_WATCHED_DIRS, ChangeDebouncer, PollingWatcher, list_watch_dirs
+from wire import WIRE_FORMATS, RowVersions, encode_delta, encode_for
 from autorun import setup_autorun_status, is_autorun_enabled, AutorunTarget
 
 # NEW: intelligence state API
-from intelligence.state import label_file, category_file
-from intelligence.state import get_profile_summary
+from intelligence.model import file_obj_from_record, get_model
+from intelligence.rules import get_rules
+from intelligence.state_cache import StateCache
 
 
+# як часто перевіряти, чи не перетнув вік якихось файлів поріг скорингу (scanner.rescore_due);
+# коли нічого не прострочено, перевірка — це один погляд на вершину heap-а
+_RESCORE_INTERVAL_MS = 15 * 60 * 1000
+
+
+_LABELS = {"trash", "keep", "pinned", "organize"}
+_CATEGORIES = {"study", "work", "personal", "games"}
+
+
+def _normalize_choice(value: Any, allowed: Any) -> Optional[str]:
+    # "", "none", "null" і невідомі значення -> None (зняти мітку)
+    normalized = (value or "").strip().lower() if isinstance(value, str) else None
+    return normalized if normalized in allowed else None
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _ScanSignals(QObject):
+    """
+    Сигнали фонового сканування. Об'єкт живе в GUI-потоці,
+    тож emit з потоку пулу доставляється в GUI-потік через чергу подій.
+    """
+    batch = Signal(str)
+    progress = Signal(str)
+    finished = Signal(int, object, object, object)  # scan_id, ScanResult | None, watch_dirs | None, FileIndex | None
+    # watcher: папки змінились (з потоку таймера) / готовий delta
+    dirsChanged = Signal(object)
+    delta = Signal(str)
+    deltaReady = Signal(object)  # ScanResult
+    rescored = Signal(object)  # ScanResult від rescore_due
+    # очищення: прогрес (JSON) / звіт (CleanupReport)
+    cleanupProgress = Signal(str)
+    cleanupDone = Signal(object)
+    cleanupPlan = Signal(str)
+    # disk usage: готовий звіт (JSON)
+    diskUsage = Signal(str)
+
+
+class _ScanTask(QRunnable):
+    """
+    Одне сканування в QThreadPool: сканування, скоринг, JSON — поза GUI-потоком.
+    """
+
+    def __init__(
+        self,
+        scan_id: int,
+        cache: StateCache,
+        cancel: threading.Event,
+        signals: _ScanSignals,
+        history: MetricsHistory,
+        wire: str,
+    ):
+        super().__init__()
+        self._scan_id = scan_id
+        self._cache = cache
+        self._cancel = cancel
+        self._signals = signals
+        self._history = history
+        self._wire = wire
+
+    def run(self) -> None:
+        scan_id = self._scan_id
+        seq = 0
+        files_seen = 0
+        metrics = ScanMetrics(kind="full", scan_id=scan_id)
+        wire = self._wire
+        metrics.info["wire"] = wire
+
+        def on_batch(batch: List[Dict[str, Any]]) -> None:
+            nonlocal seq, files_seen
+            files_seen += len(batch)
+            with metrics.phase("serialize"):
+                payload = _dumps(
+                    {"scan_id": scan_id, "seq": seq, "format": wire, "files": encode_for(batch, wire), "done": False}
+                )
+            self._signals.batch.emit(payload)
+            self._signals.progress.emit(
+                _dumps({"scan_id": scan_id, "files_seen": files_seen})
+            )
+            seq += 1
+
+        result: Optional[ScanResult] = None
+        watch_dirs: Optional[List[str]] = None
+        index: Optional[FileIndex] = None
+        try:
+            result = scan_desktop_result(
+                cache=self._cache, on_batch=on_batch, cancel=self._cancel, metrics=metrics
+            )
+            if not result.cancelled:
+                with metrics.phase("list_watch_dirs"):
+                    watch_dirs = list_watch_dirs(load_scan_config())
+                if INDEX_AVAILABLE:
+                    # повна перебудова індексів queryFiles — тут, не в GUI-потоці
+                    with metrics.phase("index"):
+                        index = FileIndex(result.files)
+            done = {
+                "total": len(result.files),
+                "removed": result.removed,
+                "cancelled": result.cancelled,
+                "compaction": result.compaction.to_dict() if result.compaction is not None else None,
+                "error": None,
+            }
+        except Exception as e:
+            done = {"total": 0, "removed": [], "cancelled": False, "compaction": None, "error": str(e)}
+            metrics.info["error"] = str(e)
+
+        self._signals.batch.emit(
+            _dumps({"scan_id": scan_id, "seq": seq, "format": wire, "files": encode_for([], wire), "done": True, **done})
+        )
+
+        # файли, змінені після стріму (дублікати за вмістом) — окремим delta
+        if result is not None and result.updated:
+            updated = set(result.updated)
+            self._signals.delta.emit(
+                _dumps(encode_delta(wire, changed=[f for f in result.files if f["path"] in updated]))
+            )
+
+        metrics.finish()
+        metrics.info["cancelled"] = bool(result is not None and result.cancelled)
+        self._history.record(metrics)
+        self._signals.finished.emit(scan_id, result, watch_dirs, index)
+
+
+class _DeltaTask(QRunnable):
+    """
+    Інкрементальний rescan папок, про які повідомив watcher -> filesDelta.
+    Йде в тому ж однопотоковому пулі, що й сканування, тож не перетинається з ним.
+    """
+
+    def __init__(
+        self,
+        dirs: List[str],
+        known_dirs: List[str],
+        cache: StateCache,
+        signals: _ScanSignals,
+        history: MetricsHistory,
+        wire: str,
+    ):
+        super().__init__()
+        self._dirs = dirs
+        self._known_dirs = known_dirs
+        self._cache = cache
+        self._signals = signals
+        self._history = history
+        self._wire = wire
+
+    def run(self) -> None:
+        try:
+            result = rescan_dirs(self._dirs, cache=self._cache, known_dirs=self._known_dirs)
+        except Exception:
+            return
+        if result.metrics is not None:
+            result.metrics.info["dirs"] = len(self._dirs)
+            self._history.record(result.metrics)
+
+        files_by_status: Dict[str, List[Dict[str, Any]]] = {"added": [], "changed": [], "renamed": []}
+        for f in result.files:
+            bucket = files_by_status.get(f.get("scan_status") or "")
+            if bucket is not None:
+                bucket.append(f)
+
+        if not (result.removed or any(files_by_status.values())):
+            if result.dirs_added or result.dirs_removed:
+                self._signals.deltaReady.emit(result)
+            return
+
+        renamed_from = {new: old for old, new in result.renamed}
+
+        self._signals.delta.emit(
+            _dumps(
+                encode_delta(
+                    self._wire,
+                    added=files_by_status["added"],
+                    changed=files_by_status["changed"],
+                    renamed=[(renamed_from.get(f["path"]), f) for f in files_by_status["renamed"]],
+                    removed=result.removed,
+                )
+            )
+        )
+        self._signals.deltaReady.emit(result)
+
+
+class _RescoreTask(QRunnable):
+    """
+    Перерахунок score-ів, яким час (вік файлу перетнув поріг скорингу) -> filesDelta "changed".
+    У тому ж однопотоковому пулі, що й сканування.
+    """
+
+    def __init__(self, cache: StateCache, signals: _ScanSignals, history: MetricsHistory, wire: str):
+        super().__init__()
+        self._cache = cache
+        self._signals = signals
+        self._history = history
+        self._wire = wire
+
+    def run(self) -> None:
+        try:
+            result = rescore_due(cache=self._cache)
+        except Exception:
+            return
+        # порожні перевірки (нічого не прострочено) історію не засмічують
+        if result.metrics is not None and result.metrics.counters.get("scored"):
+            self._history.record(result.metrics)
+        if not result.files:
+            return
+
+        self._signals.delta.emit(_dumps(encode_delta(self._wire, changed=result.files)))
+        self._signals.rescored.emit(result)
+
+
+class _CleanupTask(QRunnable):
+    """
+    Побудова і виконання плану очищення або undo пачки — у тому ж однопотоковому пулі,
+    що й сканування (state не змінюється посеред сканування); файлові операції
+    всередині йдуть в обмеженому пулі потоків cleanup.execute_plan.
+    """
+
+    def __init__(self, run: Any, batch_id: str, signals: _ScanSignals):
+        super().__init__()
+        self._run = run
+        self._batch_id = batch_id
+        self._signals = signals
+
+    def run(self) -> None:
+        batch_id = self._batch_id
+
+        def on_progress(done: int, total: int) -> None:
+            self._signals.cleanupProgress.emit(_dumps({"batch_id": batch_id, "done": done, "total": total}))
+
+        try:
+            report = self._run(on_progress)
+        except Exception as e:
+            report = {"batch_id": batch_id, "error": str(e)}
+        self._signals.cleanupDone.emit(report)
+
+
+class _CleanupPlanTask(QRunnable):
+    """
+    План очищення для planCleanup (build_plan перевіряє кожен файл на диску) —
+    у пулі, результат — cleanupPlan.
+    """
+
+    def __init__(self, build: Any, signals: _ScanSignals):
+        super().__init__()
+        self._build = build
+        self._signals = signals
+
+    def run(self) -> None:
+        try:
+            payload = self._build().to_dict()
+        except Exception as e:
+            payload = {"error": str(e)}
+        self._signals.cleanupPlan.emit(_dumps(payload))
+
+
+class _DiskUsageTask(QRunnable):
+    """
+    Розміри папок (disk_usage.analyze_disk_usage) — в окремому пулі: перший обхід
+    великого дерева довгий і не повинен затримувати сканування та watcher.
+    """
+
+    def __init__(self, options: Dict[str, Any], categories: Dict[str, str], cancel: threading.Event, signals: _ScanSignals):
+        super().__init__()
+        self._options = options
+        self._categories = categories
+        self._cancel = cancel
+        self._signals = signals
+
+    def run(self) -> None:
+        opts = self._options
+        roots = opts.get("roots")
+        try:
+            usage = analyze_disk_usage(
+                roots=[str(r) for r in roots] if isinstance(roots, list) and roots else None,
+                categories=self._categories,
+                refresh=bool(opts.get("refresh")),
+                cancel=self._cancel,
+            )
+            payload = usage.to_dict(top=int(opts.get("top") or 50))
+            payload["error"] = None
+        except Exception as e:
+            payload = {"error": str(e)}
+        self._signals.diskUsage.emit(_dumps(payload))
+
 
 class DesktopBridge(QObject):
-    filesUpdated = Signal(str)
+    # {"scan_id", "seq", "files": [...], "done": false}
+    # останнє повідомлення: {"scan_id", "seq", "files": [], "done": true, "total", "removed", "cancelled", "error"}
+    filesBatch = Signal(str)
+    # {"scan_id", "files_seen"}
+    scanProgress = Signal(str)
+    # зміни від watcher-а: {"added": [...], "changed": [...], "renamed": [{"from", "file"}], "removed": [paths]};
+    # перерахунок застарілих score-ів (rescore_due) приходить тим самим сигналом у "changed"
+    filesDelta = Signal(str)
+    # {"batch_id", "done", "total"}
+    cleanupProgress = Signal(str)
+    # CleanupReport.to_dict() (+ "error")
+    cleanupFinished = Signal(str)
+    # CleanupPlan.to_dict() (+ "error") — відповідь на planCleanup
+    cleanupPlanned = Signal(str)
+    # DiskUsage.to_dict() (+ "error")
+    diskUsageReady = Signal(str)
 
     def __init__(self, autorun_target: AutorunTarget):
         super().__init__()
         self._autorun_target = autorun_target
+        # state у пам'яті: кліки в UI не пишуть на диск кожен раз
+        self._state = StateCache()
+        self._metrics_history = MetricsHistory()
+        self._scan_id = 0
+        # результат останнього сканування — для getFiles
+        self._files: List[Dict[str, Any]] = []
+        # формат payload-ів (wire.WIRE_FORMATS) і версії рядків для getFilesSince
+        self._wire_format = "json"
+        self._versions = RowVersions()
+        # індекси для queryFiles (query.FileIndex); без numpy — None, queryFiles іде по self._files
+        self._index: Optional[FileIndex] = FileIndex() if INDEX_AVAILABLE else None
+
+        # фонове сканування: одне за раз, новий запит скасовує поточне
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._scan_signals = _ScanSignals(self)
+        self._scan_signals.batch.connect(self.filesBatch)
+        self._scan_signals.progress.connect(self.scanProgress)
+        self._scan_signals.finished.connect(self._on_scan_finished)
+        self._scan_cancel: Optional[threading.Event] = None
+        self._scan_running = False
+        self._rescan_pending = False
+
+        # watcher: QFileSystemWatcher (inotify/ReadDirectoryChangesW), polling — як запасний
+        self._scan_signals.dirsChanged.connect(self._on_dirs_changed)
+        self._scan_signals.delta.connect(self.filesDelta)
+        self._scan_signals.deltaReady.connect(self._on_delta_ready)
+        self._debouncer = ChangeDebouncer(lambda dirs: self._scan_signals.dirsChanged.emit(sorted(dirs)))
+        self._fs_watcher: Optional[QFileSystemWatcher] = None
+        self._poller: Optional[PollingWatcher] = None
+        # усі папки під спостереженням (QFileSystemWatcher + polling)
+        self._watched: Set[str] = set()
+
+        # фоновий перерахунок score-ів, що застаріли з часом (без обходу диска)
+        self._scan_signals.rescored.connect(self._on_rescored)
+        self._rescore_timer = QTimer(self)
+        self._rescore_timer.setInterval(_RESCORE_INTERVAL_MS)
+        self._rescore_timer.timeout.connect(self._rescore)
+        self._rescore_timer.start()
+
+        self._scan_signals.cleanupProgress.connect(self.cleanupProgress)
+        self._scan_signals.cleanupDone.connect(self._on_cleanup_done)
+        self._scan_signals.cleanupPlan.connect(self.cleanupPlanned)
+        self._cleanup_cancel: Optional[threading.Event] = None
+
+        # disk usage — свій однопотоковий пул (обходи всередині — паралельні)
+        self._du_pool = QThreadPool(self)
+        self._du_pool.setMaxThreadCount(1)
+        self._scan_signals.diskUsage.connect(self.diskUsageReady)
+        self._du_cancel: Optional[threading.Event] = None
+
+    def shutdown(self) -> None:
+        self._rescan_pending = False
+        self._rescore_timer.stop()
+        self._stop_watching()
+        self._debouncer.close()
+        if self._scan_cancel is not None:
+            self._scan_cancel.set()
+        if self._cleanup_cancel is not None:
+            self._cleanup_cancel.set()
+        if self._du_cancel is not None:
+            self._du_cancel.set()
+        self._pool.waitForDone(5000)
+        self._du_pool.waitForDone(5000)
+        self._state.close()
+        try:
+            get_model().flush()
+        except Exception:
+            pass
+
+    # -------------------- watcher --------------------
+
+    def _stop_watching(self) -> None:
+        if self._fs_watcher is not None:
+            self._fs_watcher.deleteLater()
+            self._fs_watcher = None
+        if self._poller is not None:
+            self._poller.stop()
+            self._poller = None
+        self._watched = set()
+
+    def _watch(self, dirs: List[str]) -> None:
+        """
+        Ставить папки на спостереження (після кожного повного сканування).
+        DESKTOPCLEANER_WATCH=poll — тільки polling, =off — без watcher-а.
+        """
+        self._stop_watching()
+        mode = os.environ.get("DESKTOPCLEANER_WATCH", "").strip().lower()
+        if mode == "off" or not dirs:
+            return
+
+        failed = list(dirs)
+        if mode != "poll":
+            self._fs_watcher = QFileSystemWatcher(self)
+            self._fs_watcher.directoryChanged.connect(self._debouncer.notify)
+            failed = list(self._fs_watcher.addPaths(dirs))
+
+        if failed:
+            self._poller = PollingWatcher(failed, self._debouncer.notify)
+            self._poller.start()
+        self._watched = set(dirs)
+
+    def _update_watch(self, added: List[str], removed: List[str]) -> None:
+        """
+        Після rescan: нові підпапки — на спостереження (до MAX_WATCHED_DIRS),
+        зниклі папки разом з усіма вкладеними — зняти.
+        """
+        if self._fs_watcher is None and self._poller is None:
+            return
+        if removed:
+            prefixes = tuple(os.path.normcase(d.rstrip("\\/") + os.sep) for d in removed)
+            gone = set(removed) | {d for d in self._watched if os.path.normcase(d).startswith(prefixes)}
+            gone &= self._watched
+            if gone:
+                if self._fs_watcher is not None:
+                    watching = set(self._fs_watcher.directories())
+                    self._fs_watcher.removePaths([d for d in gone if d in watching])
+                if self._poller is not None:
+                    self._poller.remove(gone)
+                self._watched -= gone
+        added = [d for d in added if d not in self._watched][: max(0, MAX_WATCHED_DIRS - len(self._watched))]
+        if not added:
+            return
+        failed = list(added)
+        if self._fs_watcher is not None:
+            failed = list(self._fs_watcher.addPaths(added))
+        if failed:
+            if self._poller is None:
+                self._poller = PollingWatcher(failed, self._debouncer.notify)
+                self._poller.start()
+            else:
+                self._poller.add(failed)
+        self._watched.update(added)
+
+    def _on_dirs_changed(self, dirs: List[str]) -> None:
+        self._pool.start(
+            _DeltaTask(
+                list(dirs), sorted(self._watched), self._state, self._scan_signals,
+                self._metrics_history, self._wire_format,
+            )
+        )
+
+    def _on_delta_ready(self, result: ScanResult) -> None:
+        self._update_watch(result.dirs_added, result.dirs_removed)
+        gone = set(result.removed) | {old for old, _new in result.renamed}
+        fresh = {
+            f["path"]: f
+            for f in result.files
+            if f.get("scan_status") in ("added", "changed", "renamed")
+        }
+        self._rows_changed(list(fresh.values()), gone)
+        files = [fresh.pop(f["path"], f) for f in self._files if f["path"] not in gone]
+        files.extend(fresh.values())
+        self._files = files
+
+    def _rescore(self) -> None:
+        # повне сканування однаково перевіряє due кожного файлу
+        if self._scan_running:
+            return
+        self._pool.start(_RescoreTask(self._state, self._scan_signals, self._metrics_history, self._wire_format))
+
+    def _on_rescored(self, result: ScanResult) -> None:
+        fresh = {f["path"]: f for f in result.files}
+        self._rows_changed(result.files)
+        self._files = [fresh.get(f["path"], f) for f in self._files]
+
+    def _rows_changed(self, changed: List[Dict[str, Any]], removed: Any = ()) -> None:
+        # точкові зміни self._files -> версії для getFilesSince і індекси queryFiles
+        self._versions.update(changed, removed)
+        if self._index is not None:
+            self._index.update(changed, removed)
 
     @Slot()
     def scanDesktop(self):
+        """
+        Запускає сканування у фоні; результати приходять через filesBatch.
+        Якщо сканування вже йде — воно скасовується, а після нього
+        запускається одне нове (кілька запитів поспіль зливаються в один).
+        """
+        if self._scan_running:
+            self._rescan_pending = True
+            if self._scan_cancel is not None:
+                self._scan_cancel.set()
+            return
+        self._start_scan()
+
+    def _start_scan(self) -> None:
+        self._scan_id += 1
+        self._scan_cancel = threading.Event()
+        self._scan_running = True
+        self._pool.start(
+            _ScanTask(
+                self._scan_id,
+                self._state,
+                self._scan_cancel,
+                self._scan_signals,
+                self._metrics_history,
+                self._wire_format,
+            )
+        )
+
+    def _on_scan_finished(
+        self,
+        scan_id: int,
+        result: Optional[ScanResult],
+        watch_dirs: Optional[List[str]],
+        index: Optional[FileIndex] = None,
+    ) -> None:
+        self._scan_running = False
+        if result is not None and not result.cancelled:
+            self._files = result.files
+            self._versions.sync(result.files)
+            if index is not None:
+                self._index = index
+        if watch_dirs is not None:
+            self._watch(watch_dirs)
+
+        if self._rescan_pending:
+            self._rescan_pending = False
+            self._start_scan()
+
+    @Slot(int, int, str, result=str)
+    def getFiles(self, offset: int, limit: int, sort: str) -> str:
+        """
+        Сторінка результатів останнього сканування.
+        sort: "<field>[:asc|:desc]", порожній — у порядку сканування.
+        """
         try:
-            files = scan_desktop()
-            payload = json.dumps(
-                {"files": files, "error": None},
+            files = sort_files(self._files, sort)
+            offset = max(0, int(offset))
+            limit = max(0, int(limit))
+            return json.dumps(
+                {
+                    "scan_id": self._scan_id,
+                    "version": self._versions.version,
+                    "total": len(files),
+                    "offset": offset,
+                    "format": self._wire_format,
+                    "files": encode_for(files[offset:offset + limit], self._wire_format),
+                    "error": None,
+                },
                 ensure_ascii=False,
                 default=str,
             )
         except Exception as e:
-            payload = json.dumps(
-                {"files": [], "error": str(e)},
+            return json.dumps({"files": [], "error": str(e)}, ensure_ascii=False)
+
+    @Slot(int, result=str)
+    def getFilesSince(self, version: int) -> str:
+        """
+        Тільки рядки, змінені після version (з попередньої відповіді getFilesSince / getFiles):
+        {"version", "since", "full", "format", "files", "removed": [paths], "error"}.
+        full=true — delta неможлива (0, чужа чи надто стара версія): files — увесь список.
+        """
+        try:
+            fmt = self._wire_format
+            delta = self._versions.since(int(version))
+            if delta is None:
+                files, removed = self._files, []
+            else:
+                changed = set(delta[0])
+                files = [f for f in self._files if f["path"] in changed] if changed else []
+                removed = delta[1]
+            return json.dumps(
+                {
+                    "version": self._versions.version,
+                    "since": int(version),
+                    "full": delta is None,
+                    "format": fmt,
+                    "files": encode_for(files, fmt),
+                    "removed": removed,
+                    "error": None,
+                },
                 ensure_ascii=False,
                 default=str,
             )
-        self.filesUpdated.emit(payload)
-    
+        except Exception as e:
+            return json.dumps({"files": [], "removed": [], "full": True, "error": str(e)}, ensure_ascii=False)
+
+    @Slot(str, str, int, int, result=str)
+    def queryFiles(self, selector: str, sort: str, offset: int, limit: int) -> str:
+        """
+        Фільтр + сортування + сторінка по індексах (query.FileIndex), без передачі всього списку в UI.
+        selector: JSON-об'єкт з ключами selection.SELECTOR_KEYS ("" — усі файли);
+        sort: як у getFiles.
+        -> {"version", "total", "offset", "format", "files", "took_ms", "error"}
+        """
+        try:
+            started = time.perf_counter()
+            request = json.loads(selector) if selector else {}
+            if self._index is not None:
+                total, page = self._index.query(request, sort, offset, limit)
+            else:
+                total, page = query_files(self._files, request, sort, offset, limit)
+            took_ms = (time.perf_counter() - started) * 1000.0
+            return json.dumps(
+                {
+                    "version": self._versions.version,
+                    "total": total,
+                    "offset": max(0, int(offset)),
+                    "format": self._wire_format,
+                    "files": encode_for(page, self._wire_format),
+                    "took_ms": round(took_ms, 3),
+                    "error": None,
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+        except Exception as e:
+            return json.dumps({"total": 0, "files": [], "error": str(e)}, ensure_ascii=False)
+
+    @Slot(str, result=str)
+    def setWireFormat(self, fmt: str) -> str:
+        """
+        "json" (за замовчуванням) | "columnar" (wire.encode_files) для filesBatch, filesDelta,
+        getFiles, getFilesSince. Діє з наступного сканування / delta; повертає активний формат.
+        """
+        fmt = (fmt or "").strip().lower()
+        if fmt in WIRE_FORMATS:
+            self._wire_format = fmt
+        return self._wire_format
+
     @Slot(result=str)
     def getProfileSummary(self) -> str:
         try:
-            summary = get_profile_summary()
+            summary = self._state.summary()
+            summary["model"] = get_model().info()
+            summary["rules"] = get_rules().info()
             return json.dumps(summary, ensure_ascii=False)
         except Exception as e:
             return json.dumps({"error": str(e)}, ensure_ascii=False)
 
 
+    @Slot(result=str)
+    def getScanMetrics(self) -> str:
+        """
+        Час фаз і лічильники останніх сканувань (повних і delta від watcher-а).
+        {"last": {...} | null, "history": [...], "log_path": str | null, "profiling": bool}
+        """
+        try:
+            log_path = self._metrics_history.log_path
+            return json.dumps(
+                {
+                    "last": self._metrics_history.last(),
+                    "history": self._metrics_history.items(),
+                    "log_path": str(log_path) if log_path is not None else None,
+                    "profiling": profiling_enabled(),
+                },
+                ensure_ascii=False,
+            )
+        except Exception as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+    # -------------------- cleanup --------------------
+
+    @staticmethod
+    def _cleanup_options(options: str) -> Tuple[CleanupConfig, Optional[List[str]], bool]:
+        opts = json.loads(options) if options else {}
+        if not isinstance(opts, dict):
+            opts = {}
+        config = load_cleanup_config()
+        if "permanent" in opts:
+            config.permanent = bool(opts["permanent"])
+        paths = opts.get("paths")
+        return config, [str(p) for p in paths] if isinstance(paths, list) else None, bool(opts.get("dry_run"))
+
+    def _build_cleanup_plan(
+        self, config: CleanupConfig, paths: Optional[List[str]], batch_id: Optional[str] = None
+    ) -> Any:
+        """
+        У потоці пулу: під lock-ом state — тільки копії потрібних записів,
+        перевірки диска (isfile, вільне ім'я призначення) — вже без нього.
+        """
+        files = self._state.records(paths, labels=None if paths is not None else ACTION_LABELS)
+        return build_plan(files, config, paths=paths, batch_id=batch_id)
+
+    @Slot(str, result=bool)
+    def planCleanup(self, options: str) -> bool:
+        """
+        Що зробить runCleanup з цими параметрами (без змін на диску), у фоні.
+        options: {"paths": [...] | null (усі з label trash/organize), "permanent": bool}
+        Результат — cleanupPlanned:
+        {"batch_id", "counts": {"trash": n, ...}, "actions": [{"kind", "src", "dst"}], "skipped": [...]}
+        """
+        try:
+            config, paths, _dry = self._cleanup_options(options)
+            self._pool.start(_CleanupPlanTask(lambda: self._build_cleanup_plan(config, paths), self._scan_signals))
+            return True
+        except Exception:
+            return False
+
+    @Slot(str, result=str)
+    def runCleanup(self, options: str) -> str:
+        """
+        Будує і виконує план у фоні: прогрес — cleanupProgress, результат — cleanupFinished.
+        options — як у planCleanup + "dry_run": true (тільки перевірка кожної дії).
+        Повертає {"batch_id"} одразу.
+        """
+        try:
+            config, paths, dry_run = self._cleanup_options(options)
+            batch_id = new_batch_id()
+            cancel = threading.Event()
+            self._cleanup_cancel = cancel
+
+            def run(on_progress: Any) -> Any:
+                plan = self._build_cleanup_plan(config, paths, batch_id)
+                return execute_plan(
+                    plan,
+                    dry_run=dry_run,
+                    cache=self._state,
+                    workers=config.workers,
+                    on_progress=on_progress,
+                    cancel=cancel,
+                )
+
+            self._pool.start(_CleanupTask(run, batch_id, self._scan_signals))
+            return json.dumps({"batch_id": batch_id, "error": None}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"batch_id": None, "error": str(e)}, ensure_ascii=False)
+
+    @Slot(str, result=bool)
+    def undoCleanup(self, batch_id: str) -> bool:
+        """
+        Повертає файли пачки на місце (у фоні, результат — cleanupFinished з "undo": true).
+        """
+        try:
+            cancel = threading.Event()
+            self._cleanup_cancel = cancel
+            config = load_cleanup_config()
+
+            def run(on_progress: Any) -> Any:
+                return undo_batch(
+                    batch_id, cache=self._state, workers=config.workers, on_progress=on_progress, cancel=cancel
+                )
+
+            self._pool.start(_CleanupTask(run, batch_id, self._scan_signals))
+            return True
+        except Exception:
+            return False
+
+    @Slot()
+    def cancelCleanup(self) -> None:
+        if self._cleanup_cancel is not None:
+            self._cleanup_cancel.set()
+
+    @Slot(result=str)
+    def getCleanupHistory(self) -> str:
+        try:
+            return json.dumps({"batches": list_batches(), "error": None}, ensure_ascii=False)
+        except Exception as e:
+            return json.dumps({"batches": [], "error": str(e)}, ensure_ascii=False)
+
+    # -------------------- disk usage --------------------
+
+    @Slot(str, result=bool)
+    def analyzeDiskUsage(self, options: str) -> bool:
+        """
+        Розміри папок і розбивки по розширенню / категорії / віку у фоні;
+        результат — diskUsageReady. Новий запит скасовує попередній.
+        options: {"roots": [...] | null (з scan_config.json), "refresh": bool (без кешу), "top": n}
+        """
+        try:
+            opts = json.loads(options) if options else {}
+            if not isinstance(opts, dict):
+                raise ValueError("options must be an object")
+            if self._du_cancel is not None:
+                self._du_cancel.set()
+            cancel = threading.Event()
+            self._du_cancel = cancel
+            self._du_pool.start(_DiskUsageTask(opts, self._state.categories(), cancel, self._scan_signals))
+            return True
+        except Exception:
+            return False
+
+    @Slot()
+    def cancelDiskUsage(self) -> None:
+        if self._du_cancel is not None:
+            self._du_cancel.set()
+
+    def _on_cleanup_done(self, report: Any) -> None:
+        payload = report if isinstance(report, dict) else report.to_dict()
+        if not isinstance(report, dict) and not report.dry_run and not report.undo and report.done:
+            # переміщені файли більше не на своїх місцях — прибрати з getFiles;
+            # watcher однаково пришле filesDelta для папок, які він бачить
+            gone = set(report.processed)
+            self._files = [f for f in self._files if f["path"] not in gone]
+            self._rows_changed([], gone)
+        self.cleanupFinished.emit(_dumps(payload))
+
     @Slot(bool, result=str)
     def setAutorun(self, enabled: bool) -> str:
         return setup_autorun_status(enable_autorun=enabled, target=self._autorun_target)
@@ -65,18 +850,35 @@ class DesktopBridge(QObject):
         label: "trash" | "keep" | "pinned" | "organize" | "none"
         """
         try:
-            normalized = (label or "").strip().lower()
-            if normalized in ("", "none", "null"):
-                normalized = None
-
-            allowed = {None, "trash", "keep", "pinned", "organize"}
-            if normalized not in allowed:
-                normalized = None
-
-            return bool(label_file(path, normalized))
+            normalized = _normalize_choice(label, _LABELS)
+            rec = self._state.set_label(path, normalized)
+            self._learn([(path, rec, normalized)])
+            self._set_field({path}, "user_label", normalized)
+            return True
         except Exception:
             return False
 
+    def _learn(self, samples: List[Any]) -> None:
+        """
+        Нові мітки (path, rec, label) -> крок навчання моделі скорингу (intelligence.model)
+        з file_obj останнього сканування; ваги пишуться відкладено (schedule_save).
+        Помилка моделі не повинна ламати збереження мітки.
+        """
+        try:
+            model = get_model()
+            generation = model.generation
+            examples = []
+            for path, rec, label in samples:
+                f = self._find_file(path)
+                examples.append((f if f is not None else file_obj_from_record(path, rec), rec, label))
+            if model.learn(examples):
+                model.schedule_save()
+            # score-и помітно змінились — перерахувати кешовані, не чекаючи сканування
+            if model.generation != generation:
+                self._rescore()
+        except Exception:
+            pass
+
     # categories (study/work/personal/games/none) 
     @Slot(str, str, result=bool)
     def setCategory(self, path: str, category: str) -> bool:
@@ -84,18 +886,101 @@ class DesktopBridge(QObject):
         category: "study" | "work" | "personal" | "games" | "none"
         """
         try:
-            normalized = (category or "").strip().lower()
-            if normalized in ("", "none", "null"):
-                normalized = None
-
-            allowed = {None, "study", "work", "personal", "games"}
-            if normalized not in allowed:
-                normalized = None
-
-            return bool(category_file(path, normalized))
+            normalized = _normalize_choice(category, _CATEGORIES)
+            self._state.set_category(path, normalized)
+            self._set_field({path}, "user_category", normalized)
+            return True
         except Exception:
             return False
 
+    # -------------------- bulk --------------------
+
+    def _find_file(self, path: str) -> Optional[Dict[str, Any]]:
+        if self._index is not None:
+            return self._index.get(path)
+        return next((f for f in self._files if f["path"] == path), None)
+
+    def _bulk_targets(self, request: Dict[str, Any]) -> Tuple[List[str], Set[str]]:
+        """
+        {"paths": [...]} або {"selector": {...}} (selection.compile_selector — по
+        результатах останнього сканування); обидва — об'єднання без повторів.
+        Друге — шляхи, вибрані тільки selector-ом за score (min_score / max_score):
+        мітки на них — вибір самої моделі, не вчимось на них.
+        """
+        paths = request.get("paths")
+        explicit: List[str] = [str(p) for p in paths] if isinstance(paths, list) else []
+        out = list(explicit)
+        by_score: Set[str] = set()
+        if "selector" in request:
+            selector = request.get("selector")
+            selected = select_paths(self._files, selector)
+            out.extend(selected)
+            if isinstance(selector, dict) and ("min_score" in selector or "max_score" in selector):
+                by_score = set(selected) - set(explicit)
+        return list(dict.fromkeys(out)), by_score
+
+    def _set_field(self, paths: Any, field: str, value: Optional[str]) -> None:
+        # getFiles / queryFiles / наступні selector-и бачать нові мітки без пересканування
+        if not paths:
+            return
+        if self._index is not None:
+            found = [self._index.get(p) for p in paths]
+        else:
+            found = [f for f in self._files if f["path"] in paths]
+        touched = []
+        for f in found:
+            if f is not None and f.get(field) != value:
+                f[field] = value
+                touched.append(f)
+        if touched:
+            self._rows_changed(touched)
+
+    def _bulk_apply(self, payload: str, key: str, allowed: Any) -> str:
+        try:
+            request = json.loads(payload) if payload else {}
+            if not isinstance(request, dict):
+                raise ValueError("payload must be an object")
+            value = _normalize_choice(request.get(key), allowed)
+            paths, by_score = self._bulk_targets(request)
+
+            if key == "label":
+                changes = self._state.set_labels(paths, value)
+                self._learn([(p, rec, value) for p, old, rec in changes if old != value and p not in by_score])
+            else:
+                changes = self._state.set_categories(paths, value)
+
+            changed = {p for p, old, _rec in changes if old != value}
+            self._set_field(changed, "user_label" if key == "label" else "user_category", value)
+
+            return json.dumps(
+                {
+                    key: value,
+                    "total": len(changes),
+                    "changed": len(changed),
+                    "results": [{"path": p, "ok": True, "changed": old != value} for p, old, _rec in changes],
+                    "error": None,
+                },
+                ensure_ascii=False,
+            )
+        except Exception as e:
+            return json.dumps({key: None, "total": 0, "changed": 0, "results": [], "error": str(e)}, ensure_ascii=False)
+
+    @Slot(str, result=str)
+    def labelFiles(self, payload: str) -> str:
+        """
+        Одна мітка для багатьох файлів — одна зміна state, один запис на диск.
+        payload: {"label": "trash", "paths": [...]} або
+                 {"label": "trash", "selector": {"min_score": 0.8, "ext": [".tmp"], ...}}
+        -> {"label", "total", "changed", "results": [{"path", "ok", "changed"}], "error"}
+        """
+        return self._bulk_apply(payload, "label", _LABELS)
+
+    @Slot(str, result=str)
+    def categorizeFiles(self, payload: str) -> str:
+        """
+        Як labelFiles, але {"category": "work", ...}.
+        """
+        return self._bulk_apply(payload, "category", _CATEGORIES)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -174,6 +1059,7 @@ class MainWindow(QMainWindow):
 def main():
     app = QApplication(sys.argv)
     window = MainWindow()
+    app.aboutToQuit.connect(window.bridge.shutdown)
     window.show()
     sys.exit(app.exec())
 
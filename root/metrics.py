@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# скільки останніх сканувань тримати в пам'яті (getScanMetrics)
+HISTORY_SIZE = 20
+# scan_metrics.jsonl обрізається до останніх LOG_KEEP_LINES, коли більший за LOG_MAX_BYTES
+LOG_MAX_BYTES = 1024 * 1024
+LOG_KEEP_LINES = 500
+# скільки рядків cProfile-статистики класти в метрики
+PROFILE_TOP = 25
+
+
+def _app_dir() -> Optional[Path]:
+    try:
+        from intelligence.storage.paths import get_app_dir  # type: ignore
+        return get_app_dir()
+    except Exception:
+        return None
+
+
+def profiling_enabled() -> bool:
+    """
+    DESKTOPCLEANER_PROFILE=1 — кожне сканування під cProfile
+    (.prof у <app_dir>/profiles + топ функцій у метриках).
+    """
+    return os.environ.get("DESKTOPCLEANER_PROFILE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class ScanMetrics:
+    """
+    Час і лічильники фаз одного сканування.
+
+    phases[name] = {"seconds": сумарний час, "calls": скільки разів}
+    counters[name] = int
+
+    Фази потоків обходу (walk_listing / walk_stat / walk_backpressure) — сума по
+    всіх потоках, тому можуть бути більші за wall_s.
+    Методи потокобезпечні: walker пише з кількох потоків.
+    """
+
+    def __init__(self, kind: str = "full", scan_id: Optional[int] = None):
+        self.kind = kind
+        self.scan_id = scan_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.wall_s = 0.0
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.info: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            ph = self.phases.get(name)
+            if ph is None:
+                ph = self.phases[name] = {"seconds": 0.0, "calls": 0}
+            ph["seconds"] += seconds
+            ph["calls"] += calls
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self) -> "ScanMetrics":
+        self.wall_s = time.perf_counter() - self._t0
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {
+                k: {"seconds": round(v["seconds"], 6), "calls": int(v["calls"])}
+                for k, v in sorted(self.phases.items(), key=lambda kv: -kv[1]["seconds"])
+            }
+            return {
+                "kind": self.kind,
+                "scan_id": self.scan_id,
+                "started_at": self.started_at,
+                "wall_s": round(self.wall_s, 6),
+                "phases": phases,
+                "counters": dict(self.counters),
+                **self.info,
+            }
+
+
+@contextmanager
+def maybe_profile(metrics: ScanMetrics) -> Iterator[None]:
+    """
+    cProfile навколо блоку, якщо увімкнено DESKTOPCLEANER_PROFILE.
+    Профілюється тільки потік, що викликав (потоки walker-а — ні).
+    """
+    if not profiling_enabled():
+        yield
+        return
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        try:
+            out = io.StringIO()
+            pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            metrics.info["profile_top"] = out.getvalue().splitlines()
+            app_dir = _app_dir()
+            if app_dir is not None:
+                d = app_dir / "profiles"
+                d.mkdir(parents=True, exist_ok=True)
+                path = d / f"scan-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{metrics.kind}.prof"
+                prof.dump_stats(str(path))
+                metrics.info["profile_path"] = str(path)
+        except Exception:
+            pass
+
+
+class MetricsHistory:
+    """
+    Останні HISTORY_SIZE сканувань у пам'яті + scan_metrics.jsonl у папці додатку
+    (один JSON на рядок — для підтримки / скриптів).
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE, log_path: Optional[Path] = None):
+        self._items: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._log_path = log_path
+
+    @property
+    def log_path(self) -> Optional[Path]:
+        if self._log_path is not None:
+            return self._log_path
+        app_dir = _app_dir()
+        return app_dir / "scan_metrics.jsonl" if app_dir is not None else None
+
+    def record(self, metrics: ScanMetrics) -> Dict[str, Any]:
+        entry = metrics.to_dict()
+        with self._lock:
+            self._items.append(entry)
+            try:
+                self._append_log(entry)
+            except Exception:
+                pass
+        return entry
+
+    def _append_log(self, entry: Dict[str, Any]) -> None:
+        path = self.log_path
+        if path is None:
+            return
+        # у лог — без тексту профілю (він у .prof)
+        line = json.dumps({k: v for k, v in entry.items() if k != "profile_top"}, ensure_ascii=False)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        if path.stat().st_size > LOG_MAX_BYTES:
+            lines = path.read_text(encoding="utf-8").splitlines()[-LOG_KEEP_LINES:]
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            os.replace(tmp, path)
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._items[-1] if self._items else None
+
+    def items(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._items)
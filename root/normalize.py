@@ -0,0 +1,100 @@
+"""
+Нормалізація значень file_obj / selector-ів, спільна для selection, query і wire.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # час розбирається по одному (local_epoch)
+    np = None  # type: ignore[assignment]
+
+# у label / category: "none" — файли без мітки
+NONE_VALUES = ("", "none", "null")
+
+
+def as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def norm_ext(ext: Any) -> str:
+    ext = str(ext).strip().lower()
+    return ext if ext.startswith(".") else "." + ext
+
+
+def norm_tag(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    s = str(value).strip().lower()
+    return None if s in NONE_VALUES else s
+
+
+def local_epoch(iso: Any) -> Optional[int]:
+    # last_modified / last_access — локальний naive час (scanner._build_file_obj)
+    if not iso or not isinstance(iso, str):
+        return None
+    try:
+        return int(datetime.fromisoformat(iso).timestamp())
+    except ValueError:
+        return None
+
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+
+
+def _local_offset(day: datetime) -> Optional[float]:
+    """
+    Зсув локального часу від UTC (секунди) на добу day; None — у цю добу перехід DST.
+    """
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = day.replace(hour=23, minute=59, second=59, microsecond=0)
+    a = (start - _NAIVE_EPOCH).total_seconds() - start.timestamp()
+    b = (end - _NAIVE_EPOCH).total_seconds() - end.timestamp()
+    return a if a == b else None
+
+
+def local_epochs(values: List[Any]) -> List[Optional[int]]:
+    """
+    local_epoch для цілої колонки: numpy розбирає ISO одним викликом (як UTC),
+    а локальний зсув рахується раз на добу; доби з переходом DST — по одному.
+    """
+    if np is None or not values:
+        return epochs(values, local_epoch)
+    try:
+        arr = np.array([v if isinstance(v, str) and v else "NaT" for v in values], dtype="datetime64[us]")
+    except ValueError:
+        return epochs(values, local_epoch)
+
+    known = ~np.isnat(arr)
+    naive = arr.astype(np.int64) // 1_000_000
+    days, inverse = np.unique(naive[known] // 86400, return_inverse=True)
+    day_offsets = np.array(
+        [_local_offset(_NAIVE_EPOCH + timedelta(days=int(d))) for d in days] or [0.0],
+        dtype=np.float64,
+    )
+    offsets = np.full(len(values), np.nan)
+    offsets[known] = day_offsets[inverse.reshape(-1)] if len(days) else np.nan
+    exact = np.flatnonzero(known & np.isnan(offsets))
+
+    out: List[Optional[int]] = (naive - np.nan_to_num(offsets).astype(np.int64)).tolist()
+    for i in np.flatnonzero(~known).tolist():
+        out[i] = None
+    for i in exact.tolist():
+        out[i] = local_epoch(values[i])
+    return out
+
+
+def epochs(values: List[Any], convert: Any) -> List[Optional[int]]:
+    # last_seen_at однаковий у всіх файлів одного сканування, mtime — у файлів однієї розпаковки
+    memo: Dict[Any, Optional[int]] = {}
+    out = []
+    for v in values:
+        e = memo.get(v, memo)
+        if e is memo:
+            e = memo[v] = convert(v)
+        out.append(e)
+    return out
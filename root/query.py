@@ -0,0 +1,502 @@
+"""
+Індекси над результатами сканування для queryFiles: фільтр + сортування + сторінка
+без проходу Python-ом по всіх file_obj; без numpy — query_files прямим проходом.
+"""
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from intelligence.records import parse_iso_ts
+from normalize import as_list, local_epoch, local_epochs, norm_ext, norm_tag
+from selection import SELECTOR_KEYS, compile_selector
+
+try:
+    import numpy as np
+except ImportError:  # FileIndex недоступний, query_files працює
+    np = None  # type: ignore[assignment]
+
+# поля сортування queryFiles / getFiles
+SORT_KEYS = ("name", "ext", "size_bytes", "last_modified", "trash_score", "seen_count", "first_seen_at")
+
+_DAY_S = 86400.0
+
+# хеш-індекси: ключ selector-а -> поле file_obj
+_HASH_FIELDS = {
+    "label": "user_label",
+    "category": "user_category",
+    "ext": "ext",
+    "status": "scan_status",
+    "root": "root",
+}
+
+# відсортовані індекси: поле сортування -> колонка
+_SORTED_FIELDS = {
+    "trash_score": "score",
+    "size_bytes": "size",
+    "last_modified": "mtime",
+    "first_seen_at": "first_seen",
+    "seen_count": "seen",
+    "name": "name",
+    "ext": "ext",
+}
+
+# колонки з рядками (object): без пропусків, сортуються як str у Python
+_STR_COLUMNS = ("name", "ext", "path")
+
+# верхня межа для діапазону "починається з prefix" у відсортованих шляхах
+_PREFIX_END = "\U0010ffff"
+
+# роздільник імен у склеєному рядку для name_contains: в іменах файлів його не буває
+_NAME_SEP = "\0"
+
+# частка мертвих рядків (видалених), після якої індекс перебудовується
+_COMPACT_RATIO = 0.5
+# _SortedIndex.replace: до стількох вставок серед рівних ключів — пошук по одній, далі — один прохід по індексу
+_TIE_LOOP_MAX = 64
+
+
+def parse_sort(sort: str) -> Tuple[Optional[str], bool]:
+    """
+    "trash_score:desc" -> ("trash_score", True); невідоме поле -> (None, False) — порядок сканування.
+    """
+    field, _, direction = (sort or "").partition(":")
+    field = field.strip()
+    if field not in SORT_KEYS:
+        return None, False
+    return field, direction.strip().lower() == "desc"
+
+
+def sort_files(files: List[Dict[str, Any]], sort: str) -> List[Dict[str, Any]]:
+    field, reverse = parse_sort(sort)
+    if field is None:
+        return files
+    # None в кінець незалежно від напрямку
+    present = [f for f in files if f.get(field) is not None]
+    missing = [f for f in files if f.get(field) is None]
+    present.sort(key=lambda f: f[field], reverse=reverse)
+    return present + missing
+
+
+def query_files(
+    files: List[Dict[str, Any]],
+    selector: Optional[Dict[str, Any]],
+    sort: str,
+    offset: int,
+    limit: int,
+    now: Optional[float] = None,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    (total, сторінка) прямим проходом — запасний варіант FileIndex.query без numpy.
+    """
+    match = compile_selector(selector, now)
+    selected = sort_files([f for f in files if match(f)], sort)
+    offset = max(0, int(offset))
+    limit = max(0, int(limit))
+    return len(selected), selected[offset:offset + limit]
+
+
+def _mtime(iso: Any) -> float:
+    e = local_epoch(iso)
+    return float("nan") if e is None else float(e)
+
+
+class _HashIndex:
+    """
+    Значення поля -> код; колонка кодів по рядках; posting-списки (рядки з кодом)
+    будуються при першому запиті й скидаються тільки для кодів, яких торкнулось оновлення.
+    """
+
+    def __init__(self, values: Sequence[Any]):
+        self.codes: Dict[Any, int] = {}
+        self.col = np.fromiter((self._code(v) for v in values), dtype=np.int32, count=len(values))
+        self._postings: Dict[int, Any] = {}
+
+    def _code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+        return code
+
+    def grow(self, n: int) -> None:
+        if n > len(self.col):
+            col = np.full(max(n, 2 * len(self.col)), -1, dtype=np.int32)
+            col[:len(self.col)] = self.col
+            self.col = col
+
+    def set(self, row: int, value: Any) -> None:
+        old = int(self.col[row])
+        new = self._code(value)
+        if old != new:
+            self._postings.pop(old, None)
+            self._postings.pop(new, None)
+            self.col[row] = new
+
+    def clear(self, row: int) -> None:
+        old = int(self.col[row])
+        if old >= 0:
+            self._postings.pop(old, None)
+            self.col[row] = -1
+
+    def rows(self, values: Iterable[Any]) -> Any:
+        parts = []
+        for v in values:
+            code = self.codes.get(v)
+            if code is None:
+                continue
+            posting = self._postings.get(code)
+            if posting is None:
+                posting = self._postings[code] = np.flatnonzero(self.col == code)
+            parts.append(posting)
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def _tie_starts(keys: Any) -> Any:
+    """
+    Для кожної позиції відсортованих keys — початок її групи рівних ключів (NaN рівні між собою).
+    """
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = keys[1:] != keys[:-1]
+    if keys.dtype != object:
+        nan = np.isnan(keys)
+        new_group[1:] &= ~(nan[1:] & nan[:-1])
+    return np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+
+
+class _SortedIndex:
+    """
+    keys — значення по зростанню, rows — відповідні рядки; рівні ключі — по зростанню
+    рядка (порядок files), як у стабільного sort_files.
+    Числові колонки: NaN (немає значення) у кінці; рядкові (object) пропусків не мають.
+    """
+
+    def __init__(self, values: Any):
+        self.rows = np.argsort(values, kind="stable")
+        self.keys = values[self.rows]
+        # rows для спадного порядку (ordered), будується при першому запиті
+        self._desc: Optional[Any] = None
+
+    def _present(self) -> int:
+        # скільки ключів до першого NaN
+        if self.keys.dtype == object:
+            return len(self.keys)
+        return int(np.searchsorted(self.keys, np.nan, side="left"))
+
+    def replace(self, changed_rows: Any, new_keys: Any, n_rows: int) -> None:
+        """
+        Рядки changed_rows: старі позиції вирізаються, нові (new_keys — для перших
+        len(new_keys) з changed_rows) вставляються на свої місця — серед рівних ключів
+        за номером рядка. O(n) копіювання масивів, без повного сортування.
+        """
+        hit = np.zeros(n_rows, dtype=bool)
+        hit[changed_rows] = True
+        keep = ~hit[self.rows]
+        keys, rows = self.keys[keep], self.rows[keep]
+        if len(new_keys):
+            ins_rows = np.asarray(changed_rows[:len(new_keys)], dtype=np.int64)
+            by_row = np.argsort(ins_rows, kind="stable")
+            order = by_row[np.argsort(new_keys[by_row], kind="stable")]
+            ins_keys, ins_rows = new_keys[order], ins_rows[order]
+            pos = np.searchsorted(keys, ins_keys, side="left")
+            end = np.searchsorted(keys, ins_keys, side="right")
+            tied = np.flatnonzero(pos < end)
+            if len(tied) <= _TIE_LOOP_MAX:
+                # у групі рівних ключів рядки зростають — двійковий пошук рядка в ній
+                for i in tied:
+                    pos[i] += np.searchsorted(rows[pos[i]:end[i]], ins_rows[i])
+            else:
+                # те саме для всіх разом: (початок групи, рядок) — монотонний ключ
+                width = n_rows + 1
+                composite = _tie_starts(keys) * width + rows
+                pos[tied] = np.searchsorted(composite, pos[tied] * width + ins_rows[tied], side="left")
+            keys = np.insert(keys, pos, ins_keys)
+            rows = np.insert(rows, pos, ins_rows)
+        self.keys, self.rows = keys, rows
+        self._desc = None
+
+    def range(self, lo: Any, hi: Any) -> Any:
+        """
+        Рядки з lo <= key <= hi (NaN не входить).
+        """
+        keys = self.keys
+        start = 0 if lo is None else int(np.searchsorted(keys, lo, side="left"))
+        end = self._present() if hi is None else int(np.searchsorted(keys, hi, side="right"))
+        return self.rows[start:end]
+
+    def ordered(self, sel: Any, desc: bool) -> Any:
+        """
+        Вибрані (sel — маска по рядках) у порядку ключа; NaN у кінці в обох напрямках.
+        Рівні ключі й у спадному порядку лишаються за зростанням рядка (як sort_files(reverse=True)).
+        """
+        rows = self.rows
+        if desc:
+            if self._desc is None:
+                self._desc = self._descending()
+            rows = self._desc
+        return rows[sel[rows]]
+
+    def _descending(self) -> Any:
+        # групи рівних ключів — у зворотному порядку, рядки всередині групи — як були
+        present = self._present()
+        keys, rows = self.keys[:present], self.rows[:present]
+        starts = _tie_starts(keys)
+        ends = np.empty(present, dtype=np.int64)
+        if present:
+            group_end = np.append(np.flatnonzero(starts[1:] != starts[:-1]) + 1, present)
+            ends = np.repeat(group_end, np.diff(np.append(0, group_end)))
+        out = np.empty(present, dtype=rows.dtype)
+        out[present - ends + (np.arange(present) - starts)] = rows
+        return np.concatenate((out, self.rows[present:]))
+
+
+def _float(value: Any) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _row_values(f: Dict[str, Any]) -> Dict[str, Any]:
+    # значення колонок відсортованих індексів для одного file_obj (як у FileIndex.load)
+    return {
+        "score": _float(f.get("trash_score")),
+        "size": _float(f.get("size_bytes")),
+        "mtime": _mtime(f.get("last_modified")),
+        "first_seen": parse_iso_ts(f.get("first_seen_at")),
+        "seen": _float(f.get("seen_count")),
+        "name": str(f.get("name") or ""),
+        "ext": str(f.get("ext") or ""),
+        "path": f["path"],
+    }
+
+
+class FileIndex:
+    """
+    Результати сканування з індексами. Рядок — file_obj (той самий dict, що в UI);
+    видалені рядки лишаються "мертвими" до перебудови (_COMPACT_RATIO).
+    """
+
+    def __init__(self, files: Optional[List[Dict[str, Any]]] = None):
+        if np is None:
+            raise RuntimeError("FileIndex requires numpy")
+        self.load(files or [])
+
+    # -------------------- build / update --------------------
+
+    def load(self, files: List[Dict[str, Any]]) -> None:
+        """
+        Повна перебудова (після повного сканування), порядок рядків — порядок files.
+        """
+        files = list(files)
+        n = len(files)
+        self._files: List[Optional[Dict[str, Any]]] = files
+        self._row_of: Dict[str, int] = {f["path"]: i for i, f in enumerate(files)}
+        self._alive = np.ones(n, dtype=bool)
+        self._dead = 0
+
+        self._hash = {key: _HashIndex([self._hash_value(key, f) for f in files]) for key in _HASH_FIELDS}
+
+        def numbers(key: str) -> Any:
+            return np.array([_float(f.get(key)) for f in files], dtype=np.float64).reshape(n)
+
+        def strings(values: List[Any]) -> Any:
+            col = np.empty(n, dtype=object)
+            col[:] = values
+            return col
+
+        mtimes = local_epochs([f.get("last_modified") for f in files])
+        self._cols: Dict[str, Any] = {
+            "score": numbers("trash_score"),
+            "size": numbers("size_bytes"),
+            "mtime": np.array([np.nan if e is None else e for e in mtimes], dtype=np.float64).reshape(n),
+            "first_seen": np.array([parse_iso_ts(f.get("first_seen_at")) for f in files], dtype=np.float64).reshape(n),
+            "seen": numbers("seen_count"),
+            "name": strings([str(f.get("name") or "") for f in files]),
+            "ext": strings([str(f.get("ext") or "") for f in files]),
+            "path": strings([f["path"] for f in files]),
+        }
+        self._sorted = {name: _SortedIndex(col) for name, col in self._cols.items()}
+        # (склеєні імена, початок кожного імені) для name_contains — будується при першому запиті
+        self._names: Optional[Tuple[str, Any]] = None
+
+    @staticmethod
+    def _hash_value(key: str, f: Dict[str, Any]) -> Any:
+        value = f.get(_HASH_FIELDS[key])
+        if key in ("label", "category"):
+            return norm_tag(value)
+        if key == "ext":
+            return (value or "").lower()
+        return value
+
+    def update(self, changed: Iterable[Dict[str, Any]], removed: Iterable[str] = ()) -> None:
+        """
+        Нові / змінені file_obj (за path; той самий path двічі — діє останній) і зниклі
+        шляхи — тільки ці рядки.
+        """
+        touched: List[int] = []
+        values: List[Dict[str, Any]] = []
+        for f in {f["path"]: f for f in changed}.values():
+            row = self._row_of.get(f["path"])
+            if row is None:
+                row = len(self._files)
+                self._files.append(f)
+                self._row_of[f["path"]] = row
+                self._grow(row + 1)
+                self._alive[row] = True
+            else:
+                self._files[row] = f
+            for key, index in self._hash.items():
+                index.set(row, self._hash_value(key, f))
+            touched.append(row)
+            values.append(_row_values(f))
+
+        gone: List[int] = []
+        for p in removed:
+            row = self._row_of.pop(p, None)
+            if row is None:
+                continue
+            self._files[row] = None
+            self._alive[row] = False
+            self._dead += 1
+            for index in self._hash.values():
+                index.clear(row)
+            gone.append(row)
+
+        if touched:
+            self._names = None
+        if touched or gone:
+            n_rows = len(self._files)
+            rows = np.asarray(touched + gone, dtype=np.int64)
+            at = np.asarray(touched, dtype=np.int64)
+            for name, index in self._sorted.items():
+                col = self._cols[name]
+                for row, v in zip(touched, values):
+                    col[row] = v[name]
+                # мертві рядки з відсортованих індексів просто вирізаються
+                index.replace(rows, col[at], n_rows)
+
+        if self._dead > _COMPACT_RATIO * max(1, len(self._files)):
+            self.load([f for f in self._files if f is not None])
+
+    def _grow(self, n: int) -> None:
+        # колонки ростуть із запасом (удвічі), щоб додавання по одному рядку не копіювало їх щоразу;
+        # рядки із запасу не живі й не в індексах
+        if n <= len(self._alive):
+            return
+        size = max(n, 2 * len(self._alive), 16)
+        alive = np.zeros(size, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+        for index in self._hash.values():
+            index.grow(size)
+        for name, col in self._cols.items():
+            grown = np.empty(size, dtype=object) if name in _STR_COLUMNS else np.full(size, np.nan)
+            grown[:len(col)] = col
+            self._cols[name] = grown
+
+    # -------------------- reads --------------------
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        row = self._row_of.get(path)
+        return None if row is None else self._files[row]
+
+    def query(
+        self,
+        selector: Optional[Dict[str, Any]],
+        sort: str = "",
+        offset: int = 0,
+        limit: int = 100,
+        now: Optional[float] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        (total, сторінка file_obj) для selector (ключі selection.SELECTOR_KEYS),
+        той самий результат, що query_files.
+        """
+        selector = selector or {}
+        if not isinstance(selector, dict):
+            raise ValueError("selector must be an object")
+        unknown = sorted(set(selector) - set(SELECTOR_KEYS))
+        if unknown:
+            raise ValueError(f"unknown selector keys: {', '.join(unknown)}")
+        if now is None:
+            now = time.time()
+
+        sel = self._mask(selector, now)
+        field, desc = parse_sort(sort)
+        order = np.flatnonzero(sel) if field is None else self._sorted[_SORTED_FIELDS[field]].ordered(sel, desc)
+        offset = max(0, int(offset))
+        limit = max(0, int(limit))
+        files = self._files
+        return len(order), [files[r] for r in order[offset:offset + limit].tolist()]
+
+    def _mask(self, selector: Dict[str, Any], now: float) -> Any:
+        n_rows = len(self._files)
+        sel = self._alive[:n_rows].copy()
+
+        def restrict(rows: Any) -> None:
+            m = np.zeros(n_rows, dtype=bool)
+            m[rows] = True
+            np.logical_and(sel, m, out=sel)
+
+        for key in _HASH_FIELDS:
+            values = as_list(selector.get(key))
+            if not values:
+                continue
+            if key in ("label", "category"):
+                values = [norm_tag(v) for v in values]
+            elif key == "ext":
+                values = [norm_ext(v) for v in values]
+            else:
+                values = [str(v) for v in values]
+            restrict(self._hash[key].rows(set(values)))
+
+        def bound(key: str) -> Optional[float]:
+            value = selector.get(key)
+            return None if value is None else float(value)
+
+        # trash_score None рахується як 0.0 (як у compile_selector); у колонці — NaN для сортування
+        lo, hi = bound("min_score"), bound("max_score")
+        if lo is not None or hi is not None:
+            rows = self._sorted["score"].range(lo, hi)
+            if (lo is None or lo <= 0.0) and (hi is None or hi >= 0.0):
+                rows = np.concatenate((rows, np.flatnonzero(np.isnan(self._cols["score"][:n_rows]))))
+            restrict(rows)
+
+        lo, hi = bound("min_size"), bound("max_size")
+        if lo is not None or hi is not None:
+            restrict(self._sorted["size"].range(lo, hi))
+
+        # вік: min_age_days -> mtime <= now - min_age
+        min_age, max_age = bound("min_age_days"), bound("max_age_days")
+        if min_age is not None or max_age is not None:
+            hi = None if min_age is None else now - min_age * _DAY_S
+            lo = None if max_age is None else now - max_age * _DAY_S
+            restrict(self._sorted["mtime"].range(lo, hi))
+
+        prefixes = [str(p) for p in as_list(selector.get("path_prefix"))]
+        if prefixes:
+            paths = self._sorted["path"]
+            restrict(np.concatenate([paths.range(p, p + _PREFIX_END) for p in prefixes]))
+
+        needle = str(selector.get("name_contains") or "").lower()
+        if needle:
+            restrict(self._name_rows(needle, n_rows))
+        return sel
+
+    def _name_rows(self, needle: str, n_rows: int) -> Any:
+        if _NAME_SEP in needle:
+            return np.zeros(0, dtype=np.int64)
+        if self._names is None:
+            # lower() по одному імені: для деяких символів він змінює довжину рядка
+            lowered = [name.lower() for name in self._cols["name"][:n_rows].tolist()]
+            lengths = np.fromiter((len(name) + 1 for name in lowered), dtype=np.int64, count=n_rows)
+            starts = np.zeros(n_rows, dtype=np.int64)
+            np.cumsum(lengths[:-1], out=starts[1:])
+            self._names = (_NAME_SEP.join(lowered), starts)
+        blob, starts = self._names
+        hits = np.fromiter((m.start() for m in re.finditer(re.escape(needle), blob)), dtype=np.int64)
+        return np.searchsorted(starts, hits, side="right") - 1
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import ScanMetrics, maybe_profile
+from walker import ScanConfig, dir_tasks, load_scan_config, subdir_tasks, walk_dirs, walk_files
+
+try:
+    from intelligence.records import RECORD_TYPES  # type: ignore
+except Exception:
+    RECORD_TYPES = (dict,)
 
 
 def get_desktop_path() -> Path:
@@ -87,85 +99,867 @@ def _try_score_file(file_obj: Dict[str, Any], rec: Dict[str, Any]) -> Tuple[floa
         return 0.0, []
 
 
-# -------------------- main scan --------------------
+def _try_next_change(file_obj: Dict[str, Any], rec: Dict[str, Any], now: Optional[float]) -> Optional[float]:
+    try:
+        from intelligence.scoring import next_score_change  # type: ignore
+
+        return next_score_change(file_obj, rec, now)
+    except Exception:
+        return None
+
+
+def _try_score_many(
+    items: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    now: Optional[float] = None,
+) -> List[Tuple[float, List[str], Optional[float]]]:
+    """
+    Скоринг пачки (file_obj, rec) одним викликом intelligence.scoring.score_records,
+    поверх — поправка моделі, навченої на мітках користувача (якщо вона вже активна).
+    Якщо batch-API недоступний (немає numpy) або падає — _try_score_file по одному.
+    Третій елемент — due: коли score може змінитись з часом (None — ніколи), див. rescore_due.
+    now — epoch для віку файлів (None — поточний час).
+    """
+    if not items:
+        return []
+
+    try:
+        from intelligence.scoring import score_records  # type: ignore
+
+        file_objs = [f for f, _ in items]
+        recs = [r for _, r in items]
+        batch = score_records(file_objs, recs, now=now)
+    except Exception:
+        return [(*_try_score_file(f, r), _try_next_change(f, r, now)) for f, r in items]
+
+    out = [(float(batch.scores[i]), batch.reasons(i), batch.due(i)) for i in range(len(items))]
+    try:
+        from intelligence.model import REFRESH_S, get_model, learned_reason  # type: ignore
+
+        adjusted = get_model().adjust(batch, file_objs, recs)
+    except Exception:
+        adjusted = None
+    if adjusted is None:
+        return out
+
+    refresh_at = (time.time() if now is None else now) + REFRESH_S
+    for i, (base, reasons, due) in enumerate(out):
+        score = float(adjusted[i])
+        reason = learned_reason(score - base)
+        due = refresh_at if due is None else min(due, refresh_at)
+        out[i] = (score, reasons + [reason] if reason else reasons, due)
+    return out
+
+
+def _model_generation() -> int:
+    """
+    intelligence.model.OnlineModel.generation (0 — моделі немає або неактивна).
+    """
+    try:
+        from intelligence.model import get_model  # type: ignore
+
+        return get_model().generation
+    except Exception:
+        return 0
+
+
+def _rules_generation() -> Tuple[str, bool]:
+    """
+    (fingerprint, volatile) правил скорингу (intelligence.rules), перечитаних, якщо
+    scoring_rules.json змінився. fingerprint "" — правила за замовчуванням;
+    volatile — score залежить від seen_count, кешований score не переноситься.
+    """
+    try:
+        from intelligence.rules import refresh_rules  # type: ignore
+
+        rules = refresh_rules()
+        return rules.fingerprint, rules.volatile
+    except Exception:
+        return "", False
+
+
+def _in_scan_scope(
+    path: str,
+    roots: List[str],
+    max_depth: Optional[int],
+    dirs: Optional[List[str]] = None,
+) -> bool:
+    """
+    Чи потрапляє path у сканування: під одним з roots і не глибше max_depth;
+    з dirs (ScanConfig.dirs, уже відфільтровані walker.dir_tasks) — лежить прямо в одній з них.
+    """
+    if dirs is not None:
+        return os.path.normcase(os.path.dirname(path)) in dirs
+    for root in roots:
+        prefix = root.rstrip("\\/") + os.sep
+        if not path.startswith(prefix):
+            continue
+        if max_depth is None or path.count(os.sep, len(prefix)) <= max_depth:
+            return True
+    return False
 
-def scan_desktop() -> List[Dict[str, Any]]:
+
+def _removed_subtree(path: str, dirs: Any, is_dir: Callable[[str], bool]) -> Optional[str]:
+    """
+    path — під однією з dirs (ключі normcase): найвища зникла папка між ними, якщо path
+    лежав у видаленому піддереві; None — папка path на місці або path лежить прямо в dirs.
+    """
+    top = None
+    d = os.path.dirname(path)
+    while os.path.normcase(d) not in dirs:
+        if is_dir(d):
+            return top
+        top = d
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+    return top
+
+
+def _match_renames(result: ScanResult, old_entries: Dict[str, Any], new_entries: Dict[str, Any]) -> None:
+    """
+    removed + added з тим самим (inode, size) -> renamed.
+    """
+    if not result.removed or not result.added:
+        return
+
+    by_inode: Dict[Tuple[int, int], str] = {}
+    for p in result.removed:
+        fp = (old_entries.get(p) or {}).get("fp")
+        if isinstance(fp, list) and len(fp) == 3 and fp[0]:
+            by_inode[(fp[0], fp[1])] = p
+
+    if not by_inode:
+        return
+
+    files_by_path = {f["path"]: f for f in result.files if f.get("scan_status") == "added"}
+    still_added: List[str] = []
+    for p in result.added:
+        fp = new_entries[p].get("fp")
+        old = by_inode.pop((fp[0], fp[1]), None) if isinstance(fp, list) and fp[0] else None
+        if old is None:
+            still_added.append(p)
+            continue
+        result.renamed.append((old, p))
+        if p in files_by_path:
+            files_by_path[p]["scan_status"] = "renamed"
+
+    renamed_from = {old for old, _ in result.renamed}
+    result.added = still_added
+    result.removed = [p for p in result.removed if p not in renamed_from]
+
+
+def _apply_score(
+    file_obj: Dict[str, Any],
+    cache_entry: Dict[str, Any],
+    score: float,
+    reasons: List[str],
+    due: Optional[float],
+) -> None:
+    # якщо користувач pinned/keep — це точно не сміття
+    if file_obj.get("user_label") in ("pinned", "keep"):
+        score = 0.0
+
+    file_obj["trash_score"] = float(score)
+    file_obj["trash_reasons"] = reasons
+    cache_entry["score"] = float(score)
+    cache_entry["reasons"] = reasons
+    cache_entry["due"] = due
+
+
+def _score_fresh(cached: Dict[str, Any], now: float) -> bool:
+    """
+    Кешований score ще дійсний: вік файлу не перетнув поріг скорингу з моменту підрахунку.
+    Без "due" — кеш старого формату, перерахувати.
     """
-    Повертає список файлів з Desktop.
+    if "due" not in cached:
+        return False
+    due = cached["due"]
+    return due is None or now <= _coerce_float(due)
 
+
+def _expose_state(file_obj: Dict[str, Any], rec: Dict[str, Any], status: str, root: str) -> None:
+    # state -> UI
+    file_obj["user_label"] = rec.get("label")
+    file_obj["user_category"] = rec.get("category")
+    file_obj["first_seen_at"] = rec.get("first_seen_at")
+    file_obj["last_seen_at"] = rec.get("last_seen_at")
+    file_obj["seen_count"] = int(rec.get("seen_count", 0) or 0)
+    file_obj["scan_status"] = status
+    file_obj["root"] = root
+
+
+# -------------------- main scan --------------------
+
+DEFAULT_BATCH_SIZE = 500
+
+@dataclass
+class ScanResult:
+    """
+    Результат сканування.
+    files   — усі файли (scan_status: "added" | "changed" | "renamed" | "unchanged")
+    added / changed / removed — шляхи відносно попереднього сканування
+    renamed — пари (old_path, new_path): той самий inode і розмір; в added/removed їх немає
+    updated — файли, чиї поля/score змінились вже після on_batch (пошук дублікатів)
+    compaction — intelligence.compaction.CompactionReport
+    cancelled — сканування перервано через cancel (files неповний, removed порожній)
+    dirs_added / dirs_removed — rescan_dirs: нові підпапки (вже проскановані) і зниклі папки
+    """
+    files: List[Dict[str, Any]] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    cancelled: bool = False
+    # звіт compaction state після повного сканування (None — не запускалась)
+    compaction: Optional[Any] = None
+    # metrics.ScanMetrics: час фаз і лічильники
+    metrics: Optional[ScanMetrics] = None
+    dirs_added: List[str] = field(default_factory=list)
+    dirs_removed: List[str] = field(default_factory=list)
+
+
+def _build_file_obj(entry: os.DirEntry, st: os.stat_result) -> Dict[str, Any]:
+    name = entry.name
+    return {
+        "name": name,
+        "path": entry.path,
+        "ext": os.path.splitext(name)[1].lower(),
+        "size_bytes": st.st_size,
+        "last_modified": datetime.fromtimestamp(st.st_mtime).isoformat(),
+        "last_access": datetime.fromtimestamp(st.st_atime).isoformat(),
+    }
+
+
+def scan_desktop_result(
+    incremental: bool = True,
+    cache: Any = None,
+    config: Optional[ScanConfig] = None,
+    on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cancel: Optional[threading.Event] = None,
+    find_duplicates: bool = True,
+    full_scan: bool = True,
+    metrics: Optional[ScanMetrics] = None,
+    collect_files: bool = True,
+) -> ScanResult:
+    """
+    Сканує папки з ScanConfig (за замовчуванням — scan_config.json, тобто Desktop)
+    паралельним обходом walker.walk_files.
+
+    incremental=True:
+      - для кожного файлу рахує відбиток (inode, size, mtime_ns)
+      - якщо відбиток і label не змінились — бере file_obj і score з scan_cache
+        (score — тільки поки вік файлу не перетнув поріг скорингу, див. rescore_due)
+      - інакше будує file_obj і рахує score заново
     Додатково:
       - оновлює intelligence state (first_seen_at/last_seen_at/seen_count)
       - підтягує user_label + user_category
       - додає trash_score + trash_reasons (якщо є scoring.py)
+
+    cache — StateCache процесу (опційно): тоді state береться з пам'яті,
+    а запис на диск робить cache.flush().
+    config — корені / глибина / ignore; None -> load_scan_config().
+    on_batch — викликається з кожною готовою (вже оціненою) пачкою до batch_size файлів,
+    поки обхід ще триває; ScanResult.files все одно містить усі файли.
+    cancel — якщо встановлено під час сканування: обхід зупиняється, scan_cache
+    не перезаписується (наступне сканування порівнює з попереднім повним), result.cancelled=True.
+    find_duplicates — після обходу шукає копії за вмістом (duplicate_group / duplicate_of)
+    і перераховує score тим, у кого це змінилось (див. result.updated).
+    full_scan — рахується в state["scan_count"], а після нього state чиститься
+    від давно зниклих файлів (RetentionPolicy, див. result.compaction);
+    False — часткове сканування кількох папок (rescan_dirs).
+    metrics — куди писати час фаз (None — новий ScanMetrics); результат — result.metrics.
+    DESKTOPCLEANER_PROFILE=1 — ще й cProfile (див. metrics.maybe_profile).
+    collect_files=False — файли тільки через on_batch, result.files порожній
+    (пам'ять не росте від списку file_obj, cli.py); пошук дублікатів тоді вимкнено —
+    йому потрібні всі файли одразу.
     """
+    if metrics is None:
+        metrics = ScanMetrics(kind="full" if full_scan else "delta")
+    with maybe_profile(metrics):
+        result = _scan(
+            incremental, cache, config, on_batch, batch_size, cancel,
+            find_duplicates and collect_files, full_scan, metrics, collect_files,
+        )
+    result.metrics = metrics.finish()
+    return result
+
+
+def _scan(
+    incremental: bool,
+    cache: Any,
+    config: Optional[ScanConfig],
+    on_batch: Optional[Callable[[List[Dict[str, Any]]], None]],
+    batch_size: int,
+    cancel: Optional[threading.Event],
+    find_duplicates: bool,
+    full_scan: bool,
+    metrics: ScanMetrics,
+    collect_files: bool,
+) -> ScanResult:
+    perf = time.perf_counter
     # intelligence state (optional)
-    load_state = save_state = update_seen = None
+    load_state = save_state = update_seen = begin_scan = remove_tree = None
+    if cache is not None:
+        update_seen = lambda _state, file_obj: cache.update_seen(file_obj)  # noqa: E731
+        begin_scan = lambda _state: cache.begin_scan()  # noqa: E731
+    else:
+        try:
+            from intelligence.state import (  # type: ignore
+                begin_scan as _bs,
+                load_state as _ls,
+                remove_tree as _rt,
+                save_state as _ss,
+                update_seen as _us,
+            )
+            load_state, save_state, update_seen, begin_scan, remove_tree = _ls, _ss, _us, _bs, _rt
+        except Exception:
+            pass
+
+    # state compaction (optional)
+    compact_state = load_retention_policy = None
+    if full_scan:
+        try:
+            from intelligence.compaction import (  # type: ignore
+                VACUUM_MIN_REMOVED,
+                compact_state as _cs,
+                load_retention_policy as _lr,
+            )
+            compact_state, load_retention_policy = _cs, _lr
+        except Exception:
+            pass
+
+    # scan cache (optional)
+    load_scan_cache = save_scan_cache = make_fingerprint = None
+    try:
+        from intelligence.scan_cache import (  # type: ignore
+            load_scan_cache as _lc,
+            save_scan_cache as _sc,
+            make_fingerprint as _mf,
+        )
+        load_scan_cache, save_scan_cache, make_fingerprint = _lc, _sc, _mf
+    except Exception:
+        incremental = False
+
+    # тип вмісту за сигнатурою (optional)
+    sniff_many = needs_sniff = cached_type = make_sniff_entry = None
     try:
-        from intelligence.state import load_state as _ls, save_state as _ss, update_seen as _us  # type: ignore
-        load_state, save_state, update_seen = _ls, _ss, _us
+        from intelligence.sniff import (  # type: ignore
+            cached_type as _ct,
+            make_entry as _me,
+            needs_sniff as _ns,
+            sniff_many as _sm,
+        )
+        sniff_many, needs_sniff, cached_type, make_sniff_entry = _sm, _ns, _ct, _me
     except Exception:
         pass
 
     state: Dict[str, Any] = {"version": 1, "files": {}}
     if load_state:
+        t0 = perf()
         try:
             state = load_state()
         except Exception:
             state = {"version": 1, "files": {}}
+        metrics.add_time("load_state", perf() - t0)
+    if full_scan and begin_scan:
+        try:
+            begin_scan(state)
+        except Exception:
+            pass
 
-    desktop = get_desktop_path()
-    files: List[Dict[str, Any]] = []
-
-    for entry in desktop.iterdir():
-        if not entry.is_file():
-            continue
-
-        stat = entry.stat()
-
-        file_obj: Dict[str, Any] = {
-            "name": entry.name,
-            "path": str(entry),
-            "ext": entry.suffix.lower(),
-            "size_bytes": stat.st_size,
-            "last_modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            "last_access": datetime.fromtimestamp(stat.st_atime).isoformat(),
-        }
+    old_entries: Dict[str, Any] = {}
+    if load_scan_cache:
+        t0 = perf()
+        try:
+            old_entries = load_scan_cache().get("entries", {})
+        except Exception:
+            old_entries = {}
+        metrics.add_time("load_scan_cache", perf() - t0)
+    new_entries: Dict[str, Any] = {}
+
+    if config is None:
+        config = load_scan_config()
+    roots = [str(r) for r in config.resolved_roots()]
+    # rescan окремих папок: зниклими вважаються тільки файли, що лежали прямо в них
+    scope_tasks = None if config.dirs is None else dir_tasks(config)
+    scope_dirs = None if scope_tasks is None else {os.path.normcase(d) for _r, d, _rel, _depth in scope_tasks}
+    result = ScanResult()
+    # (file_obj, rec, cache_entry), яким потрібен новий score — рахуються одним batch
+    to_score: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+    # (file_obj, cache_entry, fp) нових / змінених файлів, чий тип вмісту ще невідомий —
+    # читаються пачкою в пулі потоків перед скорингом
+    to_sniff: List[Tuple[Dict[str, Any], Dict[str, Any], Any]] = []
+
+    def _put_sniff(p: str, entry: Dict[str, Any]) -> None:
+        # як content_hash: у записі state, валідний, поки не змінився відбиток
+        if cache is not None:
+            cache.update_fields(p, {"content_type": entry})
+            return
+        rec = state.get("files", {}).get(p)
+        if isinstance(rec, RECORD_TYPES):
+            rec["content_type"] = entry
+    # score-и з scan_cache, пораховані іншою версією моделі чи іншими правилами, не переносяться
+    model_gen = _model_generation()
+    rules_gen, rules_volatile = _rules_generation()
+    # один "зараз" на сканування — для перевірки due кешованих score-ів
+    scan_now = time.time()
+    # файли поточної пачки (для on_batch)
+    batch: List[Dict[str, Any]] = []
+    batch_size = max(1, int(batch_size))
+
+    def _flush_batch() -> None:
+        if to_sniff:
+            t0 = perf()
+            types = sniff_many([f["path"] for f, _ce, _fp in to_sniff], workers=config.workers)
+            for (f, ce, sfp), ctype in zip(to_sniff, types):
+                f["content_type"] = ce["file"]["content_type"] = ctype
+                try:
+                    _put_sniff(f["path"], make_sniff_entry(sfp, ctype))
+                except Exception:
+                    pass
+            metrics.add_time("sniff", perf() - t0)
+            metrics.count("sniffed", len(to_sniff))
+            to_sniff.clear()
+        if to_score:
+            t0 = perf()
+            scored = _try_score_many([(f, r) for f, r, _ in to_score])
+            for (f, _r, ce), (score, reasons, due) in zip(to_score, scored):
+                _apply_score(f, ce, score, reasons, due)
+            metrics.add_time("score", perf() - t0)
+            metrics.count("scored", len(to_score))
+        to_score.clear()
+        if on_batch is not None and batch:
+            # сюди входить і серіалізація в JSON / emit у UI (on_batch у main.py)
+            t0 = perf()
+            on_batch(list(batch))
+            metrics.add_time("on_batch", perf() - t0)
+        batch.clear()
+
+    # час у циклі по файлах: скільки чекали walker і скільки пішло на update_seen
+    t_wait = t_seen = 0.0
+    n_files = 0
+    t_loop = perf()
+    for root, entry, st in walk_files(config, cancel=cancel, metrics=metrics):
+        t_item = perf()
+        t_wait += t_item - t_loop
+        if cancel is not None and cancel.is_set():
+            break
+        path = entry.path
+        fp = make_fingerprint(entry.inode(), st.st_size, st.st_mtime_ns) if make_fingerprint else None
+        cached = old_entries.get(path)
+        if not isinstance(cached, dict):
+            cached = None
+
+        if cached is None:
+            status = "added"
+        elif cached.get("fp") != fp:
+            status = "changed"
+        else:
+            status = "unchanged"
+
+        if incremental and status == "unchanged" and isinstance(cached.get("file"), dict):
+            file_obj: Dict[str, Any] = dict(cached["file"])
+        else:
+            file_obj = _build_file_obj(entry, st)
 
         # state record
         rec: Dict[str, Any] = {}
         if update_seen:
+            t0 = perf()
             try:
                 rec = update_seen(state, file_obj)
             except Exception:
                 rec = {}
+            t_seen += perf() - t0
 
         user_label: Optional[str] = rec.get("label")
-        user_category: Optional[str] = rec.get("category")
 
-        # expose state -> UI
-        file_obj["user_label"] = user_label
-        file_obj["user_category"] = user_category
-        file_obj["first_seen_at"] = rec.get("first_seen_at")
-        file_obj["last_seen_at"] = rec.get("last_seen_at")
-        file_obj["seen_count"] = int(rec.get("seen_count", 0) or 0)
-
-        # scoring
-        score, reasons = _try_score_file(file_obj, rec)
-
-        # якщо користувач pinned/keep — це точно не сміття
-        if user_label in ("pinned", "keep"):
-            score = 0.0
+        # тип вмісту: unchanged файл приносить його з scan_cache; інакше — зі state (той самий fp)
+        # або читання перших байт у _flush_batch
+        sniff_pending = False
+        if "content_type" not in file_obj:
+            found, ctype = cached_type(rec.get("content_type"), fp) if cached_type else (False, None)
+            if found:
+                file_obj["content_type"] = ctype
+            elif sniff_many is not None and needs_sniff(file_obj.get("ext") or "", int(file_obj.get("size_bytes") or 0)):
+                sniff_pending = True
+            else:
+                file_obj["content_type"] = None
+
+        cache_entry: Dict[str, Any] = {"fp": fp, "file": dict(file_obj), "label": user_label, "model": model_gen}
+        if rules_gen:
+            cache_entry["rules"] = rules_gen
+        if sniff_pending:
+            to_sniff.append((file_obj, cache_entry, fp))
+
+        _expose_state(file_obj, rec, status, root)
+        file_obj["duplicate_group"] = None
+        file_obj["duplicate_of"] = None
+
+        # scoring: unchanged файл з тим самим label, версією моделі і правил, чий вік ще не
+        # перетнув поріг скорингу, — беремо кешований score
+        if (
+            incremental
+            and status == "unchanged"
+            and cached.get("label") == user_label
+            and cached.get("model", 0) == model_gen
+            and cached.get("rules", "") == rules_gen
+            and not rules_volatile
+            and "score" in cached
+            and _score_fresh(cached, scan_now)
+            and not sniff_pending
+        ):
+            # score рахувався з цими полями дублікатів — переносимо їх разом з ним
+            file_obj["duplicate_group"] = cache_entry["dup_group"] = cached.get("dup_group")
+            file_obj["duplicate_of"] = cache_entry["dup_of"] = cached.get("dup_of")
+            _apply_score(
+                file_obj,
+                cache_entry,
+                _coerce_float(cached.get("score")),
+                _coerce_reasons(cached.get("reasons")),
+                cached.get("due"),
+            )
+            metrics.count("score_cache_hits")
+        else:
+            to_score.append((file_obj, rec, cache_entry))
+        new_entries[path] = cache_entry
+
+        if status == "added":
+            result.added.append(path)
+        elif status == "changed":
+            result.changed.append(path)
+        if collect_files:
+            result.files.append(file_obj)
+        n_files += 1
+
+        batch.append(file_obj)
+        if len(batch) >= batch_size:
+            _flush_batch()
+        t_loop = perf()
+
+    metrics.add_time("walk_wait", t_wait)
+    metrics.add_time("update_seen", t_seen, n_files)
+    metrics.count("files", n_files)
+    result.cancelled = cancel is not None and cancel.is_set()
+    if not result.cancelled:
+        _flush_batch()
+
+        # зниклі — тільки під тими коренями, що сканувались зараз;
+        # кеш інших коренів (інший scan_config) переноситься як є.
+        # rescan папок: ще й файли з їх підпапок, яких більше немає (видалене піддерево)
+        scope_prefixes = () if scope_dirs is None else tuple(d.rstrip("\\/") + os.sep for d in scope_dirs)
+        dir_exists: Dict[str, bool] = {}
+
+        def _is_dir(d: str) -> bool:
+            found = dir_exists.get(d)
+            if found is None:
+                found = dir_exists[d] = os.path.isdir(d)
+            return found
+
+        gone_dirs = {d for _r, d, _rel, _depth in (scope_tasks or ()) if not _is_dir(d)}
+        for p, old_entry in old_entries.items():
+            if p in new_entries:
+                continue
+            if _in_scan_scope(p, roots, config.max_depth, scope_dirs):
+                result.removed.append(p)
+                continue
+            if scope_prefixes and os.path.normcase(p).startswith(scope_prefixes):
+                top = _removed_subtree(p, scope_dirs, _is_dir)
+                if top is not None:
+                    gone_dirs.add(top)
+                    result.removed.append(p)
+                    continue
+            new_entries[p] = old_entry
+
+        # записи state під зниклими папками більше не потрібні (і scan_cache їх не знає)
+        for d in sorted(gone_dirs):
+            try:
+                if cache is not None:
+                    cache.remove_tree(d)
+                elif remove_tree is not None:
+                    remove_tree(state, d)
+            except Exception:
+                pass
+        result.dirs_removed = sorted(gone_dirs)
+
+        _match_renames(result, old_entries, new_entries)
+
+        if find_duplicates:
+            def _get_rec(p: str) -> Dict[str, Any]:
+                if cache is not None:
+                    return cache.get_record(p)
+                rec = state.get("files", {}).get(p)
+                return rec if isinstance(rec, RECORD_TYPES) else {}
+
+            def _put_hash(p: str, entry: Dict[str, Any]) -> None:
+                if cache is not None:
+                    cache.update_fields(p, {"content_hash": entry})
+                    return
+                rec = state.get("files", {}).get(p)
+                if isinstance(rec, RECORD_TYPES):
+                    rec["content_hash"] = entry
+
+            t0 = perf()
+            try:
+                _annotate_duplicates(result, new_entries, _get_rec, _put_hash)
+            except Exception:
+                pass
+            metrics.add_time("duplicates", perf() - t0)
 
-        file_obj["trash_score"] = float(score)
-        file_obj["trash_reasons"] = reasons
+        if compact_state and load_retention_policy:
+            t0 = perf()
+            try:
+                if cache is not None:
+                    result.compaction = cache.compact(load_retention_policy())
+                else:
+                    result.compaction = compact_state(state, load_retention_policy())
+                # записи, яких більше немає в state, не тримаємо і в scan_cache
+                for p in result.compaction.removed:
+                    new_entries.pop(p, None)
+            except Exception:
+                result.compaction = None
+            metrics.add_time("compaction", perf() - t0)
 
-        files.append(file_obj)
+    metrics.count("added", len(result.added))
+    metrics.count("changed", len(result.changed))
+    metrics.count("removed", len(result.removed))
+    metrics.count("renamed", len(result.renamed))
 
     # persist state
-    if save_state:
+    t0 = perf()
+    if cache is not None:
+        try:
+            cache.flush()
+        except Exception:
+            pass
+    elif save_state:
         try:
             save_state(state)
         except Exception:
             pass
+    metrics.add_time("save_state", perf() - t0)
+
+    if save_scan_cache and not result.cancelled:
+        t0 = perf()
+        try:
+            save_scan_cache({"entries": new_entries})
+        except Exception:
+            pass
+        metrics.add_time("save_scan_cache", perf() - t0)
 
-    return files
+    if result.compaction is not None and result.compaction.removed_total >= VACUUM_MIN_REMOVED:
+        try:
+            if cache is not None:
+                cache.store.vacuum()
+            else:
+                from intelligence.state import get_store  # type: ignore
+                get_store().vacuum()
+        except Exception:
+            pass
+
+    return result
+
+
+def _annotate_duplicates(
+    result: ScanResult,
+    new_entries: Dict[str, Any],
+    get_rec: Callable[[str], Dict[str, Any]],
+    put_hash: Callable[[str, Dict[str, Any]], None],
+) -> None:
+    """
+    Шукає копії за вмістом серед result.files, проставляє duplicate_group /
+    duplicate_of і перераховує score тим, у кого ці поля змінились.
+    """
+    try:
+        from intelligence.duplicates import find_duplicates, pick_original  # type: ignore
+    except Exception:
+        return
+
+    groups, updated_hashes = find_duplicates(
+        ((f["path"], int(f.get("size_bytes") or 0)) for f in result.files),
+        lambda p: get_rec(p).get("content_hash"),
+    )
+    for p, entry in updated_hashes.items():
+        put_hash(p, entry)
+
+    dup_info: Dict[str, Tuple[str, Optional[str]]] = {}
+    for gid, paths in groups.items():
+        original = pick_original(paths, lambda p: get_rec(p).get("first_seen_at"))
+        for p in paths:
+            dup_info[p] = (gid, None if p == original else original)
+
+    to_rescore: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+    for f in result.files:
+        gid, dup_of = dup_info.get(f["path"], (None, None))
+        if f.get("duplicate_group") == gid and f.get("duplicate_of") == dup_of:
+            continue
+
+        ce = new_entries[f["path"]]
+        rescore = f.get("duplicate_of") != dup_of
+        f["duplicate_group"] = ce["dup_group"] = gid
+        f["duplicate_of"] = ce["dup_of"] = dup_of
+        result.updated.append(f["path"])
+        if rescore:
+            to_rescore.append((f, get_rec(f["path"]), ce))
+
+    scored = _try_score_many([(f, r) for f, r, _ in to_rescore])
+    for (f, _r, ce), (score, reasons, due) in zip(to_rescore, scored):
+        _apply_score(f, ce, score, reasons, due)
+
+
+def rescan_dirs(
+    dirs: List[str],
+    cache: Any = None,
+    config: Optional[ScanConfig] = None,
+    cancel: Optional[threading.Event] = None,
+    known_dirs: Optional[Iterable[str]] = None,
+) -> ScanResult:
+    """
+    Інкрементальний rescan тільки вказаних папок (без підпапок) — для watcher-а.
+    files містить усі файли цих папок (scan_status показує, що змінилось),
+    file_obj["root"] — корінь зі scan_config, а не сама папка.
+    known_dirs — папки, які вже під watcher-ом: підпапка dirs, якої серед них немає, —
+    нова, її піддерево сканується цілком (result.dirs_added). Файли зниклих підпапок —
+    у removed, їх записи state видаляються, а самі папки — у result.dirs_removed.
+    """
+    if config is None:
+        config = load_scan_config()
+
+    # корені ті самі, що й у повному скануванні: ignore-glob-и по шляху відносно кореня
+    # і file_obj["root"] збігаються з ним (walker.dir_tasks)
+    sub = replace(config, dirs=list(dirs))
+    new_dirs: List[str] = []
+    if known_dirs is not None:
+        known = {os.path.normcase(d) for d in known_dirs}
+        fresh = [
+            t for task in dir_tasks(sub) for t in subdir_tasks(config, task)
+            if os.path.normcase(t[1]) not in known
+        ]
+        new_dirs = [d for _r, d, _rel, _depth in walk_dirs(config, fresh)]
+        sub.dirs = sub.dirs + new_dirs
+    sub.workers = max(1, min(len(sub.dirs), config.workers))
+    # дублікати шукаються тільки повним скануванням: у кількох папках не видно всіх копій
+    result = scan_desktop_result(cache=cache, config=sub, cancel=cancel, find_duplicates=False, full_scan=False)
+    result.dirs_added = new_dirs
+    return result
+
+
+def rescore_due(
+    cache: Any = None,
+    config: Optional[ScanConfig] = None,
+    now: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> ScanResult:
+    """
+    Фоновий перерахунок без обходу диска: тільки записи scan_cache, чий score міг
+    змінитись сам по собі — вік файлу перетнув поріг скорингу (entries[path]["due"],
+    intelligence.rescoring.RescoreQueue) або модель перейшла в нове покоління
+    (entries[path]["model"]). На великому статичному Desktop-і це одиниці файлів, а не всі.
+    result.files — файли, у яких змінився score або причини (scan_status "unchanged");
+    result.metrics.info["next_due"] — коли наступний перерахунок матиме що робити.
+    """
+    metrics = ScanMetrics(kind="rescore")
+    result = ScanResult(metrics=metrics)
+    try:
+        from intelligence.rescoring import get_queue  # type: ignore
+        from intelligence.scan_cache import load_scan_cache, update_scan_cache  # type: ignore
+    except Exception:
+        return result
+    if now is None:
+        now = time.time()
+
+    t0 = time.perf_counter()
+    entries = load_scan_cache().get("entries", {})
+    queue = get_queue(entries)
+    model_gen = _model_generation()
+    paths = queue.pop_due(now, limit)
+    if queue.model_gen != model_gen:
+        # модель перейшла в нове покоління — перерахувати score-и попередніх (один прохід по entries)
+        due = set(paths)
+        stale = [
+            p for p, e in entries.items()
+            if isinstance(e, dict) and e.get("model", 0) != model_gen and p not in due
+        ]
+        room = len(stale) if limit is None else max(0, limit - len(paths))
+        paths.extend(stale[:room])
+        if room >= len(stale):
+            queue.model_gen = model_gen
+    paths = [p for p in paths if isinstance(entries[p].get("file"), dict)]
+    metrics.add_time("queue", time.perf_counter() - t0)
+
+    if paths:
+        if cache is not None:
+            get_rec = cache.get_record
+        else:
+            try:
+                from intelligence.state import load_state  # type: ignore
+
+                state_files = load_state().get("files", {})
+            except Exception:
+                state_files = {}
+            get_rec = lambda p: state_files.get(p) or {}  # noqa: E731
+
+        if config is None:
+            config = load_scan_config()
+        roots = [str(r).rstrip("\\/") for r in config.resolved_roots()]
+        rules_gen, _volatile = _rules_generation()
+
+        to_score: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+        for p in paths:
+            ce = dict(entries[p])
+            rec = get_rec(p)
+            file_obj = dict(ce["file"])
+            root = next((r for r in roots if p.startswith(r + os.sep)), os.path.dirname(p))
+            _expose_state(file_obj, rec, "unchanged", root)
+            file_obj["duplicate_group"] = ce.get("dup_group")
+            file_obj["duplicate_of"] = ce.get("dup_of")
+            ce["label"] = rec.get("label")
+            ce["model"] = model_gen
+            if rules_gen:
+                ce["rules"] = rules_gen
+            else:
+                ce.pop("rules", None)
+            to_score.append((file_obj, rec, ce))
+
+        t0 = time.perf_counter()
+        updates: Dict[str, Any] = {}
+        scored = _try_score_many([(f, r) for f, r, _ in to_score], now=now)
+        for (f, _r, ce), (score, reasons, due) in zip(to_score, scored):
+            old = (entries[f["path"]].get("score"), entries[f["path"]].get("reasons"))
+            _apply_score(f, ce, score, reasons, due)
+            updates[f["path"]] = ce
+            queue.push(f["path"], due)
+            if old != (ce["score"], ce["reasons"]):
+                result.files.append(f)
+                result.updated.append(f["path"])
+        metrics.add_time("score", time.perf_counter() - t0, len(to_score))
+        metrics.count("scored", len(to_score))
+
+        # тільки перераховані entries (журнал scan_cache), а не весь кеш;
+        # entries — той самий dict, тож черга бачить нові due
+        t0 = time.perf_counter()
+        try:
+            update_scan_cache(updates)
+        except Exception:
+            pass
+        metrics.add_time("update_scan_cache", time.perf_counter() - t0)
+
+    metrics.count("files", len(result.files))
+    metrics.info["queued"] = len(queue)
+    metrics.info["next_due"] = queue.next_due()
+    result.metrics = metrics.finish()
+    return result
+
+
+def scan_desktop(
+    incremental: bool = True,
+    cache: Any = None,
+    config: Optional[ScanConfig] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Повертає список файлів з коренів сканування (див. scan_desktop_result).
+    """
+    return scan_desktop_result(incremental=incremental, cache=cache, config=config).files
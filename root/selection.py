@@ -0,0 +1,109 @@
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from normalize import as_list, local_epoch, norm_ext, norm_tag
+
+# selector: {"min_score": 0.8, "ext": [".tmp", ".log"], "label": "none", ...}
+# усі умови через AND, значення одного ключа (список) — через OR
+SELECTOR_KEYS = (
+    "min_score",
+    "max_score",
+    "label",
+    "category",
+    "ext",
+    "status",
+    "root",
+    "path_prefix",
+    "name_contains",
+    "min_size",
+    "max_size",
+    "min_age_days",
+    "max_age_days",
+)
+
+# вік — від last_modified (локальний naive ISO -> epoch, цілі секунди, як у wire)
+_DAY_S = 86400.0
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _opt_float(selector: Dict[str, Any], key: str) -> Optional[float]:
+    value = selector.get(key)
+    return None if value is None else float(value)
+
+
+def compile_selector(selector: Optional[Dict[str, Any]], now: Optional[float] = None) -> Predicate:
+    """
+    Предикат по file_obj (результат сканування) зі словника умов.
+    Порожній selector вибирає все; невідомий ключ — ValueError
+    (краще помилка, ніж "позначити все" через опечатку в UI).
+    min_age_days / max_age_days — дні від last_modified до now (за замовчуванням — зараз).
+    Та сама семантика — у query.FileIndex (індексований варіант для queryFiles).
+    """
+    selector = selector or {}
+    if not isinstance(selector, dict):
+        raise ValueError("selector must be an object")
+    unknown = sorted(set(selector) - set(SELECTOR_KEYS))
+    if unknown:
+        raise ValueError(f"unknown selector keys: {', '.join(unknown)}")
+
+    min_score = _opt_float(selector, "min_score")
+    max_score = _opt_float(selector, "max_score")
+    min_size = _opt_float(selector, "min_size")
+    max_size = _opt_float(selector, "max_size")
+    min_age = _opt_float(selector, "min_age_days")
+    max_age = _opt_float(selector, "max_age_days")
+    if now is None:
+        now = time.time()
+    labels = {norm_tag(v) for v in as_list(selector.get("label"))}
+    categories = {norm_tag(v) for v in as_list(selector.get("category"))}
+    exts = {norm_ext(e) for e in as_list(selector.get("ext"))}
+    statuses = {str(s) for s in as_list(selector.get("status"))}
+    roots = {str(r) for r in as_list(selector.get("root"))}
+    prefixes = tuple(str(p) for p in as_list(selector.get("path_prefix")))
+    needle = str(selector.get("name_contains") or "").lower()
+
+    def match(f: Dict[str, Any]) -> bool:
+        if min_score is not None or max_score is not None:
+            score = float(f.get("trash_score") or 0.0)
+            if min_score is not None and score < min_score:
+                return False
+            if max_score is not None and score > max_score:
+                return False
+        if labels and f.get("user_label") not in labels:
+            return False
+        if categories and f.get("user_category") not in categories:
+            return False
+        if exts and f.get("ext") not in exts:
+            return False
+        if statuses and f.get("scan_status") not in statuses:
+            return False
+        if roots and f.get("root") not in roots:
+            return False
+        if prefixes and not str(f.get("path") or "").startswith(prefixes):
+            return False
+        if needle and needle not in str(f.get("name") or "").lower():
+            return False
+        if min_size is not None or max_size is not None:
+            size = int(f.get("size_bytes") or 0)
+            if min_size is not None and size < min_size:
+                return False
+            if max_size is not None and size > max_size:
+                return False
+        if min_age is not None or max_age is not None:
+            mtime = local_epoch(f.get("last_modified"))
+            if mtime is None:
+                return False
+            age = (now - mtime) / _DAY_S
+            if min_age is not None and age < min_age:
+                return False
+            if max_age is not None and age > max_age:
+                return False
+        return True
+
+    return match
+
+
+def select_paths(files: Iterable[Dict[str, Any]], selector: Optional[Dict[str, Any]]) -> List[str]:
+    match = compile_selector(selector)
+    return [f["path"] for f in files if match(f)]
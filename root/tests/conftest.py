@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# модулі застосунку імпортуються з папки root (як у main.py / cli.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
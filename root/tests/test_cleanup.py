@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+import cleanup
+from cleanup import CleanupConfig, build_plan, execute_plan, list_batches, undo_batch
+from intelligence.state_cache import StateCache
+from intelligence.storage.sqlite_store import SqliteStateStore
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    # журнали і trash — у тимчасовій папці додатку
+    monkeypatch.setenv("APPDATA", str(tmp_path / "appdata"))
+    return tmp_path / "appdata" / "DesktopCleaner"
+
+
+def _desk(tmp_path, names):
+    desk = tmp_path / "desk"
+    desk.mkdir()
+    for name in names:
+        (desk / name).write_text(name, encoding="utf-8")
+    return desk
+
+
+def _cache(tmp_path, labels):
+    cache = StateCache(SqliteStateStore(tmp_path / "state.db"), flush_delay_s=60)
+    for path, (label, category) in labels.items():
+        cache.put_record(path, {"seen_count": 1, "label": label, "category": category})
+    cache.flush()
+    return cache
+
+
+def test_execute_then_undo_restores_files_and_state(tmp_path, app_dir):
+    desk = _desk(tmp_path, ["a.tmp", "b.txt", "c.txt"])
+    paths = {name: str(desk / name) for name in ("a.tmp", "b.txt", "c.txt")}
+    cache = _cache(
+        tmp_path,
+        {paths["a.tmp"]: ("trash", None), paths["b.txt"]: ("organize", "docs"), paths["c.txt"]: ("keep", None)},
+    )
+    config = CleanupConfig(organize_dir=str(tmp_path / "organized"))
+    plan = build_plan(cache.records(), config)
+    assert sorted(a.kind for a in plan.actions) == ["organize", "trash"]
+
+    report = execute_plan(plan, cache=cache)
+    assert (report.done, report.failed) == (2, [])
+    moved = str(tmp_path / "organized" / "docs" / "b.txt")
+    assert not os.path.exists(paths["a.tmp"]) and os.path.exists(moved)
+    assert cache.get_record(paths["a.tmp"]) == {}
+    assert cache.get_record(moved)["category"] == "docs"
+    assert list_batches()[0]["reversible"] == 2
+
+    undo = undo_batch(plan.batch_id, cache=cache)
+    assert (undo.done, undo.failed) == (2, [])
+    assert all(os.path.exists(p) for p in paths.values())
+    assert cache.get_record(paths["a.tmp"])["label"] == "trash"
+    assert cache.get_record(paths["b.txt"])["label"] == "organize"
+    assert cache.get_record(moved) == {}
+    batch = list_batches()[0]
+    assert batch["undone"] and batch["reversible"] == 0
+    assert (app_dir / "cleanup" / f"{plan.batch_id}.undone.jsonl").exists()
+    cache.close()
+
+
+def test_partial_undo_resumes_with_remaining_files(tmp_path, app_dir):
+    desk = _desk(tmp_path, ["a.tmp", "b.tmp", "c.tmp"])
+    cache = _cache(tmp_path, {str(desk / n): ("trash", None) for n in ("a.tmp", "b.tmp", "c.tmp")})
+    plan = build_plan(cache.records(), CleanupConfig())
+    execute_plan(plan, cache=cache)
+
+    # файл з тим самим ім'ям на старому місці — undo не перезаписує його
+    (desk / "b.tmp").write_text("new", encoding="utf-8")
+    first = undo_batch(plan.batch_id, cache=cache)
+    assert first.done == 2 and [f["path"] for f in first.failed] == [
+        a.dst for a in plan.actions if a.src.endswith("b.tmp")
+    ]
+    assert list_batches()[0]["reversible"] == 1
+
+    (desk / "b.tmp").unlink()
+    second = undo_batch(plan.batch_id, cache=cache)
+    assert (second.total, second.done, second.failed) == (1, 1, [])
+    assert (desk / "b.tmp").read_text(encoding="utf-8") == "b.tmp"
+    assert list_batches()[0]["undone"]
+    cache.close()
+
+
+def test_journal_with_torn_last_line_is_readable(tmp_path, app_dir):
+    desk = _desk(tmp_path, ["a.tmp"])
+    cache = _cache(tmp_path, {str(desk / "a.tmp"): ("trash", None)})
+    plan = build_plan(cache.records(), CleanupConfig())
+    report = execute_plan(plan, cache=cache)
+
+    # падіння посеред запису рядка
+    with open(report.journal_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "move", "src": "/x"})[:10])
+    header, ops, restored = cleanup._read_journal(cleanup.get_journal_dir() / f"{plan.batch_id}.jsonl")
+    assert header["batch_id"] == plan.batch_id
+    assert [op["src"] for op in ops] == [str(desk / "a.tmp")] and restored == set()
+
+    assert undo_batch(plan.batch_id, cache=cache).done == 1
+    assert (desk / "a.tmp").exists()
+    cache.close()
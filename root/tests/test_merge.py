@@ -0,0 +1,50 @@
+import json
+
+from intelligence.storage.atomic import merge_record
+from intelligence.storage.json_store import JsonStateStore
+
+
+def test_merge_record_keeps_both_sides():
+    base = {"label": None, "last_seen_at": "1", "seen_count": 1}
+    ours = {"label": "trash", "last_seen_at": "1", "seen_count": 1}
+    theirs = {"label": None, "last_seen_at": "2", "seen_count": 2}
+    assert merge_record(base, ours, theirs) == {"label": "trash", "last_seen_at": "2", "seen_count": 2}
+
+
+def test_merge_record_our_deleted_field_and_missing_theirs():
+    base = {"label": "trash", "category": "docs"}
+    ours = {"label": "trash"}
+    theirs = {"label": "keep", "category": "docs", "content_hash": {"h": 1}}
+    assert merge_record(base, ours, theirs) == {"label": "keep", "content_hash": {"h": 1}}
+    assert merge_record(base, ours, None) == ours
+    # без base (запис новий для нас) — усі наші поля вважаються зміненими
+    assert merge_record(None, {"label": "trash"}, {"label": "keep", "seen_count": 3}) == {
+        "label": "trash",
+        "seen_count": 3,
+    }
+
+
+def test_json_save_merges_foreign_changes(tmp_path):
+    path = tmp_path / "file_state.json"
+    JsonStateStore(path).save(
+        {"version": 1, "files": {"/a": {"seen_count": 1}, "/b": {"seen_count": 1}, "/c": {"seen_count": 1}}}
+    )
+
+    gui, cli = JsonStateStore(path), JsonStateStore(path)
+    gui_state, cli_state = gui.load(), cli.load()
+    cli_state["files"]["/a"]["seen_count"] = 2
+    cli_state["files"]["/d"] = {"seen_count": 1}
+    cli.save(cli_state)
+
+    gui_state["files"]["/a"]["label"] = "trash"
+    del gui_state["files"]["/c"]
+    gui.save(gui_state)
+
+    on_disk = json.loads(path.read_text(encoding="utf-8"))["files"]
+    assert on_disk == {
+        "/a": {"seen_count": 2, "label": "trash"},
+        "/b": {"seen_count": 1},
+        "/d": {"seen_count": 1},
+    }
+    # у пам'яті gui — те саме, що на диску
+    assert {p: dict(r) for p, r in gui_state["files"].items()} == on_disk
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from query import FileIndex, query_files  # noqa: E402
+
+NOW = 1_760_000_000.0
+SORTS = ("", "trash_score:desc", "trash_score:asc", "size_bytes:desc", "seen_count:desc", "name", "last_modified:desc")
+SELECTORS = (
+    None,
+    {"min_score": 0.2},
+    {"label": "none"},
+    {"label": ["trash", "keep"], "ext": "txt"},
+    {"name_contains": "7"},
+    {"path_prefix": "/d/sub"},
+    {"max_size": 2, "min_age_days": 10},
+)
+
+
+def _file(rnd, path):
+    name = path.rsplit("/", 1)[1]
+    return {
+        "path": path,
+        "name": name,
+        "ext": rnd.choice([".txt", ".log", ".zip"]),
+        "size_bytes": rnd.choice([1, 2, 3]),
+        "trash_score": rnd.choice([None, 0.1, 0.2, 0.5]),
+        "seen_count": rnd.choice([None, 1, 2]),
+        "last_modified": rnd.choice([None, "2025-01-01T10:00:00", "2025-09-01T10:00:00"]),
+        "first_seen_at": None,
+        "user_label": rnd.choice([None, "trash", "keep"]),
+        "user_category": None,
+        "scan_status": "unchanged",
+        "root": "/d",
+    }
+
+
+def _check(index, files):
+    for selector in SELECTORS:
+        for sort in SORTS:
+            total, page = index.query(selector, sort, 0, 10**6, now=NOW)
+            want_total, want = query_files(files, selector, sort, 0, 10**6, now=NOW)
+            assert total == want_total, (selector, sort)
+            assert [f["path"] for f in page] == [f["path"] for f in want], (selector, sort)
+
+
+def test_update_same_path_twice_keeps_last():
+    rnd = random.Random(1)
+    files = [_file(rnd, f"/d/f{i}") for i in range(5)]
+    index = FileIndex(files)
+    first, last = dict(files[2], trash_score=0.9), dict(files[2], trash_score=0.3)
+    index.update([first, last])
+
+    assert len(index) == 5
+    assert index.get("/d/f2") is last
+    files[2] = last
+    _check(index, files)
+
+
+def test_update_and_remove_match_list_scan():
+    rnd = random.Random(7)
+    paths = [f"/d/f{i}" for i in range(150)] + [f"/d/sub/g{i}" for i in range(50)]
+    current = {p: _file(rnd, p) for p in paths}
+    # порядок рядків: змінений лишається на місці, новий — у кінці (як self._files у main.py)
+    order = list(current)
+    index = FileIndex([current[p] for p in order])
+
+    for step in range(40):
+        changed = [
+            _file(rnd, rnd.choice(order + [f"/d/new{step}_{k}"]))
+            for k in range(rnd.randint(1, 15))
+        ]
+        changed_paths = {f["path"] for f in changed}
+        removed = [p for p in rnd.sample(order, 4) if p not in changed_paths]
+        for f in changed:
+            if f["path"] not in current:
+                order.append(f["path"])
+            current[f["path"]] = f
+        for p in removed:
+            del current[p]
+            order.remove(p)
+        index.update(changed, removed)
+
+        assert len(index) == len(current)
+        _check(index, [current[p] for p in order])
+
+    # повернення видаленого шляху — новий рядок у кінці
+    back = _file(rnd, removed[0])
+    index.update([back])
+    _check(index, [current[p] for p in order] + [back])
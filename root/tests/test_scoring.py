@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from intelligence.rules import DEFAULT_RULES, CompiledRules  # noqa: E402
+from intelligence.scoring import score_records  # noqa: E402
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+CUSTOM_RULES = {
+    "overrides": [
+        {"id": "pinned", "when": {"label": ["pinned"]}, "score": 0.0},
+        {"id": "shot", "when": {"name": r"^(img|screenshot)", "ext": [".png"]}, "score": 0.7},
+    ],
+    "rules": [
+        {"id": "often_seen", "when": {"seen_count_over": 3}, "weight": 0.2},
+        {"id": "digits", "when": {"name": r"\d{3,}"}, "weight": 0.1},
+        {"id": "small_dup", "when": {"duplicate": True, "size_under": 100}, "weight": 0.3},
+        {"id": "sniffed_installer", "when": {"kind": ["installer"], "seen_under_days": 10}, "weight": 0.4},
+        {
+            "id": "age",
+            "reason": "age_{age_days}",
+            "tiers": [{"when": {"age_over_days": 100}, "weight": 0.3}, {"when": {"age_over_days": 10}, "weight": 0.1}],
+        },
+    ],
+}
+
+
+def _samples(rnd, n):
+    exts = [".tmp", ".zip", ".exe", ".txt", ".pdf", "", ".png", ".LOG", ".7z", ".bin"]
+    words = ["report", "copy", "final", "new", "download", "img (2)", "Копія", "screenshot", "x(12)", "doc1234"]
+    file_objs, recs = [], []
+    for i in range(n):
+        ext = rnd.choice(exts)
+        mtime = NOW - timedelta(days=rnd.uniform(-5, 400))
+        file_objs.append(
+            {
+                "name": f"{rnd.choice(words)} {rnd.choice(words)}{ext}",
+                "ext": ext.lower(),
+                "size_bytes": rnd.choice([0, 10, 600 * 1024 * 1024]),
+                "duplicate_of": rnd.choice([None, "/x"]),
+                "content_type": rnd.choice([None, "exe", "zip"]),
+                "last_modified": mtime.replace(tzinfo=None).isoformat() if rnd.random() < 0.9 else None,
+            }
+        )
+        first_seen = NOW - timedelta(days=rnd.uniform(0, 40))
+        recs.append(
+            {
+                "label": rnd.choice([None, "trash", "keep", "pinned", "organize"]),
+                "first_seen_at": first_seen.isoformat() if rnd.random() < 0.9 else None,
+                "seen_count": rnd.choice([None, 1, 5]),
+            }
+        )
+    return file_objs, recs
+
+
+@pytest.mark.parametrize("spec", [DEFAULT_RULES, CUSTOM_RULES], ids=["default", "custom"])
+def test_score_batch_matches_score_file(spec):
+    rules = CompiledRules(spec)
+    now = NOW.timestamp()
+    file_objs, recs = _samples(random.Random(3), 3000)
+    batch = score_records(file_objs, recs, now=now, rules=rules)
+
+    for i, (f, rec) in enumerate(zip(file_objs, recs)):
+        score, reasons = rules.score(f, rec, now)
+        assert (float(batch.scores[i]), batch.reasons(i)) == (score, reasons), (f, rec)
+        assert batch.due(i) == rules.next_change(f, rec, now), (f, rec)
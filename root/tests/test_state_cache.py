@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from intelligence.state_cache import StateCache
+from intelligence.storage import summary
+from intelligence.storage.sqlite_store import SqliteStateStore
+
+
+class _SlowStore(SqliteStateStore):
+    # save_records чекає, поки тест не відпустить release
+    def __init__(self, path):
+        super().__init__(path)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    def save_records(self, records, removed=(), meta=None):
+        self.entered.set()
+        self.release.wait(5)
+        if self.fail:
+            raise OSError("disk full")
+        return super().save_records(records, removed, meta)
+
+
+def _files(path):
+    return {p: dict(r) for p, r in SqliteStateStore(path).load()["files"].items()}
+
+
+def test_flush_writes_dirty_records_and_summary(tmp_path):
+    db = tmp_path / "state.db"
+    cache = StateCache(SqliteStateStore(db), flush_delay_s=60)
+    cache.put_record("/a", {"seen_count": 1})
+    cache.set_label("/a", "trash")
+    cache.set_category("/b", "docs")
+    cache.flush()
+
+    files = _files(db)
+    assert files["/a"]["label"] == "trash"
+    assert files["/b"]["category"] == "docs"
+    assert SqliteStateStore(db).load_summary() == summary.build_counters(files)
+
+    cache.remove("/a")
+    cache.flush()
+    assert set(_files(db)) == {"/b"}
+    cache.close()
+
+
+def test_changes_during_flush_are_not_blocked_or_lost(tmp_path):
+    db = tmp_path / "state.db"
+    store = _SlowStore(db)
+    cache = StateCache(store, flush_delay_s=60)
+    cache.set_label("/a", "trash")
+
+    flusher = threading.Thread(target=cache.flush)
+    flusher.start()
+    assert store.entered.wait(5)
+    # запис на диск іде поза lock-ом state: зміна не чекає на нього
+    done = threading.Event()
+    threading.Thread(target=lambda: (cache.set_label("/a", "keep"), done.set())).start()
+    assert done.wait(1)
+    store.release.set()
+    flusher.join(5)
+
+    assert _files(db)["/a"]["label"] == "trash"
+    cache.flush()
+    assert _files(db)["/a"]["label"] == "keep"
+    cache.close()
+
+
+def test_failed_flush_keeps_records_dirty(tmp_path):
+    db = tmp_path / "state.db"
+    store = _SlowStore(db)
+    store.release.set()
+    cache = StateCache(store, flush_delay_s=60)
+    cache.set_label("/a", "trash")
+
+    store.fail = True
+    with pytest.raises(OSError):
+        cache.flush()
+    assert "/a" not in _files(db)
+
+    store.fail = False
+    cache.flush()
+    assert _files(db)["/a"]["label"] == "trash"
+    cache.close()
+
+
+def test_close_flushes_once_and_stops_timer(tmp_path):
+    db = tmp_path / "state.db"
+    cache = StateCache(SqliteStateStore(db), flush_delay_s=60)
+    cache.set_label("/a", "trash")
+    assert cache._timer is not None
+
+    cache.close()
+    assert _files(db)["/a"]["label"] == "trash"
+    assert cache._timer is None
+
+    # після close зміни не запускають таймер, але явний flush їх пише
+    cache.set_label("/a", "keep")
+    assert cache._timer is None
+    cache.close()
+    cache.flush()
+    assert _files(db)["/a"]["label"] == "keep"
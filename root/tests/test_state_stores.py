@@ -0,0 +1,110 @@
+import json
+
+from intelligence.storage.json_store import JsonStateStore
+from intelligence.storage.sqlite_store import SqliteStateStore
+
+
+def _rec(**fields):
+    base = {"first_seen_at": "2025-03-01T10:00:00+00:00", "seen_count": 1}
+    base.update(fields)
+    return base
+
+
+def _files(store):
+    return {p: dict(rec) for p, rec in store.load()["files"].items()}
+
+
+def test_sqlite_two_writers_save_keep_both_edits(tmp_path):
+    db = tmp_path / "state.db"
+    SqliteStateStore(db).save({"version": 1, "files": {"/a": _rec(), "/b": _rec()}})
+
+    gui, cli = SqliteStateStore(db), SqliteStateStore(db)
+    gui_state, cli_state = gui.load(), cli.load()
+    gui_state["files"]["/a"]["label"] = "trash"
+    cli_state["files"]["/a"]["category"] = "docs"
+    cli_state["files"]["/b"]["label"] = "keep"
+    gui.save(gui_state)
+    cli.save(cli_state)
+
+    files = _files(SqliteStateStore(db))
+    assert files["/a"]["label"] == "trash"
+    assert files["/a"]["category"] == "docs"
+    assert files["/b"]["label"] == "keep"
+    # другий писач бачить злитий запис і у своїй пам'яті
+    assert cli_state["files"]["/a"]["label"] == "trash"
+
+
+def test_sqlite_two_writers_save_records_pull_foreign_changes(tmp_path):
+    db = tmp_path / "state.db"
+    SqliteStateStore(db).save({"version": 1, "files": {"/a": _rec(), "/b": _rec(), "/c": _rec()}})
+
+    gui, cli = SqliteStateStore(db), SqliteStateStore(db)
+    gui.load()
+    cli.load()
+    assert gui.save_records({"/a": _rec(label="trash")}, removed=["/c"]) == {}
+    pulled = cli.save_records({"/a": _rec(category="docs"), "/b": _rec(label="keep")})
+
+    assert pulled["/a"]["label"] == "trash" and pulled["/a"]["category"] == "docs"
+    assert pulled["/c"] is None
+    files = _files(SqliteStateStore(db))
+    assert set(files) == {"/a", "/b"}
+    assert files["/a"]["label"] == "trash" and files["/a"]["category"] == "docs"
+    assert files["/b"]["label"] == "keep"
+
+
+def test_sqlite_same_field_last_writer_wins(tmp_path):
+    db = tmp_path / "state.db"
+    SqliteStateStore(db).save({"version": 1, "files": {"/a": _rec()}})
+
+    gui, cli = SqliteStateStore(db), SqliteStateStore(db)
+    gui.load()
+    cli.load()
+    gui.save_records({"/a": _rec(label="trash")})
+    cli.save_records({"/a": _rec(label="keep")})
+
+    assert _files(SqliteStateStore(db))["/a"]["label"] == "keep"
+
+
+def test_json_save_records_refreshes_stamp(tmp_path):
+    path = tmp_path / "file_state.json"
+    store = JsonStateStore(path)
+    store.save({"version": 1, "files": {"/a": _rec()}})
+    store.load()
+
+    store.save_records({"/a": _rec(label="trash")})
+    assert store._stamp == store._file_stamp()
+
+    # після чужого запису stamp лишається старим — наступний save() зливає
+    other = JsonStateStore(path)
+    other.load()
+    other.save_records({"/b": _rec(label="keep")})
+    store.save_records({"/a": _rec(label="pinned")})
+    assert store._stamp != store._file_stamp()
+
+    state = {"version": 1, "files": {"/a": _rec(label="pinned")}}
+    store.save(state)
+    on_disk = json.loads(path.read_text(encoding="utf-8"))["files"]
+    assert on_disk["/a"]["label"] == "pinned"
+    assert on_disk["/b"]["label"] == "keep"
+
+
+def test_sqlite_write_seq_pulls_only_newer_rows(tmp_path):
+    db = tmp_path / "state.db"
+    SqliteStateStore(db).save({"version": 1, "files": {"/a": _rec(), "/b": _rec()}})
+
+    gui, cli = SqliteStateStore(db), SqliteStateStore(db)
+    gui.load()
+    cli.load()
+    # без чужих записів між ними — нічого не підтягується
+    assert gui.save_records({"/a": _rec(label="trash")}) == {}
+    assert gui.save_records({"/a": _rec(label="trash", category="docs")}) == {}
+
+    pulled = cli.save_records({"/b": _rec(label="keep")})
+    assert set(pulled) == {"/a"}
+    assert pulled["/a"]["category"] == "docs"
+    # write_seq cli тепер актуальний: повторний запис нічого не тягне
+    assert cli.save_records({"/b": _rec(label="pinned")}) == {}
+
+    files = _files(SqliteStateStore(db))
+    assert files["/a"]["label"] == "trash" and files["/a"]["category"] == "docs"
+    assert files["/b"]["label"] == "pinned"
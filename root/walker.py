@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_IGNORE = ["desktop.ini", "thumbs.db", ".DS_Store", "~$*", "$RECYCLE.BIN", "node_modules", ".git"]
+
+# аліаси для scan_config.json
+ROOT_ALIASES = {
+    "desktop": lambda: Path.home() / "Desktop",
+    "downloads": lambda: Path.home() / "Downloads",
+    "documents": lambda: Path.home() / "Documents",
+}
+
+
+@dataclass
+class ScanConfig:
+    """
+    Налаштування сканування.
+    roots      — папки ("desktop" / "downloads" / "documents" або будь-який шлях)
+    max_depth  — 0 = тільки верхній рівень, N = N рівнів підпапок, None = без обмеження
+    ignore     — glob-и по імені або по шляху відносно root ("build/*", "*.lnk")
+    workers    — потоки обходу
+    queue_size — межа черги результатів (backpressure, якщо споживач повільний)
+    dirs       — обійти тільки ці папки під roots (без підпапок; rescan для watcher-а);
+                 ignore і max_depth діють так само, як при повному обході
+    """
+    roots: List[str] = field(default_factory=lambda: ["desktop"])
+    max_depth: Optional[int] = 0
+    ignore: List[str] = field(default_factory=lambda: list(DEFAULT_IGNORE))
+    workers: int = 8
+    queue_size: int = 4096
+    dirs: Optional[List[str]] = None
+
+    def resolved_roots(self) -> List[Path]:
+        """
+        Аліаси -> шляхи, без неіснуючих і без дублікатів.
+        """
+        out: List[Path] = []
+        seen = set()
+        for raw in self.roots:
+            alias = ROOT_ALIASES.get(str(raw).strip().lower())
+            p = alias() if alias else Path(os.path.expandvars(os.path.expanduser(str(raw))))
+            if not p.is_dir():
+                continue
+            key = os.path.normcase(os.path.realpath(p))
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(p)
+        return out
+
+
+def _default_config() -> ScanConfig:
+    cfg = ScanConfig()
+    # як і раніше: якщо Desktop немає — home
+    if not (Path.home() / "Desktop").exists():
+        cfg.roots = [str(Path.home())]
+    return cfg
+
+
+def load_scan_config() -> ScanConfig:
+    """
+    scan_config.json з папки додатку; якщо немає або битий — Desktop, тільки верхній рівень.
+    """
+    try:
+        from intelligence.storage.paths import get_scan_config_path  # type: ignore
+        path = get_scan_config_path()
+    except Exception:
+        return _default_config()
+
+    if not path.exists():
+        return _default_config()
+
+    try:
+        data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict):
+            return _default_config()
+
+        cfg = _default_config()
+        roots = data.get("roots")
+        if isinstance(roots, list) and roots:
+            cfg.roots = [str(r) for r in roots]
+        if "max_depth" in data:
+            md = data.get("max_depth")
+            cfg.max_depth = None if md is None else max(0, int(md))
+        ignore = data.get("ignore")
+        if isinstance(ignore, list):
+            cfg.ignore = [str(g) for g in ignore]
+        if "workers" in data:
+            cfg.workers = max(1, int(data["workers"]))
+        if "queue_size" in data:
+            cfg.queue_size = max(1, int(data["queue_size"]))
+        return cfg
+    except Exception:
+        return _default_config()
+
+
+def is_ignored(name: str, rel: str, patterns: List[str]) -> bool:
+    for pat in patterns:
+        if fnmatch(name, pat) or fnmatch(rel, pat):
+            return True
+    return False
+
+
+# (root, dir_path, rel_dir, depth); rel_dir — шлях відносно root через "/"
+_DirTask = Tuple[str, str, str, int]
+
+
+def dir_tasks(config: ScanConfig) -> List[_DirTask]:
+    """
+    Стартові задачі обходу: корені, а з config.dirs — ці папки з rel_dir / depth
+    відносно кореня, що їх містить (ignore-glob-и "build/*" перевіряються по тому ж
+    шляху, що й у повному обході). Папки поза коренями, глибші за max_depth або
+    під ignore — пропускаються, як їх пропустив би повний обхід.
+    """
+    roots = [str(r) for r in config.resolved_roots()]
+    if config.dirs is None:
+        return [(r, r, "", 0) for r in roots]
+
+    norm_roots = [(r, os.path.normcase(os.path.normpath(r))) for r in roots]
+    tasks: List[_DirTask] = []
+    seen = set()
+    for raw in config.dirs:
+        d = os.path.normpath(str(raw))
+        key = os.path.normcase(d)
+        if key in seen:
+            continue
+        seen.add(key)
+        for root, root_key in norm_roots:
+            if key == root_key:
+                parts: List[str] = []
+            elif key.startswith(root_key.rstrip(os.sep) + os.sep):
+                parts = d[len(root_key.rstrip(os.sep)) + 1:].split(os.sep)
+            else:
+                continue
+            if config.max_depth is not None and len(parts) > config.max_depth:
+                break
+            if config.ignore and any(
+                is_ignored(parts[i], "/".join(parts[: i + 1]), config.ignore) for i in range(len(parts))
+            ):
+                break
+            tasks.append((root, d, "/".join(parts), len(parts)))
+            break
+    return tasks
+
+
+def subdir_tasks(config: ScanConfig, task: _DirTask) -> List[_DirTask]:
+    """
+    Підпапки task, у які зайшов би повний обхід (ті самі ignore і max_depth).
+    """
+    root, dir_path, rel_dir, depth = task
+    if config.max_depth is not None and depth >= config.max_depth:
+        return []
+    out: List[_DirTask] = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if config.ignore and is_ignored(entry.name, rel, config.ignore):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        out.append((root, entry.path, rel, depth + 1))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return out
+
+
+def walk_dirs(config: ScanConfig, tasks: List[_DirTask], limit: Optional[int] = None) -> List[_DirTask]:
+    """
+    tasks разом з усіма їх підпапками (subdir_tasks), не більше limit.
+    """
+    out: List[_DirTask] = []
+    stack = list(tasks)
+    while stack and (limit is None or len(out) < limit):
+        task = stack.pop()
+        out.append(task)
+        stack.extend(subdir_tasks(config, task))
+    return out
+
+
+_DONE = object()
+# файли передаються в чергу пачками — менше блокувань на великих папках
+_CHUNK = 256
+
+
+class ParallelWalker:
+    """
+    Паралельний обхід директорій з work-stealing.
+
+    Кожен потік має власний deque задач (папок): бере з правого краю (свої, свіжі),
+    а коли його deque порожній — краде з лівого краю чужого (найстаріші, зазвичай
+    найбільші піддерева). Файли йдуть у обмежену чергу, яку читає iter_files().
+
+    metrics — metrics.ScanMetrics (опційно): час листингу / stat / очікування
+    на заповнену чергу по всіх потоках + лічильники dirs / walk_errors.
+    """
+
+    def __init__(
+        self,
+        config: ScanConfig,
+        cancel: Optional[threading.Event] = None,
+        metrics: Any = None,
+    ):
+        self._config = config
+        self._cancel = cancel or threading.Event()
+        self._metrics = metrics
+        self._stop = threading.Event()
+        self._workers = max(1, int(config.workers))
+        self._deques: List[Deque[_DirTask]] = [deque() for _ in range(self._workers)]
+        self._results: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(config.queue_size)))
+        # задачі в deque-ах + ті, що зараз обробляються
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    # -------------------- producer side --------------------
+
+    def _stopped(self) -> bool:
+        return self._stop.is_set() or self._cancel.is_set()
+
+    def _put(self, item: Any) -> bool:
+        while not self._stopped():
+            try:
+                self._results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _push(self, idx: int, task: _DirTask) -> None:
+        with self._cond:
+            self._pending += 1
+            self._deques[idx].append(task)
+            self._cond.notify()
+
+    def _take(self, idx: int) -> Optional[_DirTask]:
+        try:
+            return self._deques[idx].pop()
+        except IndexError:
+            pass
+        for k in range(1, self._workers):
+            try:
+                return self._deques[(idx + k) % self._workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _task_done(self) -> None:
+        with self._cond:
+            self._pending -= 1
+            if self._pending == 0:
+                self._cond.notify_all()
+
+    def _process(self, idx: int, task: _DirTask) -> None:
+        metrics = self._metrics
+        if metrics is None:
+            self._scan_dir(idx, task, None)
+            return
+        # [stat_s, stat_calls, put_s, errors]
+        acc = [0.0, 0, 0.0, 0]
+        t0 = time.perf_counter()
+        try:
+            self._scan_dir(idx, task, acc)
+        finally:
+            total = time.perf_counter() - t0
+            metrics.add_time("walk_stat", acc[0], int(acc[1]))
+            metrics.add_time("walk_backpressure", acc[2], 0)
+            metrics.add_time("walk_listing", max(0.0, total - acc[0] - acc[2]))
+            metrics.count("dirs")
+            if acc[3]:
+                metrics.count("walk_errors", int(acc[3]))
+
+    def _put_chunk(self, chunk: Any, acc: Optional[list]) -> bool:
+        if acc is None:
+            return self._put(chunk)
+        t0 = time.perf_counter()
+        try:
+            return self._put(chunk)
+        finally:
+            acc[2] += time.perf_counter() - t0
+
+    def _scan_dir(self, idx: int, task: _DirTask, acc: Optional[list]) -> None:
+        root, dir_path, rel_dir, depth = task
+        cfg = self._config
+        chunk: List[Tuple[str, os.DirEntry, os.stat_result]] = []
+        perf = time.perf_counter
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if self._stopped():
+                        return
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if cfg.ignore and is_ignored(entry.name, rel, cfg.ignore):
+                        continue
+                    try:
+                        if entry.is_file():
+                            # stat тут, у потоці обходу: на повільних дисках це найдорожче
+                            if acc is None:
+                                st = entry.stat()
+                            else:
+                                t0 = perf()
+                                st = entry.stat()
+                                acc[0] += perf() - t0
+                                acc[1] += 1
+                            chunk.append((root, entry, st))
+                            if len(chunk) >= _CHUNK:
+                                if not self._put_chunk(chunk, acc):
+                                    return
+                                chunk = []
+                        elif entry.is_dir(follow_symlinks=False):
+                            if cfg.dirs is None and (cfg.max_depth is None or depth < cfg.max_depth):
+                                self._push(idx, (root, entry.path, rel, depth + 1))
+                    except OSError:
+                        if acc is not None:
+                            acc[3] += 1
+                        continue
+        except OSError:
+            if acc is not None:
+                acc[3] += 1
+        if chunk:
+            self._put_chunk(chunk, acc)
+
+    def _worker(self, idx: int) -> None:
+        while True:
+            task = self._take(idx)
+            if task is None:
+                with self._cond:
+                    if self._pending == 0 or self._stopped():
+                        return
+                    self._cond.wait(timeout=0.05)
+                continue
+            try:
+                if not self._stopped():
+                    self._process(idx, task)
+            finally:
+                self._task_done()
+
+    # -------------------- consumer side --------------------
+
+    def iter_files(self) -> Iterator[Tuple[str, os.DirEntry, os.stat_result]]:
+        """
+        (root, DirEntry, stat) для кожного файлу. Порядок — не детермінований.
+        Якщо генератор закрили раніше — потоки зупиняються.
+        """
+        tasks = dir_tasks(self._config)
+        if not tasks:
+            return
+
+        # pending > 0, поки корені не додані — щоб потоки не завершились одразу
+        with self._cond:
+            self._pending += 1
+
+        # потоки стартують до появи роботи: Thread.start() не чекає на GIL зайнятих воркерів
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"walker-{i}", daemon=True)
+            for i in range(self._workers)
+        ]
+        for t in threads:
+            t.start()
+
+        for i, task in enumerate(tasks):
+            self._push(i % self._workers, task)
+        self._task_done()
+
+        def _finish() -> None:
+            for t in threads:
+                t.join()
+            self._put(_DONE)
+
+        threading.Thread(target=_finish, name="walker-join", daemon=True).start()
+
+        try:
+            while True:
+                try:
+                    item = self._results.get(timeout=0.1)
+                except queue.Empty:
+                    if self._cancel.is_set():
+                        return
+                    continue
+                if item is _DONE:
+                    return
+                yield from item
+        finally:
+            self._stop.set()
+
+
+def walk_files(
+    config: ScanConfig,
+    cancel: Optional[threading.Event] = None,
+    metrics: Any = None,
+) -> Iterator[Tuple[str, os.DirEntry, os.stat_result]]:
+    return ParallelWalker(config, cancel=cancel, metrics=metrics).iter_files()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from walker import ScanConfig, dir_tasks, walk_dirs
+
+# більше папок не ставимо на спостереження (ліміти inotify / ресурси)
+MAX_WATCHED_DIRS = 4096
+
+
+def list_watch_dirs(config: ScanConfig, limit: int = MAX_WATCHED_DIRS) -> List[str]:
+    """
+    Корені + підпапки до config.max_depth (з тими ж ignore), не більше limit.
+    """
+    tasks = dir_tasks(replace(config, dirs=None))
+    return [d for _root, d, _rel, _depth in walk_dirs(config, tasks, limit)]
+
+
+class ChangeDebouncer:
+    """
+    Збирає змінені папки і викликає callback(set_of_dirs) один раз,
+    коли delay_s секунд не було нових подій (але не пізніше max_delay_s від першої).
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Set[str]], None],
+        delay_s: float = 0.5,
+        max_delay_s: float = 3.0,
+    ):
+        self._callback = callback
+        self._delay_s = delay_s
+        self._max_delay_s = max_delay_s
+        self._lock = threading.Lock()
+        self._dirs: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._first_at: Optional[float] = None
+        self._closed = False
+
+    def notify(self, dir_path: str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            now = time.monotonic()
+            self._dirs.add(dir_path)
+            if self._first_at is None:
+                self._first_at = now
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = min(self._delay_s, max(0.0, self._first_at + self._max_delay_s - now))
+            self._timer = threading.Timer(delay, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self) -> None:
+        with self._lock:
+            dirs, self._dirs = self._dirs, set()
+            self._timer = None
+            self._first_at = None
+        if dirs:
+            self._callback(dirs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirs.clear()
+
+
+# name -> (inode, size, mtime_ns)
+_DirSnapshot = Dict[str, Tuple[int, int, int]]
+
+
+def _snapshot_dir(dir_path: str) -> Optional[_DirSnapshot]:
+    snap: _DirSnapshot = {}
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snap[entry.name] = (entry.inode(), st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+    return snap
+
+
+class PollingWatcher:
+    """
+    Запасний backend без inotify/QFileSystemWatcher: раз на interval_s
+    порівнює листинг кожної папки з попереднім і повідомляє on_change(dir).
+    """
+
+    def __init__(self, dirs: Iterable[str], on_change: Callable[[str], None], interval_s: float = 5.0):
+        self._dirs = list(dirs)
+        self._on_change = on_change
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._snapshots: Dict[str, Optional[_DirSnapshot]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="polling-watcher", daemon=True)
+        self._thread.start()
+
+    def add(self, dirs: Iterable[str]) -> None:
+        # список замінюється цілим — потік опитування дочитує попередній
+        self._dirs = self._dirs + [d for d in dirs if d not in self._dirs]
+
+    def remove(self, dirs: Iterable[str]) -> None:
+        gone = set(dirs)
+        self._dirs = [d for d in self._dirs if d not in gone]
+
+    def _run(self) -> None:
+        for d in self._dirs:
+            self._snapshots[d] = _snapshot_dir(d)
+        while not self._stop.wait(self._interval_s):
+            for d in self._dirs:
+                if self._stop.is_set():
+                    return
+                snap = _snapshot_dir(d)
+                if d not in self._snapshots:
+                    # додана через add: перший листинг — база для порівняння
+                    self._snapshots[d] = snap
+                elif snap != self._snapshots[d]:
+                    self._snapshots[d] = snap
+                    self._on_change(d)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval_s + 1.0)
+            self._thread = None
@@ -0,0 +1,224 @@
+"""
+Формати payload-ів bridge -> UI (filesBatch / filesDelta / getFiles / getFilesSince).
+
+"json" — як було: список file_obj, кожен — повний JSON-об'єкт.
+"columnar" — паралельні масиви по полях:
+
+    {"format": "columnar", "v": 1, "n": N, "sep": "/",
+     "strings": [...],          # спільна таблиця рядків: папки, розширення, корені, мітки, причини...
+     "reason_sets": [[i, ...]], # різні набори trash_reasons (індекси в strings)
+     "cols": {
+        "dir": [i], "name": [str], "ext": [i], "size": [int],
+        "mtime": [sec], "atime": [sec],                   # epoch, цілі секунди
+        "first_seen": [sec|null], "last_seen": [sec|null], "seen": [int],
+        "score": [int],                                   # trash_score * 1000 (округлено)
+        "reasons": [k],                                   # індекс у reason_sets
+        "label": [i|null], "category": [i|null], "status": [i], "root": [i],
+        "dup_group": [i|null], "dup_of": [i|null], "ctype": [i|null]}}
+
+path = strings[dir] + sep + name. Ключі й повторювані рядки не повторюються в кожному
+рядку, а числа не проходять через ISO-рядки — payload у кілька разів менший,
+і json.dumps / JSON.parse відповідно швидші.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from intelligence.records import parse_iso_ts
+from normalize import epochs, local_epochs
+
+WIRE_FORMATS = ("json", "columnar")
+COLUMNAR_VERSION = 1
+
+# поля, зміна яких робить рядок "зміненим" для getFilesSince.
+# last_seen_at / seen_count / scan_status змінюються в кожного файлу на кожному скануванні —
+# через них delta завжди була б повною, тож UI бачить їх станом на останню передачу рядка
+_VERSIONED_FIELDS = (
+    "size_bytes",
+    "last_modified",
+    "last_access",
+    "trash_score",
+    "user_label",
+    "user_category",
+    "duplicate_group",
+    "duplicate_of",
+    "root",
+)
+
+# скільки видалених шляхів пам'ятати для delta; старіші запити отримують повний список
+MAX_TOMBSTONES = 100_000
+
+
+def _record_epoch(iso: Any) -> Optional[int]:
+    # first_seen_at / last_seen_at — час state, naive = UTC (records.parse_iso_ts)
+    ts = parse_iso_ts(iso)
+    return None if ts != ts else int(ts)
+
+
+def encode_files(files: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Список file_obj -> колонковий payload (див. docstring модуля).
+    Колонки будуються окремими проходами (comprehension-и), таблиця рядків — dict.setdefault:
+    так швидше, ніж рядок за рядком.
+    """
+    files = files if isinstance(files, list) else list(files)
+    index: Dict[str, int] = {}
+    intern = index.setdefault
+
+    def col(key: str) -> List[Optional[int]]:
+        return [None if v is None else intern(v, len(index)) for v in [f.get(key) for f in files]]
+
+    sep = os.sep
+    dirs: List[int] = []
+    names: List[str] = []
+    for f in files:
+        directory, _, name = f["path"].rpartition(sep)
+        dirs.append(intern(directory, len(index)))
+        names.append(name)
+
+    reason_sets: List[List[int]] = []
+    reason_index: Dict[Tuple[str, ...], int] = {}
+    reasons_col: List[int] = []
+    for f in files:
+        reasons = tuple(f.get("trash_reasons") or ())
+        k = reason_index.get(reasons)
+        if k is None:
+            k = reason_index[reasons] = len(reason_sets)
+            reason_sets.append([intern(r, len(index)) for r in reasons])
+        reasons_col.append(k)
+
+    cols = {
+        "dir": dirs,
+        "name": names,
+        "ext": [intern(f.get("ext") or "", len(index)) for f in files],
+        "size": [int(f.get("size_bytes") or 0) for f in files],
+        "mtime": local_epochs([f.get("last_modified") for f in files]),
+        "atime": local_epochs([f.get("last_access") for f in files]),
+        "first_seen": epochs([f.get("first_seen_at") for f in files], _record_epoch),
+        "last_seen": epochs([f.get("last_seen_at") for f in files], _record_epoch),
+        "seen": [int(f.get("seen_count") or 0) for f in files],
+        "score": [int(round(float(f.get("trash_score") or 0.0) * 1000)) for f in files],
+        "reasons": reasons_col,
+        "label": col("user_label"),
+        "category": col("user_category"),
+        "status": col("scan_status"),
+        "root": col("root"),
+        "dup_group": col("duplicate_group"),
+        "dup_of": col("duplicate_of"),
+        "ctype": col("content_type"),
+    }
+    return {
+        "format": "columnar",
+        "v": COLUMNAR_VERSION,
+        "n": len(files),
+        "sep": sep,
+        # dict зберігає порядок вставки: ключ -> його індекс
+        "strings": list(index),
+        "reason_sets": reason_sets,
+        "cols": cols,
+    }
+
+
+def encode_for(files: List[Dict[str, Any]], fmt: str) -> Any:
+    """
+    Значення поля "files" у payload-і: список file_obj ("json") або колонки ("columnar").
+    """
+    return encode_files(files) if fmt == "columnar" else files
+
+
+def encode_delta(
+    fmt: str,
+    added: Sequence[Dict[str, Any]] = (),
+    changed: Sequence[Dict[str, Any]] = (),
+    renamed: Sequence[Tuple[Optional[str], Dict[str, Any]]] = (),
+    removed: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """
+    filesDelta: {"added", "changed", "renamed": [{"from", "file"}], "removed"};
+    у "columnar" — added / changed колонками, renamed — {"from": [...], "files": колонки}.
+    """
+    if fmt == "columnar":
+        renamed_out: Any = {"from": [old for old, _f in renamed], "files": encode_files([f for _old, f in renamed])}
+    else:
+        renamed_out = [{"from": old, "file": f} for old, f in renamed]
+    return {
+        "format": fmt,
+        "added": encode_for(list(added), fmt),
+        "changed": encode_for(list(changed), fmt),
+        "renamed": renamed_out,
+        "removed": list(removed),
+    }
+
+
+class RowVersions:
+    """
+    Версії рядків для delta-запитів getFilesSince(version): кожна зміна списку файлів
+    (повне сканування, watcher, перерахунок, мітки) — нова версія; для кожного шляху
+    пам'ятається версія, в якій він востаннє змінився (по _VERSIONED_FIELDS),
+    для видалених — tombstone.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._rows: Dict[str, int] = {}
+        self._sigs: Dict[str, Tuple[Any, ...]] = {}
+        self._removed: Dict[str, int] = {}
+        # з якої версії tombstones повні (старіші викинуто через MAX_TOMBSTONES)
+        self._horizon = 0
+
+    @staticmethod
+    def _sig(f: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(f.get(k) for k in _VERSIONED_FIELDS) + (tuple(f.get("trash_reasons") or ()),)
+
+    def sync(self, files: List[Dict[str, Any]]) -> int:
+        """
+        Повний список після сканування: змінені / нові рядки і зниклі шляхи — у нову версію.
+        """
+        self.version += 1
+        v = self.version
+        current = set()
+        for f in files:
+            p = f["path"]
+            current.add(p)
+            sig = self._sig(f)
+            if self._sigs.get(p) != sig:
+                self._sigs[p] = sig
+                self._rows[p] = v
+                self._removed.pop(p, None)
+        self._drop([p for p in self._rows if p not in current], v)
+        return v
+
+    def update(self, changed: Iterable[Dict[str, Any]], removed: Iterable[str] = ()) -> int:
+        """
+        Точкові зміни (watcher / rescore / мітки / cleanup).
+        """
+        self.version += 1
+        v = self.version
+        for f in changed:
+            p = f["path"]
+            self._sigs[p] = self._sig(f)
+            self._rows[p] = v
+            self._removed.pop(p, None)
+        self._drop(removed, v)
+        return v
+
+    def _drop(self, paths: Iterable[str], v: int) -> None:
+        for p in paths:
+            if self._rows.pop(p, None) is not None:
+                self._sigs.pop(p, None)
+                self._removed[p] = v
+        if len(self._removed) > MAX_TOMBSTONES:
+            # dict зберігає порядок вставки — найстаріші tombstones на початку
+            excess = len(self._removed) - MAX_TOMBSTONES
+            for p in list(self._removed)[:excess]:
+                self._horizon = max(self._horizon, self._removed.pop(p))
+
+    def since(self, version: int) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        (змінені шляхи, видалені шляхи) після version;
+        None — delta неможлива (version з майбутнього / старіша за tombstones) — потрібен повний список.
+        """
+        if version <= 0 or version > self.version or version < self._horizon:
+            return None
+        changed = [p for p, v in self._rows.items() if v > version]
+        removed = [p for p, v in self._removed.items() if v > version]
+        return changed, removed
@@ -1,6 +1,7 @@
 import { useEffect, useMemo, useRef, useState } from "react";
 
 import type { DesktopFile } from "./types";
+import { decodeFiles, decodeRenamed } from "./wire";
 import { CircularProgress } from "./components/CircularProgress";
 import { MiniBarChart, type MiniBarDatum } from "./components/MiniBarChart";
 import type { WeeklyPoint } from "./components/WeeklyCleanlinessChart";
@@ -30,7 +31,21 @@ declare global {
   interface Window {
     desktopBridge?: {
       scanDesktop: () => void;
-      filesUpdated?: {
+      filesBatch?: {
+        connect: (cb: (payload: string) => void) => void;
+        disconnect?: (cb: (payload: string) => void) => void;
+      };
+      getFiles?: (offset: number, limit: number, sort: string, cb?: (payload: string) => void) => void | string;
+      getFilesSince?: (version: number, cb?: (payload: string) => void) => void | string;
+      queryFiles?: (
+        selector: string,
+        sort: string,
+        offset: number,
+        limit: number,
+        cb?: (payload: string) => void,
+      ) => void | string;
+      setWireFormat?: (format: string, cb?: (active: string) => void) => void | string;
+      filesDelta?: {
         connect: (cb: (payload: string) => void) => void;
         disconnect?: (cb: (payload: string) => void) => void;
       };
@@ -42,6 +57,13 @@ declare global {
       setCategory?: (path: string, category: string | null, cb?: (ok: boolean) => void) => void | boolean;
 
       getProfileSummary?: (cb?: (payload: string) => void) => void | string;
+
+      analyzeDiskUsage?: (options: string, cb?: (ok: boolean) => void) => void | boolean;
+      cancelDiskUsage?: () => void;
+      diskUsageReady?: {
+        connect: (cb: (payload: string) => void) => void;
+        disconnect?: (cb: (payload: string) => void) => void;
+      };
     };
   }
 }
@@ -184,8 +206,11 @@ function App() {
 
   const [settingsHydrated, setSettingsHydrated] = useState(false);
 
-  const isFilesUpdatedConnectedRef = useRef(false);
-  const filesUpdatedHandlerRef = useRef<((payload: string) => void) | null>(null);
+  const isFilesBatchConnectedRef = useRef(false);
+  const filesBatchHandlerRef = useRef<((payload: string) => void) | null>(null);
+  const filesDeltaHandlerRef = useRef<((payload: string) => void) | null>(null);
+  // пачки поточного сканування (scan_id -> файли), поки не прийде done
+  const scanBufferRef = useRef<{ scanId: number; files: DesktopFile[] }>({ scanId: -1, files: [] });
 
   const totalDeletedFiles = 0;
   const totalFreedBytes = 0;
@@ -254,58 +279,145 @@ function App() {
       void syncAutorunFromOS();
       void loadProfile();
 
+      // колонковий формат: payload-и в рази менші, JSON.parse швидший (див. wire.ts)
+      // (старий backend без setWireFormat — лишається JSON, decodeFiles розуміє обидва)
+      if (bridge.setWireFormat) {
+        void callBridge<string>(bridge.setWireFormat, ["columnar"]).catch(() => undefined);
+      }
+
       if (
-        !isFilesUpdatedConnectedRef.current &&
-        bridge.filesUpdated &&
-        typeof bridge.filesUpdated.connect === "function"
+        !isFilesBatchConnectedRef.current &&
+        bridge.filesBatch &&
+        typeof bridge.filesBatch.connect === "function"
       ) {
-        const handler = (payload: string) => {
-          try {
-            const parsed = JSON.parse(payload) as {
-              files?: DesktopFile[];
-              error?: string | null;
-            };
+        const finishScan = (incomingFiles: DesktopFile[], backendError: string | null) => {
+          setFiles(incomingFiles);
+          setSelectedPaths(new Set());
 
-            const incomingFiles = Array.isArray(parsed.files) ? parsed.files : [];
-            const backendError = typeof parsed.error === "string" && parsed.error ? parsed.error : null;
+          setScanFilesCount(incomingFiles.length);
+          const total = incomingFiles.reduce((sum, f) => sum + f.size_bytes, 0);
+          setScanTotalSize(total);
 
-            setFiles(incomingFiles);
-            setSelectedPaths(new Set());
+          setError(backendError);
 
-            setScanFilesCount(incomingFiles.length);
-            const total = incomingFiles.reduce((sum, f) => sum + f.size_bytes, 0);
-            setScanTotalSize(total);
+          const count = incomingFiles.length;
+          const cleanlinessNow = count
+            ? Math.max(0, Math.min(100, 100 - (count / MAX_FILES_FOR_100) * 100))
+            : 100;
 
-            setError(backendError);
+          const todayIndex = normalizeDayIndex(new Date().getDay());
+          setWeeklyStats((prev) => {
+            const filtered = prev.filter((p) => p.dayIndex !== todayIndex);
+            const next: WeeklyPoint[] = [...filtered, { dayIndex: todayIndex, value: Math.round(cleanlinessNow) }];
+            return next.slice(-7);
+          });
 
-            const count = incomingFiles.length;
-            const cleanlinessNow = count
-              ? Math.max(0, Math.min(100, 100 - (count / MAX_FILES_FOR_100) * 100))
-              : 100;
+          void loadProfile();
+        };
 
-            const todayIndex = normalizeDayIndex(new Date().getDay());
-            setWeeklyStats((prev) => {
-              const filtered = prev.filter((p) => p.dayIndex !== todayIndex);
-              const next: WeeklyPoint[] = [...filtered, { dayIndex: todayIndex, value: Math.round(cleanlinessNow) }];
-              return next.slice(-7);
-            });
+        const handler = (payload: string) => {
+          try {
+            const parsed = JSON.parse(payload) as {
+              scan_id?: number;
+              seq?: number;
+              files?: unknown;
+              done?: boolean;
+              cancelled?: boolean;
+              error?: string | null;
+            };
+
+            const scanId = typeof parsed.scan_id === "number" ? parsed.scan_id : 0;
+            const batch = decodeFiles(parsed.files);
+
+            const buffer = scanBufferRef.current;
+            if (buffer.scanId !== scanId) {
+              scanBufferRef.current = { scanId, files: [] };
+            }
+            const acc = scanBufferRef.current.files;
+            for (const f of batch) acc.push(f);
+
+            if (!parsed.done) {
+              // перші рядки — одразу, не чекаючи кінця сканування
+              setFiles(acc.slice());
+              setScanFilesCount(acc.length);
+              return;
+            }
+
+            if (parsed.cancelled) {
+              // скасоване сканування — за ним одразу йде нове з іншим scan_id
+              scanBufferRef.current = { scanId: -1, files: [] };
+              return;
+            }
 
-            void loadProfile();
+            const backendError = typeof parsed.error === "string" && parsed.error ? parsed.error : null;
+            finishScan(acc.slice(), backendError);
+            scanBufferRef.current = { scanId: -1, files: [] };
           } catch {
             setError(tRef.current.errorFallback);
             setFiles([]);
             setSelectedPaths(new Set());
             setScanFilesCount(0);
             setScanTotalSize(0);
+            scanBufferRef.current = { scanId: -1, files: [] };
           }
 
           setScanProgress(100);
           setIsScanning(false);
         };
 
-        filesUpdatedHandlerRef.current = handler;
-        bridge.filesUpdated.connect(handler);
-        isFilesUpdatedConnectedRef.current = true;
+        filesBatchHandlerRef.current = handler;
+        bridge.filesBatch.connect(handler);
+        isFilesBatchConnectedRef.current = true;
+      }
+
+      if (!filesDeltaHandlerRef.current && bridge.filesDelta && typeof bridge.filesDelta.connect === "function") {
+        // зміни від watcher-а: точкове оновлення списку без повного сканування
+        const deltaHandler = (payload: string) => {
+          try {
+            const parsed = JSON.parse(payload) as {
+              added?: unknown;
+              changed?: unknown;
+              renamed?: unknown;
+              removed?: string[];
+            };
+
+            const gone = new Set<string>(parsed.removed ?? []);
+            const fresh = new Map<string, DesktopFile>();
+            for (const f of decodeFiles(parsed.added)) fresh.set(f.path, f);
+            for (const f of decodeFiles(parsed.changed)) fresh.set(f.path, f);
+            for (const r of decodeRenamed(parsed.renamed)) {
+              gone.add(r.from);
+              fresh.set(r.file.path, r.file);
+            }
+
+            setFiles((prev) => {
+              const next: DesktopFile[] = [];
+              for (const f of prev) {
+                if (gone.has(f.path)) continue;
+                const updated = fresh.get(f.path);
+                if (updated) fresh.delete(f.path);
+                next.push(updated ?? f);
+              }
+              for (const f of fresh.values()) next.push(f);
+              setScanFilesCount(next.length);
+              setScanTotalSize(next.reduce((sum, f) => sum + f.size_bytes, 0));
+              return next;
+            });
+
+            if (gone.size > 0) {
+              setSelectedPaths((prev) => {
+                const next = new Set(prev);
+                for (const p of gone) next.delete(p);
+                return next;
+              });
+            }
+          } catch {
+            // пропущений delta виправить наступне сканування
+          }
+        };
+
+        filesDeltaHandlerRef.current = deltaHandler;
+        bridge.filesDelta.connect(deltaHandler);
       }
     };
 
@@ -326,17 +438,27 @@ function App() {
       window.clearInterval(retryId);
 
       const bridge = window.desktopBridge;
-      const handler = filesUpdatedHandlerRef.current;
-      if (bridge?.filesUpdated?.disconnect && handler) {
+      const handler = filesBatchHandlerRef.current;
+      if (bridge?.filesBatch?.disconnect && handler) {
         try {
-          bridge.filesUpdated.disconnect(handler);
+          bridge.filesBatch.disconnect(handler);
         } catch {
           // ignore
         }
       }
 
-      isFilesUpdatedConnectedRef.current = false;
-      filesUpdatedHandlerRef.current = null;
+      isFilesBatchConnectedRef.current = false;
+      filesBatchHandlerRef.current = null;
+
+      const deltaHandler = filesDeltaHandlerRef.current;
+      if (bridge?.filesDelta?.disconnect && deltaHandler) {
+        try {
+          bridge.filesDelta.disconnect(deltaHandler);
+        } catch {
+          // ignore
+        }
+      }
+      filesDeltaHandlerRef.current = null;
     };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
@@ -3,16 +3,25 @@ export interface DesktopFile {
   path: string;
   ext: string;
   size_bytes: number;
-  last_modified: string;
-  last_access: string;
+  // ISO-рядок (формат "json") або epoch у мс (формат "columnar", див. wire.ts) — обидва йдуть у new Date()
+  last_modified: string | number;
+  last_access: string | number;
 
   trash_score?: number;
   trash_reasons?: string[];
 
-  first_seen_at?: string;
-  last_seen_at?: string;
+  first_seen_at?: string | number;
+  last_seen_at?: string | number;
   seen_count?: number;
 
   user_label?: string | null;
   user_category?: string | null;
+
+  scan_status?: "added" | "changed" | "renamed" | "unchanged";
+  root?: string;
+
+  duplicate_group?: string | null;
+  duplicate_of?: string | null;
+  // тип вмісту за сигнатурою ("zip", "exe", ...), root/intelligence/sniff.py
+  content_type?: string | null;
 }
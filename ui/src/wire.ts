@@ -0,0 +1,92 @@
+import type { DesktopFile } from "./types";
+
+// Колонковий формат payload-ів bridge (root/wire.py, setWireFormat("columnar")):
+// спільна таблиця рядків, epoch-секунди замість ISO, score * 1000, паралельні масиви.
+// Часові поля DesktopFile після decodeFiles — epoch у мс (див. types.ts).
+
+export type ColumnarFiles = {
+  format: "columnar";
+  v: number;
+  n: number;
+  sep: string;
+  strings: string[];
+  reason_sets: number[][];
+  cols: {
+    dir: number[];
+    name: string[];
+    ext: number[];
+    size: number[];
+    mtime: (number | null)[];
+    atime: (number | null)[];
+    first_seen: (number | null)[];
+    last_seen: (number | null)[];
+    seen: number[];
+    score: number[];
+    reasons: number[];
+    label: (number | null)[];
+    category: (number | null)[];
+    status: (number | null)[];
+    root: (number | null)[];
+    dup_group: (number | null)[];
+    dup_of: (number | null)[];
+    ctype?: (number | null)[];
+  };
+};
+
+export function isColumnar(value: unknown): value is ColumnarFiles {
+  return !!value && typeof value === "object" && (value as { format?: unknown }).format === "columnar";
+}
+
+// epoch у мс, а не ISO: new Date(x) у таблиці приймає обидва, а toISOString на кожен рядок — найдорожче в декодуванні
+const msOrEmpty = (sec: number | null) => (sec == null ? "" : sec * 1000);
+const msOrUndefined = (sec: number | null) => (sec == null ? undefined : sec * 1000);
+
+/**
+ * Поле "files" payload-а -> DesktopFile[]: і звичайний JSON-список, і колонки.
+ */
+export function decodeFiles(value: unknown): DesktopFile[] {
+  if (Array.isArray(value)) return value as DesktopFile[];
+  if (!isColumnar(value)) return [];
+
+  const { n, sep, strings, cols } = value;
+  const str = (i: number | null) => (i == null ? null : strings[i]);
+  // однакові набори причин — один масив на всі рядки
+  const reasonLists = value.reason_sets.map((set) => set.map((i) => strings[i]));
+
+  const out: DesktopFile[] = new Array(n);
+  for (let i = 0; i < n; i++) {
+    const name = cols.name[i];
+    out[i] = {
+      name,
+      path: strings[cols.dir[i]] + sep + name,
+      ext: strings[cols.ext[i]],
+      size_bytes: cols.size[i],
+      last_modified: msOrEmpty(cols.mtime[i]),
+      last_access: msOrEmpty(cols.atime[i]),
+      trash_score: cols.score[i] / 1000,
+      trash_reasons: reasonLists[cols.reasons[i]] ?? [],
+      first_seen_at: msOrUndefined(cols.first_seen[i]),
+      last_seen_at: msOrUndefined(cols.last_seen[i]),
+      seen_count: cols.seen[i],
+      user_label: str(cols.label[i]),
+      user_category: str(cols.category[i]),
+      scan_status: (str(cols.status[i]) ?? undefined) as DesktopFile["scan_status"],
+      root: str(cols.root[i]) ?? undefined,
+      duplicate_group: str(cols.dup_group[i]),
+      duplicate_of: str(cols.dup_of[i]),
+      content_type: cols.ctype ? str(cols.ctype[i]) : null,
+    };
+  }
+  return out;
+}
+
+/**
+ * filesDelta.renamed: [{from, file}] (json) або {from: [...], files: колонки} (columnar).
+ */
+export function decodeRenamed(value: unknown): { from: string; file: DesktopFile }[] {
+  if (Array.isArray(value)) return value as { from: string; file: DesktopFile }[];
+  if (!value || typeof value !== "object") return [];
+  const { from, files } = value as { from?: string[]; files?: unknown };
+  const decoded = decodeFiles(files);
+  return decoded.map((file, i) => ({ from: from?.[i] ?? "", file }));
+}